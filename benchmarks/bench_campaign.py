@@ -0,0 +1,78 @@
+"""
+Benchmark campaign fan-out against a single capped query
+
+A fake search engine returns at most --cap results per query, drawn from a
+fixed pool of companies with overlap between related queries, after a fixed
+search latency. Pages come from the local stand-in server.
+
+Usage: python -m benchmarks.bench_campaign [--cap 20] [--search_latency 0.2] [--search_concurrency 4]
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_db_save import create_bench_app
+from benchmarks.stand_in_server import StandInServer
+from campaign import format_stats, stream_campaign
+from pipeline import stream_scrape
+from utils.http_client import configure_cache
+
+SPEC = {
+    'keywords': ['IT services', 'cloud consulting', 'data analytics'],
+    'founded_years': ['2015', '2016', '2017'],
+    'countries': ['United kingdom', 'Ireland'],
+    'sizes': ['11-50', '51-200'],
+}
+
+def fake_search(server, pool_size, cap, latency):
+    urls = server.company_urls(pool_size)
+
+    def search(query):
+        time.sleep(latency)
+        # Same query, same results; different queries overlap because they share one pool
+        rng = random.Random(query)
+        return rng.sample(urls, cap)
+    return search
+
+def main():
+    parser = argparse.ArgumentParser(description='Campaign fan-out benchmark')
+    parser.add_argument('--cap', type=int, default=20, help='Results returned per query')
+    parser.add_argument('--pool', type=int, default=300, help='Companies the fake engine knows about')
+    parser.add_argument('--search_latency', type=float, default=0.2, help='Seconds per search')
+    parser.add_argument('--search_concurrency', type=int, default=4, help='Searches run at once')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent page fetches')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    configure_cache(enabled=False)
+
+    with StandInServer(latency=0.01) as server, tempfile.TemporaryDirectory() as tmp:
+        search = fake_search(server, args.pool, args.cap, args.search_latency)
+        # No config file, so only the spec below applies
+        fetch_args = {'sleep_time': 0, 'concurrency': args.concurrency, 'config_path': os.path.join(tmp, 'none.json')}
+        print(f"{'run':<26} {'companies':>10} {'requests':>9} {'seconds':>8}")
+        runs = [
+            ('single query', lambda: stream_scrape(
+                dict(fetch_args, keywords='IT services', founded_years=SPEC['founded_years'], max_results=args.cap),
+                search_func=search)),
+            ('campaign, 1 search', lambda: stream_campaign(SPEC, search_concurrency=1, search_func=search, **fetch_args)),
+            (f'campaign, {args.search_concurrency} searches', lambda: stream_campaign(
+                SPEC, search_concurrency=args.search_concurrency, search_func=search, stats=stats, **fetch_args)),
+        ]
+        stats = []
+        for label, run in runs:
+            app = create_bench_app(os.path.join(tmp, f"{label}.db"))
+            with app.app_context():
+                requests_before = server.requests
+                start = time.perf_counter()
+                count = sum(1 for _ in run())
+                elapsed = time.perf_counter() - start
+            print(f"{label:<26} {count:>10} {server.requests - requests_before:>9} {elapsed:>8.2f}")
+        print()
+        print(format_stats(stats))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark domain classification over synthetic company descriptions
+
+Usage: python -m benchmarks.bench_classify [--rows 100000]
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from utils.domain_classifier import GENERAL_CATEGORIES, INDUSTRY_CATEGORIES, classify_domain, classify_domains
+
+FILLER = (
+    'we are a team of people who deliver outcomes for our partners across the uk and europe '
+    'with offices in london manchester and edinburgh and a focus on long term relationships'
+).split()
+
+def substring_classify(domain, company_name='', description=''):
+    """
+    The per-keyword substring scan classify_domain used before, over the same table
+    """
+    domain = (domain or '').lower()
+    company_name = (company_name or '').lower()
+    combined_text = f"{domain} {company_name} {(description or '').lower()}"
+    scores = {}
+    for industry, keywords in INDUSTRY_CATEGORIES.items():
+        industry_score = 0
+        for keyword in keywords:
+            keyword = keyword.rstrip('*')
+            if keyword in combined_text:
+                industry_score += 1
+                if keyword in domain or keyword in company_name:
+                    industry_score += 2
+                if ' ' in keyword and keyword in combined_text:
+                    industry_score += 3
+        if industry_score > 0:
+            scores[industry] = industry_score
+    if not scores:
+        for category, keywords in GENERAL_CATEGORIES.items():
+            category_score = sum(1 for kw in keywords if kw.rstrip('*') in combined_text)
+            if category_score > 0:
+                scores[category] = category_score
+    return max(scores, key=scores.get) if scores else 'Other'
+
+def synthetic_frame(rows, seed=42):
+    rng = random.Random(seed)
+    vocabulary = [kw.rstrip('*') for keywords in INDUSTRY_CATEGORIES.values() for kw in keywords]
+    records = []
+    for i in range(rows):
+        words = [rng.choice(FILLER) for _ in range(80)] + rng.sample(vocabulary, rng.randint(0, 4))
+        rng.shuffle(words)
+        records.append({
+            'domain': f"company-{i}",
+            'name': f"Company {i}",
+            'description': ' '.join(words)
+        })
+    return pd.DataFrame(records)
+
+def main():
+    parser = argparse.ArgumentParser(description='Domain classification benchmark')
+    parser.add_argument('--rows', type=int, default=100000, help='Synthetic descriptions to classify')
+    args = parser.parse_args()
+
+    df = synthetic_frame(args.rows)
+    rows = list(zip(df['domain'], df['name'], df['description']))
+
+    start = time.perf_counter()
+    for row in rows:
+        substring_classify(*row)
+    old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for row in rows:
+        classify_domain(*row)
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    classify_domains(df)
+    batch = time.perf_counter() - start
+
+    print(f"{args.rows} descriptions")
+    print(f"{'path':<28} {'seconds':>8} {'rows/sec':>10}")
+    for label, seconds in [
+        ('substring scan (old)', old),
+        ('compiled classify_domain', single),
+        ('compiled classify_domains', batch),
+    ]:
+        print(f"{label:<28} {seconds:>8.2f} {args.rows / seconds:>10.0f}")
+
+if __name__ == '__main__':
+    main()
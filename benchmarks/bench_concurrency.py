@@ -0,0 +1,36 @@
+"""
+Benchmark page fetching throughput at different worker counts
+
+Usage: python -m benchmarks.bench_concurrency [--pages 200] [--latency 0.05]
+"""
+import argparse
+import logging
+import time
+
+from benchmarks.stand_in_server import StandInServer
+from leads import scrape_company_pages
+from utils.http_client import configure_cache
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent fetch benchmark')
+    parser.add_argument('--pages', type=int, default=200, help='Pages to fetch per run')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stand-in server latency (seconds)')
+    parser.add_argument('--workers', type=str, default='1,8,32', help='Comma-separated worker counts')
+    parser.add_argument('--rate_limit', type=float, default=None, help='Per-host requests per second')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    # Measure fetching, not the response cache
+    configure_cache(enabled=False)
+
+    with StandInServer(latency=args.latency) as server:
+        urls = server.company_urls(args.pages)
+        print(f"{'workers':>8} {'pages':>6} {'seconds':>8} {'pages/sec':>10}")
+        for workers in [int(w) for w in args.workers.split(',')]:
+            start = time.perf_counter()
+            results = scrape_company_pages(urls, concurrency=workers, rate_limit=args.rate_limit)
+            elapsed = time.perf_counter() - start
+            print(f"{workers:>8} {len(results):>6} {elapsed:>8.2f} {len(results) / elapsed:>10.1f}")
+
+if __name__ == '__main__':
+    main()
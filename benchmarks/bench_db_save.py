@@ -0,0 +1,91 @@
+"""
+Benchmark saving scraped companies to SQLite: row-by-row commits vs bulk upsert
+
+Usage: python -m benchmarks.bench_db_save [--rows 10000]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from flask import Flask
+
+from models import Company, db, upsert_companies
+
+def create_bench_app(db_path):
+    """
+    Minimal app bound to a throwaway SQLite file, without the scraper routes
+    """
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    return app
+
+def synthetic_records(rows, offset=0):
+    return [{
+        'companyLinkedinUrl': f"https://uk.linkedin.com/company/company-{i}",
+        'name': f"Company {i}",
+        'description': f"Company {i} builds cloud software and data analytics products.",
+        'website': f"https://company-{i}.example.com",
+        'domain': f"company-{i}",
+        'domain_class': 'Cloud Services',
+        'size': '51-200 employees',
+        'location': 'London',
+        'founded': 'Founded 2016',
+        'scraped_at': '2025-01-01 12:00:00',
+        'keywords': 'cloud, software, data',
+        'technologies': 'cloud, analytics',
+        'sentiment': 'neutral',
+        'description_length': 64
+    } for i in range(offset, offset + rows)]
+
+def save_row_by_row(records):
+    """
+    The per-row SELECT + commit loop the /scrape handlers used before
+    """
+    for company_data in records:
+        try:
+            existing_company = Company.query.filter_by(linkedin_url=company_data.get('companyLinkedinUrl')).first()
+            if existing_company:
+                for key, value in company_data.items():
+                    if key == 'companyLinkedinUrl' or key == 'scraped_at':
+                        continue
+                    if hasattr(existing_company, key):
+                        setattr(existing_company, key, value)
+                db.session.commit()
+            else:
+                db.session.add(Company.from_dict(company_data))
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+
+def main():
+    parser = argparse.ArgumentParser(description='Database save benchmark')
+    parser.add_argument('--rows', type=int, default=10000, help='Rows to save')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    # Half the rows already exist, so both the insert and update paths are exercised
+    first_half = synthetic_records(args.rows // 2)
+    records = synthetic_records(args.rows)
+
+    print(f"{args.rows} rows ({len(first_half)} updates, {args.rows - len(first_half)} inserts)")
+    print(f"{'path':<22} {'seconds':>8} {'rows/sec':>10}")
+    for label, save in [('row by row (old)', save_row_by_row), ('upsert_companies', upsert_companies)]:
+        with tempfile.TemporaryDirectory() as tmp:
+            app = create_bench_app(os.path.join(tmp, 'bench.db'))
+            with app.app_context():
+                upsert_companies(first_half)
+                start = time.perf_counter()
+                save(records)
+                elapsed = time.perf_counter() - start
+                count = db.session.query(Company).count()
+                db.engine.dispose()
+        print(f"{label:<22} {elapsed:>8.2f} {args.rows / elapsed:>10.0f}   ({count} rows stored)")
+
+if __name__ == '__main__':
+    main()
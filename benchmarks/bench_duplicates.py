@@ -0,0 +1,144 @@
+"""
+Benchmark MinHash/LSH near-duplicate detection
+
+Seeds companies with random descriptions, a share of which are copies of an
+earlier description with a few words changed (the "renamed slug" case), then:
+signs every description, builds the band index and flags duplicates over the
+whole table (what the migration and `flask duplicates --rescan` do), scores
+the flags against the planted copies, and times the per-batch check made at
+ingest against comparing each new signature with every stored one.
+
+Usage: python -m benchmarks.bench_duplicates [--rows 100000] [--dup_rate 0.05]
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import insert, select
+
+from benchmarks.bench_db_save import create_bench_app
+from benchmarks.bench_search import vocabulary
+from duplicates import flag_near_duplicates, reindex_duplicates
+from models import Company, db, upsert_companies
+from utils.metrics import percentile
+from utils.minhash import DUPLICATE_THRESHOLD, from_bytes, shingles, signature_bytes
+
+BATCH_SIZE = 25
+
+class Corpus:
+    """Random descriptions, with near copies of earlier ones mixed in at `dup_rate`"""
+    def __init__(self, dup_rate, seed=42):
+        self.words, _ = vocabulary()
+        self.rng = random.Random(seed)
+        self.dup_rate = dup_rate
+        self.descriptions = []
+        self.copies = {}
+
+    def next(self):
+        index = len(self.descriptions)
+        if self.descriptions and self.rng.random() < self.dup_rate:
+            source = self.rng.randrange(index)
+            words = self.descriptions[source].split()
+            # A follower count and a word or two differ, as between two scrapes of one page
+            for position in self.rng.sample(range(len(words)), 2):
+                words[position] = self.rng.choice(self.words)
+            self.copies[index] = source
+            text = ' '.join(words)
+        else:
+            text = ' '.join(self.rng.choices(self.words, k=self.rng.randint(40, 120)))
+        self.descriptions.append(text)
+        return text
+
+    def jaccard(self, a, b):
+        first, second = shingles(self.descriptions[a]), shingles(self.descriptions[b])
+        return len(first & second) / len(first | second)
+
+    def is_copy(self, a, b):
+        """Whether one of two corpus positions was planted as a copy of the other (or of a shared source)"""
+        def root(index):
+            while index in self.copies:
+                index = self.copies[index]
+            return index
+        return root(a) == root(b)
+
+def main():
+    parser = argparse.ArgumentParser(description='Near-duplicate detection benchmark')
+    parser.add_argument('--rows', type=int, default=100000, help='Companies in the table')
+    parser.add_argument('--dup_rate', type=float, default=0.05, help='Share of descriptions that copy an earlier one')
+    parser.add_argument('--batches', type=int, default=40, help=f"Ingest batches of {BATCH_SIZE} to time")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    corpus = Corpus(args.dup_rate)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            descriptions = [corpus.next() for _ in range(args.rows)]
+            start = time.perf_counter()
+            signatures = [signature_bytes(text) for text in descriptions]
+            sign_seconds = time.perf_counter() - start
+            print(f"Signed {args.rows} descriptions in {sign_seconds:.1f}s "
+                  f"({sign_seconds / args.rows * 1e6:.0f} us each)")
+
+            now = datetime.now()
+            for offset in range(0, args.rows, 20000):
+                db.session.execute(insert(Company), [
+                    {'name': f"Company {i}", 'description': descriptions[i], 'minhash': signatures[i],
+                     'linkedin_url': f"https://linkedin.com/company/company-{i}", 'scraped_at': now}
+                    for i in range(offset, min(offset + 20000, args.rows))
+                ])
+            db.session.commit()
+
+            start = time.perf_counter()
+            with db.engine.begin() as connection:
+                flagged = reindex_duplicates(connection)
+            print(f"Indexed and flagged the whole table in {time.perf_counter() - start:.1f}s")
+
+            # Company ids are corpus positions + 1
+            rows = db.session.execute(
+                select(Company.id, Company.duplicate_of).where(Company.duplicate_of.isnot(None))
+            ).all()
+            true_flags = {company_id - 1 for company_id, original in rows if corpus.is_copy(company_id - 1, original - 1)}
+            # Recall counts the copies that really are that similar; short texts with two words changed may not be
+            close = [index for index, source in corpus.copies.items() if corpus.jaccard(index, source) >= DUPLICATE_THRESHOLD]
+            print(f"Flagged {flagged} companies; {len(corpus.copies)} copies were planted, {len(close)} with Jaccard >= "
+                  f"{DUPLICATE_THRESHOLD}: precision {len(true_flags) / max(flagged, 1):.1%}, "
+                  f"recall {len(true_flags & set(close)) / max(len(close), 1):.1%}")
+
+            matrix = np.vstack([from_bytes(signature) for signature in signatures if signature is not None])
+            lsh_times = []
+            scan_times = []
+            for batch in range(args.batches):
+                records = []
+                for _ in range(BATCH_SIZE):
+                    index = len(corpus.descriptions)
+                    records.append({
+                        'companyLinkedinUrl': f"https://linkedin.com/company/company-{index}",
+                        'name': f"Company {index}",
+                        'description': corpus.next(),
+                    })
+                upsert_companies(records)
+                start = time.perf_counter()
+                flag_near_duplicates(records)
+                lsh_times.append(time.perf_counter() - start)
+
+                # Baseline: every new signature against every stored one
+                new_signatures = [from_bytes(signature_bytes(record['description'])) for record in records]
+                start = time.perf_counter()
+                for signature in new_signatures:
+                    scores = (matrix == signature).mean(axis=1)
+                    scores.argmax()
+                scan_times.append(time.perf_counter() - start)
+            lsh_times.sort()
+            scan_times.sort()
+            print(f"Checking a batch of {BATCH_SIZE} new companies against {args.rows}: "
+                  f"LSH p50 {percentile(lsh_times, 50) * 1000:.1f} ms (p95 {percentile(lsh_times, 95) * 1000:.1f}), "
+                  f"full scan p50 {percentile(scan_times, 50) * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+"""
+End-to-end benchmark suite: search -> fetch -> parse -> classify -> NLP -> DB save -> CSV
+
+A local stand-in server replays recorded LinkedIn pages (benchmarks/fixtures/linkedin)
+and serves Google-style result pages whose links point at them. The pipeline
+runs unchanged: searches go through the `search_func` hook and company pages
+are fetched from the stand-in through the `base_url` setting. Each size runs in
+its own process so peak RSS is measured per size.
+
+Reports throughput, p50/p95 per stage and peak RSS, and writes everything as
+JSON (by default benchmarks/results/e2e-<commit>.json) so runs from different
+commits can be compared with --compare.
+
+Usage: python -m benchmarks.bench_e2e [--sizes 10,1000,50000] [--concurrency 8] [--compare OLD.json]
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.bench_html_extract import FIXTURE_DIR
+from benchmarks.stand_in_server import StandInServer
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+RESULTS_PER_SEARCH_PAGE = 100
+
+SEARCH_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head><title>{query} - Google Search</title></head>
+<body>
+<div id="search">
+{results}
+</div>
+</body>
+</html>
+"""
+RESULT_TEMPLATE = """<div class="g"><a href="/url?q=https://uk.linkedin.com/company/{slug}/&amp;sa=U&amp;ved=0ahUKE{i}"><h3>{name} | LinkedIn</h3></a>
+<div class="s">{name} | LinkedIn. Company page of {name}.</div></div>"""
+
+DESCRIPTION_PATTERN = re.compile(r'(<meta name="description" content=")([^"]*)(">)')
+DESCRIPTION_MARKER = '\x00description\x00'
+
+class RecordedSite:
+    """
+    Builds stand-in responses from the recorded fixtures
+    Company <fixture>-<i> is fixture i % len(fixtures) with a description of
+    its own, so NLP and the enrichment cache see as many texts as companies
+    """
+    def __init__(self, seed=42):
+        self.templates = {}
+        vocabulary = []
+        for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html'))):
+            slug = os.path.splitext(os.path.basename(path))[0]
+            page = open(path, encoding='utf-8').read()
+            match = DESCRIPTION_PATTERN.search(page)
+            name, _, text = match.group(2).partition(' | ')
+            vocabulary.extend(text.split())
+            self.templates[slug] = (name, page[:match.start(2)] + DESCRIPTION_MARKER + page[match.end(2):])
+        self.slugs = sorted(self.templates)
+        self.vocabulary = vocabulary
+        self.seed = seed
+
+    def company_slug(self, i):
+        return f"{self.slugs[i % len(self.slugs)]}-{i}"
+
+    def company_page(self, slug):
+        base, _, index = slug.rpartition('-')
+        if base not in self.templates or not index.isdigit():
+            return None
+        name, template = self.templates[base]
+        rng = random.Random(self.seed * 1000003 + int(index))
+        words = ' '.join(rng.choices(self.vocabulary, k=rng.randint(30, 120)))
+        return template.replace(DESCRIPTION_MARKER, f"{name} | {rng.randint(100, 50000):,} followers on LinkedIn. {words}")
+
+    def search_page(self, query, start, num, total):
+        results = '\n'.join(
+            RESULT_TEMPLATE.format(slug=self.company_slug(i), name=self.templates[self.slugs[i % len(self.slugs)]][0], i=i)
+            for i in range(start, min(start + num, total))
+        )
+        return SEARCH_TEMPLATE.format(query=query, results=results)
+
+    def factory(self, total):
+        def page_for(path):
+            parts = urlsplit(path)
+            if parts.path == '/search':
+                args = parse_qs(parts.query)
+                start = int(args.get('start', ['0'])[0])
+                num = int(args.get('num', [str(RESULTS_PER_SEARCH_PAGE)])[0])
+                return self.search_page(args.get('q', [''])[0], start, num, total)
+            if parts.path.startswith('/company/'):
+                return self.company_page(parts.path.split('/')[2])
+            return None
+        return page_for
+
+def stand_in_search(base_url, max_results):
+    """
+    search_func that pages through the stand-in's result pages like a Google scrape would
+    """
+    from leads import parse_search_results
+    from utils.http_client import fetch
+
+    def search(query):
+        urls = []
+        start = 0
+        while len(urls) < max_results:
+            response = fetch(f"{base_url}/search?q={query}&start={start}&num={RESULTS_PER_SEARCH_PAGE}")
+            page = parse_search_results(response.text)
+            if not page:
+                break
+            urls.extend(page)
+            start += RESULTS_PER_SEARCH_PAGE
+        return urls[:max_results]
+    return search
+
+def run_one(size, base_url, concurrency, batch_size):
+    """
+    One full pipeline run in this process; returns the measurements as a dict
+    """
+    from benchmarks.bench_db_save import create_bench_app
+    from pipeline import stream_scrape
+    from utils.http_client import configure_cache
+    from utils.metrics import collect_timings
+
+    logging.disable(logging.WARNING)
+    # Measure fetching, not the response cache
+    configure_cache(enabled=False)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'bench.db'))
+        csv_path = os.path.join(tmp, 'leads.csv')
+        params = {
+            'max_results': size,
+            'sleep_time': 0,
+            'concurrency': concurrency,
+            'rescrape_after_days': 0,
+            'base_url': base_url,
+            # No config file, so nothing from scraper_config.json applies
+            'config_path': os.path.join(tmp, 'none.json'),
+        }
+        totals = {}
+        with app.app_context(), collect_timings(keep_samples=True) as timings:
+            start = time.perf_counter()
+            for _ in stream_scrape(params, search_func=stand_in_search(base_url, size), output_csv=csv_path,
+                                   batch_size=batch_size, totals=totals):
+                pass
+            elapsed = time.perf_counter() - start
+        with open(csv_path, encoding='utf-8') as f:
+            csv_rows = sum(1 for _ in f) - 1
+    summary = timings.to_dict()
+    return {
+        'companies': size,
+        'rows': totals['count'],
+        'inserted': totals['inserted'],
+        'csv_rows': csv_rows,
+        'seconds': round(elapsed, 3),
+        'companies_per_sec': round(totals['count'] / elapsed, 1) if elapsed else None,
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'stages': summary['stages'],
+    }
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], capture_output=True, text=True)
+        return commit.stdout.strip() + ('-dirty' if dirty.stdout.strip() else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def format_report(report):
+    lines = [f"{'companies':>10} {'rows':>7} {'seconds':>8} {'rows/sec':>9} {'peak RSS MB':>12}"]
+    for run in report['runs']:
+        lines.append(
+            f"{run['companies']:>10} {run['rows']:>7} {run['seconds']:>8.2f} {run['companies_per_sec']:>9.1f} "
+            f"{run['peak_rss_mb']:>12.1f}"
+        )
+    for run in report['runs']:
+        lines.append('')
+        lines.append(f"{run['companies']} companies: {'stage':<18} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'total s':>8}")
+        for stage, entry in run['stages'].items():
+            lines.append(
+                f"{'':>{len(str(run['companies'])) + 12}}{stage:<18} {entry['count']:>7} {entry['p50_ms']:>8.3f} "
+                f"{entry['p95_ms']:>8.3f} {entry['seconds']:>8.2f}"
+            )
+    return '\n'.join(lines)
+
+def format_comparison(old, new):
+    """
+    Throughput and stage p95 changes between two reports, per size both ran
+    """
+    old_runs = {run['companies']: run for run in old['runs']}
+    lines = [f"{old.get('commit')} -> {new.get('commit')}"]
+    for run in new['runs']:
+        before = old_runs.get(run['companies'])
+        if before is None:
+            continue
+        change = run['companies_per_sec'] / before['companies_per_sec'] - 1 if before['companies_per_sec'] else 0
+        lines.append(
+            f"{run['companies']:>7} companies: {before['companies_per_sec']:.1f} -> {run['companies_per_sec']:.1f} rows/sec "
+            f"({change:+.1%}), peak RSS {before['peak_rss_mb']:.0f} -> {run['peak_rss_mb']:.0f} MB"
+        )
+        for stage, entry in run['stages'].items():
+            previous = before['stages'].get(stage)
+            if previous and previous['p95_ms']:
+                lines.append(
+                    f"{'':>10}{stage:<18} p95 {previous['p95_ms']:>8.3f} -> {entry['p95_ms']:>8.3f} ms "
+                    f"({entry['p95_ms'] / previous['p95_ms'] - 1:+.1%})"
+                )
+    return '\n'.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end pipeline benchmark suite')
+    parser.add_argument('--sizes', type=str, default='10,1000,50000', help='Comma-separated company counts')
+    parser.add_argument('--concurrency', type=int, default=8, help='Fetch workers')
+    parser.add_argument('--batch_size', type=int, default=25, help='Largest enrich/save batch')
+    parser.add_argument('--latency', type=float, default=0.0, help='Stand-in server latency (seconds)')
+    parser.add_argument('--output', type=str, default=None, help='Results JSON (default benchmarks/results/e2e-<commit>.json)')
+    parser.add_argument('--compare', type=str, default=None, help='Earlier results JSON to compare against')
+    # Internal: run a single size in this process and print its JSON
+    parser.add_argument('--child', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--base_url', type=str, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(run_one(args.child, args.base_url, args.concurrency, args.batch_size)))
+        return
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    site = RecordedSite()
+    report = {
+        'benchmark': 'e2e',
+        'commit': git_commit(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'params': {'concurrency': args.concurrency, 'batch_size': args.batch_size, 'latency': args.latency},
+        'runs': [],
+    }
+    with StandInServer(latency=args.latency, page_factory=site.factory(max(sizes))) as server:
+        for size in sizes:
+            print(f"Running {size} companies...", file=sys.stderr)
+            child = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_e2e', '--child', str(size), '--base_url', server.base_url,
+                 '--concurrency', str(args.concurrency), '--batch_size', str(args.batch_size)],
+                capture_output=True, text=True
+            )
+            if child.returncode != 0:
+                sys.stderr.write(child.stderr)
+                raise SystemExit(f"Run with {size} companies failed")
+            report['runs'].append(json.loads(child.stdout.strip().splitlines()[-1]))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"e2e-{report['commit'] or 'unknown'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(format_report(report))
+    print(f"\nResults written to {output}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print()
+            print(format_comparison(json.load(f), report))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Benchmark streaming exports against loading the table through to_dict()
+
+Seeds a database with synthetic companies, then exports every row in each
+format, reporting time, file size and how far RSS rose above its level before
+the export (sampled every 10 ms). Finally measures how long pandas takes to load
+each file back. The to_dict() path is what /download-style exports used to do
+and is skipped above --legacy_max rows.
+
+Usage: python -m benchmarks.bench_export [--rows 100000,1000000] [--legacy_max 100000]
+"""
+import argparse
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import insert
+
+from benchmarks.bench_db_save import create_bench_app
+from benchmarks.bench_nlp import synthetic_descriptions
+from exports import COLUMNAR_FORMATS, EXPORT_FORMATS, check_format, export_filename, write_export
+from models import Company, db
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+def current_rss():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+class RssPeak:
+    """Highest RSS seen while the block runs, minus RSS at its start"""
+    def __enter__(self):
+        self.start = current_rss()
+        self.peak = self.start
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, current_rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+        self.growth_mb = (self.peak - self.start) / 1e6
+
+def seed(rows, chunk=20000):
+    descriptions = synthetic_descriptions(min(rows, 5000)).tolist()
+    classes = ['IT Services', 'Software', 'Finance', 'Healthcare', 'Logistics']
+    now = datetime.now()
+    for start in range(0, rows, chunk):
+        db.session.execute(insert(Company), [
+            {
+                'name': f"Company {i}",
+                'description': descriptions[i % len(descriptions)],
+                'website': f"https://company-{i}.example.com",
+                'linkedin_url': f"https://linkedin.com/company/company-{i}",
+                'domain': f"company-{i}",
+                'domain_class': classes[i % len(classes)],
+                'size': '51-200 employees',
+                'location': 'London, England',
+                'founded': f"Founded {2000 + i % 20}",
+                'keywords': 'cloud, data, analytics',
+                'technologies': 'ai, cloud',
+                'sentiment': 'positive',
+                'description_length': len(descriptions[i % len(descriptions)]),
+                'scraped_at': now,
+            }
+            for i in range(start, min(start + chunk, rows))
+        ])
+    db.session.commit()
+
+def legacy_export(path):
+    companies = Company.query.all()
+    pd.DataFrame([company.to_dict() for company in companies]).to_csv(path, index=False)
+
+def load(path, export_format):
+    if export_format == 'csv':
+        return pd.read_csv(path)
+    if export_format == 'csv.gz':
+        return pd.read_csv(path, compression='gzip')
+    if export_format == 'ndjson':
+        # read_json(lines=True) holds the whole file several times over; 1M rows would not fit
+        with pd.read_json(path, lines=True, chunksize=100000) as reader:
+            return pd.concat(reader, ignore_index=True)
+    if export_format == 'parquet':
+        return pd.read_parquet(path)
+    import pyarrow as pa
+    with open(path, 'rb') as f:
+        return pa.ipc.open_stream(io.BytesIO(f.read())).read_all().to_pandas()
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming export benchmark')
+    parser.add_argument('--rows', type=str, default='100000,1000000', help='Comma-separated table sizes')
+    parser.add_argument('--legacy_max', type=int, default=100000, help='Largest table to export through to_dict()')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    formats = []
+    for export_format in EXPORT_FORMATS:
+        try:
+            check_format(export_format)
+            formats.append(export_format)
+        except ValueError as e:
+            print(f"Skipping {export_format}: {e}")
+
+    for rows in [int(value) for value in args.rows.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp:
+            app = create_bench_app(os.path.join(tmp, 'bench.db'))
+            with app.app_context():
+                seed(rows)
+                print(f"\n{rows} companies")
+                print(f"{'format':<16} {'export s':>9} {'MB':>8} {'RSS +MB':>8} {'load s':>7}")
+                runs = [(export_format, export_format) for export_format in formats]
+                if rows <= args.legacy_max:
+                    runs.insert(0, ('to_dict (old)', 'csv'))
+                csv_load = None
+                for label, export_format in runs:
+                    path = os.path.join(tmp, export_filename(export_format, prefix=label.split()[0]))
+                    db.session.expire_all()
+                    with RssPeak() as rss:
+                        start = time.perf_counter()
+                        if label == 'to_dict (old)':
+                            legacy_export(path)
+                        else:
+                            write_export(path, export_format)
+                        elapsed = time.perf_counter() - start
+                    db.session.remove()
+                    start = time.perf_counter()
+                    loaded = load(path, export_format)
+                    load_seconds = time.perf_counter() - start
+                    assert len(loaded) == rows, (label, len(loaded))
+                    del loaded
+                    if export_format == 'csv' and csv_load is None:
+                        csv_load = load_seconds
+                    speedup = f" ({csv_load / load_seconds:.1f}x csv)" if export_format in COLUMNAR_FORMATS else ''
+                    print(f"{label:<16} {elapsed:>9.2f} {os.path.getsize(path) / 1e6:>8.1f} {rss.growth_mb:>8.1f} "
+                          f"{load_seconds:>7.2f}{speedup}")
+                    os.remove(path)
+
+if __name__ == '__main__':
+    main()
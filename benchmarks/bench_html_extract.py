@@ -0,0 +1,104 @@
+"""
+Compare the BeautifulSoup field lookups with the single-pass extractor
+Reports time and peak traced memory per page over the saved LinkedIn fixtures
+
+Usage: python -m benchmarks.bench_html_extract [--repeat 20]
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+from bs4 import BeautifulSoup
+
+from utils.html_extractor import etree, extract_company_fields
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'linkedin')
+
+def legacy_extract(html):
+    """
+    The field lookups scrape_linkedin_company_page used before the single-pass extractor
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    name_elem = soup.find('h1')
+    name = name_elem.text.strip() if name_elem else ''
+    desc_elem = soup.find('meta', {'name': 'description'})
+    desc = desc_elem['content'].strip() if desc_elem and desc_elem.has_attr('content') else ''
+    website = ''
+    for a in soup.find_all('a', href=True):
+        if 'website' in a.text.lower():
+            website = a['href']
+            break
+    size = ''
+    for p in soup.find_all('p'):
+        if 'employees' in p.text.lower():
+            size = p.text.strip()
+            break
+    location = ''
+    for span in soup.find_all('span'):
+        if 'headquarter' in span.text.lower():
+            location = span.text.strip()
+            break
+    founded = ''
+    for p in soup.find_all('p'):
+        if 'founded' in p.text.lower():
+            founded = p.text.strip()
+            break
+    return {
+        'name': name,
+        'description': desc,
+        'website': website,
+        'size': size,
+        'location': location,
+        'founded': founded
+    }
+
+def measure(func, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            func(html)
+    per_page = (time.perf_counter() - start) / (repeat * len(pages))
+
+    peak = 0
+    for html in pages:
+        tracemalloc.start()
+        func(html)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return per_page, peak
+
+def main():
+    parser = argparse.ArgumentParser(description='HTML extraction benchmark')
+    parser.add_argument('--repeat', type=int, default=20, help='Passes over the fixture set')
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html')))
+    pages = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            pages.append(f.read())
+
+    candidates = [
+        ('bs4 html.parser (old)', legacy_extract),
+        ('single pass html.parser', lambda html: extract_company_fields(html, backend='html.parser')),
+    ]
+    if etree is not None:
+        candidates.append(('single pass lxml', lambda html: extract_company_fields(html, backend='lxml')))
+
+    # The new paths must return exactly what the old lookups returned
+    for path, html in zip(paths, pages):
+        expected = legacy_extract(html)
+        for label, func in candidates[1:]:
+            if func(html) != expected:
+                print(f"MISMATCH {label}: {os.path.basename(path)}")
+
+    print(f"{len(pages)} fixtures, average {sum(map(len, pages)) // len(pages)} chars")
+    print(f"{'path':<26} {'ms/page':>9} {'peak KiB':>10}")
+    for label, func in candidates:
+        per_page, peak = measure(func, pages, args.repeat)
+        print(f"{label:<26} {per_page * 1000:>9.2f} {peak / 1024:>10.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark re-scraping known companies through the HTTP response cache
+
+Runs the same page list cold, warm (fresh entries), stale (TTL expired, so
+pages are revalidated with If-None-Match), offline and with a forced refresh.
+
+Usage: python -m benchmarks.bench_http_cache [--pages 200] [--latency 0.05] [--concurrency 4]
+"""
+import argparse
+import glob
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.bench_html_extract import FIXTURE_DIR
+from benchmarks.stand_in_server import StandInServer
+from leads import scrape_company_pages
+from utils.http_client import configure_cache
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP cache benchmark')
+    parser.add_argument('--pages', type=int, default=200, help='Company pages to scrape')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stand-in server latency (seconds)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Fetch workers')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    fixtures = [open(path, encoding='utf-8').read() for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html')))]
+    pages = {f"/company/company-{i}": fixtures[i % len(fixtures)] for i in range(args.pages)}
+
+    print(f"{args.pages} pages, {args.concurrency} workers, {args.latency * 1000:.0f} ms latency")
+    print(f"{'run':<10} {'seconds':>8} {'requests':>9} {'MB sent':>8} {'hits':>6} {'304s':>6} {'misses':>7} {'MB saved':>9}")
+    with StandInServer(latency=args.latency, pages=pages) as server, tempfile.TemporaryDirectory() as tmp:
+        urls = server.company_urls(args.pages)
+        path = os.path.join(tmp, 'http_cache.db')
+        for label, ttl, mode in [
+            ('cold', 3600, 'default'),
+            ('warm', 3600, 'default'),
+            ('stale', 0, 'default'),
+            ('offline', 0, 'offline'),
+            ('refresh', 3600, 'refresh'),
+        ]:
+            # A fresh cache object per run resets the counters but keeps the file
+            cache = configure_cache(path, ttl=ttl)
+            requests_before, bytes_before = server.requests, server.bytes_sent
+            start = time.perf_counter()
+            results = scrape_company_pages(urls, concurrency=args.concurrency, cache_mode=mode)
+            elapsed = time.perf_counter() - start
+            stats = cache.stats()
+            assert len(results) == args.pages
+            print(
+                f"{label:<10} {elapsed:>8.2f} {server.requests - requests_before:>9} "
+                f"{(server.bytes_sent - bytes_before) / 1e6:>8.1f} {stats['hits']:>6} {stats['revalidated']:>6} "
+                f"{stats['misses']:>7} {stats['bytes_saved'] / 1e6:>9.1f}"
+            )
+        configure_cache(enabled=False)
+
+if __name__ == '__main__':
+    main()
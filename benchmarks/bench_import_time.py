@@ -0,0 +1,56 @@
+"""
+Import-time regression check for the NLP module
+
+Runs `python -X importtime` in a fresh interpreter and fails (exit code 1) when
+importing utils.nlp_processor exceeds the budget or pulls in NLTK eagerly.
+pandas is imported first so its own cost is not charged to the module.
+
+Usage: python -m benchmarks.bench_import_time [--budget-ms 50]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_times(statement):
+    """
+    Return {module: cumulative microseconds} parsed from -X importtime output
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        parts = [part.strip() for part in line[len('import time:'):].split('|')]
+        if parts[1].isdigit():
+            times[parts[2]] = int(parts[1])
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description='Import-time budget check')
+    parser.add_argument('--budget-ms', type=float, default=50.0, help='Budget for importing utils.nlp_processor')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to sample; the best run counts')
+    args = parser.parse_args()
+
+    best = None
+    for _ in range(args.runs):
+        times = import_times('import pandas; import utils.nlp_processor')
+        eager = sorted(name for name in times if name == 'nltk' or name.startswith('nltk.'))
+        if eager:
+            print(f"FAIL: NLTK imported eagerly ({', '.join(eager[:3])})")
+            sys.exit(1)
+        elapsed = times['utils.nlp_processor'] / 1000
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f"utils.nlp_processor import: {best:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    if best > args.budget_ms:
+        print("FAIL: import time over budget")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
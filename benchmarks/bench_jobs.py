@@ -0,0 +1,141 @@
+"""
+Benchmark background scrape jobs against the synchronous handler
+
+Measures how long a request is held by an inline scrape versus a job
+submission, then how long queued jobs take to finish with a bounded pool.
+The jobs are queued before any runner exists and one is left "running" by a
+dead process, so the run also covers picking work up after a restart.
+Pages come from the local stand-in server through a fake search function.
+
+The run fails (exit status 1) unless every job succeeds, the orphaned job is
+requeued and finished by the new runner, and each job's results read back
+from the database and from its own CSV file.
+
+Usage: python -m benchmarks.bench_jobs [--jobs 6] [--pages 10] [--workers 2] [--latency 0.05]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.bench_db_save import create_bench_app
+from benchmarks.stand_in_server import StandInServer
+import pandas as pd
+
+from jobs import STALE_AFTER, JobRunner, get_job, job_results, submit_job
+from leads import run_scraper
+from models import db, upsert_companies
+from utils.http_client import configure_cache
+from utils.nlp_processor import process_descriptions
+
+def wait_for_jobs(app, job_ids, timeout=300):
+    deadline = time.monotonic() + timeout
+    with app.app_context():
+        while time.monotonic() < deadline:
+            db.session.expire_all()
+            jobs = [get_job(job_id) for job_id in job_ids]
+            if all(job.finished for job in jobs):
+                return [job.to_dict() for job in jobs]
+            time.sleep(0.05)
+    raise TimeoutError("Jobs did not finish in time")
+
+def check_jobs(app, job_ids, pages):
+    """
+    The problems found with the finished jobs (none when all is well)
+    """
+    problems = []
+    paths = []
+    with app.app_context():
+        db.session.expire_all()
+        for index, job_id in enumerate(job_ids):
+            job = get_job(job_id)
+            if job.status != 'succeeded':
+                problems.append(f"job {job_id} ended {job.status}: {job.error}")
+                continue
+            results = list(job_results(job))
+            if len(results) != pages or job.result_count != pages:
+                problems.append(f"job {job_id} has {len(results)} results ({job.result_count} counted), expected {pages}")
+            if not job.output_csv or not os.path.exists(job.output_csv):
+                problems.append(f"job {job_id} has no output CSV")
+            else:
+                paths.append(job.output_csv)
+                rows = len(pd.read_csv(job.output_csv))
+                if rows != len(results):
+                    problems.append(f"job {job_id} wrote {rows} CSV rows for {len(results)} results")
+            if index == 0 and (job.attempts != 2 or job.worker == 'dead-process'):
+                problems.append(f"orphaned job {job_id} was not requeued (attempts {job.attempts}, worker {job.worker})")
+    if len(set(paths)) != len(paths):
+        problems.append("jobs shared an output CSV")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description='Background job benchmark')
+    parser.add_argument('--jobs', type=int, default=6, help='Jobs to submit')
+    parser.add_argument('--pages', type=int, default=10, help='Company pages per job')
+    parser.add_argument('--workers', type=int, default=2, help='Concurrent jobs per runner')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stand-in server latency per page (seconds)')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    # Measure fetching, not the response cache
+    configure_cache(enabled=False)
+    params = {'keywords': 'cloud software', 'max_results': args.pages, 'sleep_time': 0}
+    # Every job scrapes the same companies, so don't skip recently scraped ones
+    job_params = dict(params, rescrape_after_days=0)
+
+    with StandInServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        search = lambda query: server.company_urls(args.pages)
+        app = create_bench_app(os.path.join(tmp, 'bench.db'))
+
+        with app.app_context():
+            # What /scrape used to do inside the request
+            start = time.perf_counter()
+            df = run_scraper(**params, output_csv=None, search_func=search)
+            upsert_companies(process_descriptions(df))
+            inline = time.perf_counter() - start
+
+            start = time.perf_counter()
+            job_ids = [submit_job(job_params).id for _ in range(args.jobs)]
+            submit = (time.perf_counter() - start) / args.jobs
+
+            # One job was claimed by a process that died mid-scrape
+            orphan = get_job(job_ids[0])
+            orphan.status = 'running'
+            orphan.worker = 'dead-process'
+            orphan.attempts = 1
+            orphan.heartbeat_at = datetime.now() - timedelta(seconds=STALE_AFTER + 1)
+            db.session.commit()
+
+        print(f"{'request path':<24} {'ms held':>10}")
+        print(f"{'inline scrape (old)':<24} {inline * 1000:>10.1f}")
+        print(f"{'submit_job':<24} {submit * 1000:>10.1f}")
+        print()
+
+        # A fresh process starts and drains the queue left behind
+        runner = JobRunner(
+            app, workers=args.workers, search_func=search, output_dir=os.path.join(tmp, 'jobs')
+        ).start()
+        start = time.perf_counter()
+        results = wait_for_jobs(app, job_ids)
+        elapsed = time.perf_counter() - start
+        runner.stop()
+
+        succeeded = sum(1 for job in results if job['status'] == 'succeeded')
+        print(f"{args.jobs} jobs x {args.pages} pages, {args.workers} workers")
+        print(f"{'succeeded':<24} {succeeded:>10}")
+        print(f"{'orphan attempts':<24} {results[0]['attempts']:>10}")
+        print(f"{'seconds to drain':<24} {elapsed:>10.2f}")
+        print(f"{'jobs per second':<24} {args.jobs / elapsed:>10.2f}")
+
+        problems = check_jobs(app, job_ids, args.pages)
+        for problem in problems:
+            print(f"FAILED: {problem}")
+        if problems:
+            sys.exit(1)
+        print("All jobs succeeded, the orphan was requeued and every job's results read back")
+
+if __name__ == '__main__':
+    main()
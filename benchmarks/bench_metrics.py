@@ -0,0 +1,75 @@
+"""
+Benchmark the cost of stage instrumentation and show a per-run timing summary
+
+Times one timed() block and one counter increment in a tight loop, then runs
+the streaming pipeline against the stand-in server inside collect_timings()
+and estimates how much of that run the instrumentation itself took.
+
+Usage: python -m benchmarks.bench_metrics [--pages 300] [--latency 0.005] [--concurrency 4]
+"""
+import argparse
+import glob
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.bench_db_save import create_bench_app
+from benchmarks.bench_html_extract import FIXTURE_DIR
+from benchmarks.stand_in_server import StandInServer
+from pipeline import stream_scrape
+from utils.http_client import configure_cache
+from utils.metrics import REGISTRY, STAGE_SECONDS, Counter, collect_timings, format_timings, timed
+
+def per_call_seconds(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls
+
+def main():
+    parser = argparse.ArgumentParser(description='Instrumentation overhead benchmark')
+    parser.add_argument('--pages', type=int, default=300, help='Company pages to scrape')
+    parser.add_argument('--latency', type=float, default=0.005, help='Stand-in server latency (seconds)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Fetch workers')
+    parser.add_argument('--calls', type=int, default=200000, help='Iterations for the per-call timings')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    configure_cache(enabled=False)
+
+    def timed_block():
+        with timed('bench'):
+            pass
+    counter = Counter('bench_total', 'Benchmark counter', ['result'])
+    timed_cost = per_call_seconds(timed_block, args.calls)
+    with collect_timings():
+        timed_in_summary_cost = per_call_seconds(timed_block, args.calls)
+    counter_cost = per_call_seconds(lambda: counter.inc(result='ok'), args.calls)
+    print(f"{'operation':<28} {'us/call':>8}")
+    print(f"{'timed()':<28} {timed_cost * 1e6:>8.2f}")
+    print(f"{'timed() with a summary':<28} {timed_in_summary_cost * 1e6:>8.2f}")
+    print(f"{'Counter.inc()':<28} {counter_cost * 1e6:>8.2f}")
+
+    fixtures = [open(path, encoding='utf-8').read() for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html')))]
+    pages = {f"/company/company-{i}": fixtures[i % len(fixtures)] for i in range(args.pages)}
+    params = {'max_results': args.pages, 'sleep_time': 0, 'concurrency': args.concurrency, 'rescrape_after_days': 0}
+    with StandInServer(latency=args.latency, pages=pages) as server, tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context(), collect_timings() as timings:
+            count = sum(1 for _ in stream_scrape(params, search_func=lambda query: server.company_urls(args.pages)))
+    summary = timings.to_dict()
+    samples = sum(entry['count'] for entry in summary['stages'].values())
+    # Counters are bumped a few times per page on top of the stage samples
+    overhead = samples * timed_in_summary_cost + count * 6 * counter_cost
+
+    print()
+    print(f"{count} pages, {args.concurrency} workers, {args.latency * 1000:.0f} ms latency")
+    print(format_timings(summary))
+    print(f"{samples} stage samples, ~{overhead * 1000:.1f} ms of instrumentation "
+          f"({overhead / summary['wall_seconds']:.2%} of wall time)")
+    buckets = sum(1 for line in REGISTRY.render().splitlines() if line.startswith(f'{STAGE_SECONDS.name}_bucket'))
+    print(f"/metrics exposes {buckets} histogram buckets")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark NLP enrichment with and without the description-hash cache
+
+Runs the same batches three times: without a cache, against an empty cache and
+again once the cache is warm, as a repeat scrape of the same companies would.
+--changed re-words that fraction of the descriptions before the warm run.
+
+Usage: python -m benchmarks.bench_nlp_cache [--rows 5000] [--batch_size 25] [--changed 0.1]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from benchmarks.bench_db_save import create_bench_app
+from benchmarks.bench_nlp import synthetic_descriptions
+from models import DatabaseEnrichmentCache
+from utils.nlp_processor import (
+    NLP_COLUMNS, NLP_PIPELINE_VERSION, MemoryEnrichmentCache, enrich_records, enrichment_cache_stats
+)
+
+def enrich_in_batches(descriptions, batch_size, cache):
+    records = [{'description': text} for text in descriptions]
+    for start in range(0, len(records), batch_size):
+        enrich_records(records[start:start + batch_size], cache=cache)
+    return records
+
+def main():
+    parser = argparse.ArgumentParser(description='NLP enrichment cache benchmark')
+    parser.add_argument('--rows', type=int, default=5000, help='Descriptions to enrich')
+    parser.add_argument('--batch_size', type=int, default=25, help='Records per enrich_records call')
+    parser.add_argument('--changed', type=float, default=0.1, help='Fraction re-worded before the warm run')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    descriptions = synthetic_descriptions(args.rows).tolist()
+    step = max(1, round(1 / args.changed)) if args.changed else 0
+    repeat = [text + ' updated' if step and i % step == 0 else text for i, text in enumerate(descriptions)]
+
+    print(f"{args.rows} descriptions, batches of {args.batch_size}")
+    print(f"{'cache':<10} {'run':<6} {'seconds':>8} {'rows/sec':>10} {'hit rate':>9} {'speedup':>8}")
+    reference = [{column: record[column] for column in NLP_COLUMNS}
+                 for record in enrich_in_batches(repeat, args.batch_size, None)]
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'nlp_cache.db'))
+        with app.app_context():
+            for label, cache in (('none', None), ('memory', MemoryEnrichmentCache()),
+                                 ('database', DatabaseEnrichmentCache(NLP_PIPELINE_VERSION))):
+                baseline = None
+                for run, texts in (('cold', descriptions), ('warm', repeat)):
+                    before = enrichment_cache_stats()
+                    start = time.perf_counter()
+                    records = enrich_in_batches(texts, args.batch_size, cache)
+                    elapsed = time.perf_counter() - start
+                    after = enrichment_cache_stats()
+                    looked_up = (after['hits'] + after['misses']) - (before['hits'] + before['misses'])
+                    hit_rate = (after['hits'] - before['hits']) / looked_up if looked_up else 0.0
+                    baseline = baseline or elapsed
+                    if run == 'warm' and [{column: record[column] for column in NLP_COLUMNS}
+                                          for record in records] != reference:
+                        print(f"MISMATCH with {label} cache")
+                    print(f"{label:<10} {run:<6} {elapsed:>8.2f} {len(texts) / elapsed:>10.0f} "
+                          f"{hit_rate:>8.0%} {baseline / elapsed:>8.1f}")
+
+if __name__ == '__main__':
+    main()
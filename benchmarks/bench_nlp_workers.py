@@ -0,0 +1,41 @@
+"""
+Benchmark process_descriptions scaling across worker processes
+
+Usage: python -m benchmarks.bench_nlp_workers [--rows 100000] [--workers 1,2,4,8]
+"""
+import argparse
+import logging
+import os
+import time
+
+import pandas as pd
+
+from benchmarks.bench_nlp import synthetic_descriptions
+from utils.nlp_processor import process_descriptions
+
+def main():
+    parser = argparse.ArgumentParser(description='NLP multiprocess scaling benchmark')
+    parser.add_argument('--rows', type=int, default=100000, help='Descriptions to process')
+    parser.add_argument('--workers', type=str, default='1,2,4,8', help='Comma-separated worker counts')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    df = pd.DataFrame({'description': synthetic_descriptions(args.rows)})
+
+    print(f"{args.rows} descriptions on {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'seconds':>8} {'rows/sec':>10} {'speedup':>8}")
+    baseline = None
+    reference = None
+    for workers in [int(w) for w in args.workers.split(',')]:
+        start = time.perf_counter()
+        result = process_descriptions(df.copy(), workers=workers)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        if reference is None:
+            reference = result
+        elif not result.equals(reference):
+            print(f"MISMATCH at {workers} workers")
+        print(f"{workers:>8} {elapsed:>8.2f} {args.rows / elapsed:>10.0f} {baseline / elapsed:>8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Profile an offline replay of a scrape and measure what each profiler costs
+
+Fills a temporary HTTP cache from the stand-in server, stops the server, then
+replays the full pipeline (parse, classify, NLP, save) from the cache with no
+profiler, with sampling and with cProfile. Prints the wall time of each run and
+where the profiled time went by component.
+
+Usage: python -m benchmarks.bench_profile [--pages 200] [--concurrency 4]
+"""
+import argparse
+import glob
+import logging
+import os
+import tempfile
+import time
+from contextlib import nullcontext
+
+from benchmarks.bench_db_save import create_bench_app
+from benchmarks.bench_html_extract import FIXTURE_DIR
+from benchmarks.stand_in_server import StandInServer
+from pipeline import stream_scrape
+from utils.http_client import configure_cache
+from utils.profiling import PROFILERS, profile_run
+
+def main():
+    parser = argparse.ArgumentParser(description='Profiler overhead benchmark')
+    parser.add_argument('--pages', type=int, default=200, help='Company pages to replay')
+    parser.add_argument('--concurrency', type=int, default=4, help='Fetch workers')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    fixtures = [open(path, encoding='utf-8').read() for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html')))]
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_cache(path=os.path.join(tmp, 'http_cache.db'))
+        params = {'max_results': args.pages, 'sleep_time': 0, 'concurrency': args.concurrency, 'rescrape_after_days': 0}
+        with StandInServer(latency=0.005) as server:
+            # Unique pages so replays can't reuse each other's NLP results by accident
+            server.pages = {
+                f"/company/company-{i}": fixtures[i % len(fixtures)].replace('</body>', f'<p>{i}</p></body>')
+                for i in range(args.pages)
+            }
+            urls = server.company_urls(args.pages)
+            app = create_bench_app(os.path.join(tmp, 'warm.db'))
+            with app.app_context():
+                sum(1 for _ in stream_scrape(dict(params, cache_mode='refresh'), search_func=lambda query: urls))
+
+        # The server is gone: everything below is served from the cache
+        print(f"{args.pages} cached pages replayed offline, {args.concurrency} workers")
+        print(f"{'profiler':<10} {'rows':>6} {'seconds':>8} {'slowdown':>9}  top components")
+        baseline = None
+        for profiler in (None,) + PROFILERS:
+            app = create_bench_app(os.path.join(tmp, f"{profiler}.db"))
+            profiling = (
+                profile_run(f"replay-{profiler}", profiler=profiler, output_dir=os.path.join(tmp, 'profiles'))
+                if profiler else nullcontext()
+            )
+            with app.app_context():
+                start = time.perf_counter()
+                with profiling as profile:
+                    rows = sum(1 for _ in stream_scrape(
+                        dict(params, cache_mode='offline'), search_func=lambda query: urls
+                    ))
+                elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            components = ''
+            if profile is not None:
+                total = profile.summary['total_seconds'] or 1.0
+                components = ', '.join(
+                    f"{name} {seconds / total:.0%}" for name, seconds in list(profile.summary['components'].items())[:5]
+                )
+            print(f"{profiler or 'none':<10} {rows:>6} {elapsed:>8.2f} {elapsed / baseline:>8.2f}x  {components}")
+
+if __name__ == '__main__':
+    main()
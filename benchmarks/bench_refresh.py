@@ -0,0 +1,79 @@
+"""
+Benchmark the staleness refresh against re-scraping every stored company
+
+Seeds a database from the stand-in server, ages every row past the cut-off,
+changes a fraction of the pages, then refreshes with both approaches.
+
+Usage: python -m benchmarks.bench_refresh [--companies 500] [--changed 0.1] [--budget 500]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from benchmarks.bench_db_save import create_bench_app
+from benchmarks.stand_in_server import COMPANY_TEMPLATE, StandInServer
+from leads import scrape_company_pages
+from models import Company, db, upsert_companies
+from refresh import refresh_companies
+from utils.http_client import configure_cache
+from utils.nlp_processor import enrich_records
+
+def company_pages(count, changed=()):
+    pages = {}
+    for i in range(count):
+        slug = f"company-{i}"
+        page = COMPANY_TEMPLATE.format(name=slug.replace('-', ' ').title(), slug=slug)
+        if i in changed:
+            page = page.replace('Founded 2016', 'Founded 2017')
+        pages[f"/company/{slug}"] = page
+    return pages
+
+def rescrape_all(urls, concurrency):
+    """
+    Fetch, enrich and upsert every stored company
+    """
+    records = scrape_company_pages(urls, concurrency=concurrency)
+    upsert_companies(enrich_records(records))
+    return {'fetched': len(records), 'changed': len(records)}
+
+def main():
+    parser = argparse.ArgumentParser(description='Staleness refresh benchmark')
+    parser.add_argument('--companies', type=int, default=500, help='Companies stored')
+    parser.add_argument('--changed', type=float, default=0.1, help='Fraction of pages that changed')
+    parser.add_argument('--budget', type=int, default=500, help='Refresh budget per run')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent page fetches')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    configure_cache(enabled=False)
+    changed = set(range(0, args.companies, max(1, round(1 / args.changed)))) if args.changed else set()
+
+    print(f"{args.companies} companies, {len(changed)} changed pages")
+    print(f"{'path':<16} {'fetched':>8} {'saved':>6} {'seconds':>8}")
+    with StandInServer(latency=0.005, pages=company_pages(args.companies)) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        urls = server.company_urls(args.companies)
+        for label in ('re-scrape all', 'refresh'):
+            app = create_bench_app(os.path.join(tmp, f"{label}.db"))
+            with app.app_context():
+                server.pages = company_pages(args.companies)
+                upsert_companies(enrich_records(scrape_company_pages(urls, concurrency=args.concurrency)))
+                db.session.execute(update(Company).values(scraped_at=datetime.now() - timedelta(days=40)))
+                db.session.commit()
+                server.pages = company_pages(args.companies, changed)
+
+                start = time.perf_counter()
+                if label == 'refresh':
+                    stats = refresh_companies(budget=args.budget, concurrency=args.concurrency, sleep_time=0)
+                else:
+                    stats = rescrape_all(urls, args.concurrency)
+                elapsed = time.perf_counter() - start
+            print(f"{label:<16} {stats['fetched']:>8} {stats['changed']:>6} {elapsed:>8.2f}")
+
+if __name__ == '__main__':
+    main()
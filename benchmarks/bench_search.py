@@ -0,0 +1,139 @@
+"""
+Benchmark full-text search latency against a LIKE scan
+
+Seeds a SQLite database with synthetic companies whose descriptions draw on a
+Zipf-distributed vocabulary (the sample leads' words plus generated ones), so
+queries range from terms in most rows to terms in a handful. Builds the FTS5
+index, then reports p50/p95 latency of search_companies() per query type, one
+LIKE scan per query for comparison, and the cost of saving a scrape batch
+before and after the index (and its triggers) exist.
+
+Usage: python -m benchmarks.bench_search [--rows 1000000] [--repeat 20]
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+from itertools import product
+
+import pandas as pd
+from sqlalchemy import and_, func, insert, or_, select
+
+from benchmarks.bench_db_save import create_bench_app, synthetic_records
+from benchmarks.bench_nlp import SAMPLE_CSV
+from company_search import create_search_index, search_companies
+from models import Company, db, upsert_companies
+from utils.metrics import percentile
+
+SYLLABLES = ('ka', 'lo', 'mi', 'ne', 'ru', 'ta', 'vo', 'zi', 'pe', 'sha', 'dro', 'lin', 'tor', 'qua', 'ben', 'fex')
+SAVE_BATCH = 25
+
+def vocabulary(seed=42):
+    """
+    Sample-lead words first, then generated words; weight 1/rank (Zipf)
+    """
+    sample = pd.read_csv(SAMPLE_CSV)['description'].dropna().tolist()
+    words = list(dict.fromkeys(word.strip('.,|&;:()').lower() for word in ' '.join(sample).split()))
+    words = [word for word in words if word.isalpha()]
+    generated = [''.join(parts) for parts in product(SYLLABLES, repeat=3)]
+    random.Random(seed).shuffle(generated)
+    words += generated
+    weights = [1.0 / rank for rank in range(1, len(words) + 1)]
+    return words, weights
+
+def seed(rows, words, weights, chunk=20000, seed=42):
+    rng = random.Random(seed)
+    cumulative = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        cumulative.append(total)
+    now = datetime.now()
+    for start in range(0, rows, chunk):
+        db.session.execute(insert(Company), [
+            {
+                'name': f"{' '.join(rng.choices(words, cum_weights=cumulative, k=2)).title()} {i}",
+                'description': ' '.join(rng.choices(words, cum_weights=cumulative, k=rng.randint(20, 80))),
+                'linkedin_url': f"https://linkedin.com/company/company-{i}",
+                'domain_class': ('IT Services', 'Software', 'Finance', 'Healthcare')[i % 4],
+                'keywords': ', '.join(rng.choices(words[:300], k=3)),
+                'technologies': 'cloud, ai',
+                'scraped_at': now,
+            }
+            for i in range(start, min(start + chunk, rows))
+        ])
+    db.session.commit()
+
+def like_scan(query):
+    """
+    Rows with every term in name or description, found without the index
+    Ranking needs all of them, so this scans the whole table (and, matching
+    substrings, counts a few more rows than the index does)
+    """
+    terms = [term.strip('"*') for term in query.split()]
+    conditions = [or_(Company.name.ilike(f"%{term}%"), Company.description.ilike(f"%{term}%")) for term in terms]
+    return db.session.execute(select(func.count()).select_from(Company).where(and_(*conditions))).scalar()
+
+def time_saves(batches, offset):
+    durations = []
+    for batch in range(batches):
+        records = synthetic_records(SAVE_BATCH, offset=offset + batch * SAVE_BATCH)
+        start = time.perf_counter()
+        upsert_companies(records)
+        durations.append(time.perf_counter() - start)
+    return sorted(durations)
+
+def main():
+    parser = argparse.ArgumentParser(description='Full-text search benchmark')
+    parser.add_argument('--rows', type=int, default=1000000, help='Companies in the table')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs of each search query')
+    parser.add_argument('--save_batches', type=int, default=40, help=f"Batches of {SAVE_BATCH} saved before/after indexing")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    words, weights = vocabulary()
+    queries = {
+        'common word': words[0],
+        'mid word': words[300],
+        'rare word': words[3000],
+        'rarest word': words[-1],
+        'two words': f"{words[5]} {words[300]}",
+        'phrase': f'"{words[0]} {words[1]}"',
+        'prefix': words[300][:4] + '*',
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            start = time.perf_counter()
+            seed(args.rows, words, weights)
+            print(f"Seeded {args.rows} companies in {time.perf_counter() - start:.1f}s")
+
+            before = time_saves(args.save_batches, offset=args.rows)
+            start = time.perf_counter()
+            with db.engine.begin() as connection:
+                create_search_index(connection)
+            print(f"Built the FTS5 index in {time.perf_counter() - start:.1f}s")
+            after = time_saves(args.save_batches, offset=args.rows + args.save_batches * SAVE_BATCH)
+            print(f"Saving {SAVE_BATCH} new companies: p50 {percentile(before, 50) * 1000:.1f} ms without the index, "
+                  f"{percentile(after, 50) * 1000:.1f} ms with it")
+
+            print(f"\n{'query':<12} {'terms':<22} {'matches':>8} {'p50 ms':>8} {'p95 ms':>8} {'LIKE ms':>9}")
+            for label, query in queries.items():
+                durations = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    search_companies(query)
+                    durations.append(time.perf_counter() - start)
+                durations.sort()
+                start = time.perf_counter()
+                matches = like_scan(query)
+                like_ms = (time.perf_counter() - start) * 1000
+                print(f"{label:<12} {query:<22} {matches:>8} {percentile(durations, 50) * 1000:>8.2f} "
+                      f"{percentile(durations, 95) * 1000:>8.2f} {like_ms:>9.1f}")
+
+if __name__ == '__main__':
+    main()
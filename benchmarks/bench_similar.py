@@ -0,0 +1,116 @@
+"""
+Benchmark similar-company lookups over the memory-mapped vector index
+
+Seeds companies with random descriptions, domain classes and technologies,
+counts their term stats and builds the index the way `flask similar-index
+--rebuild` does. Then times, for random companies: the index search alone
+(one query, and a batch of queries scored together), the same search as one
+unchunked product with a full sort, and the whole lookup behind
+/api/companies/<id>/similar (embedding the company, searching, reading the
+results back).
+
+Usage: python -m benchmarks.bench_similar [--rows 100000] [--queries 200]
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import insert
+
+from benchmarks.bench_db_save import create_bench_app
+from benchmarks.bench_search import vocabulary
+from keywords import rebuild_term_stats
+from models import Company, db
+from similar import get_index, rebuild_similar_index, similar_companies
+from utils.metrics import percentile
+
+DOMAIN_CLASSES = ('IT Services', 'Software', 'Finance', 'Healthcare', 'Consulting', 'Marketing', None)
+TECHNOLOGIES = ('cloud', 'ai', 'machine learning', 'blockchain', 'saas', 'data', 'analytics', 'security', 'mobile')
+QUERY_BATCH = 32
+
+def seed(rows, chunk=20000, seed=42):
+    words, weights = vocabulary()
+    rng = random.Random(seed)
+    cumulative = np.cumsum(weights).tolist()
+    for start in range(0, rows, chunk):
+        db.session.execute(insert(Company), [
+            {
+                'name': f"Company {i}",
+                'description': ' '.join(rng.choices(words, cum_weights=cumulative, k=rng.randint(40, 120))),
+                'domain_class': rng.choice(DOMAIN_CLASSES),
+                'technologies': ', '.join(rng.sample(TECHNOLOGIES, rng.randint(0, 3))),
+                'linkedin_url': f"https://linkedin.com/company/company-{i}",
+            }
+            for i in range(start, min(start + chunk, rows))
+        ])
+    db.session.commit()
+
+def full_sort(vectors, query, k):
+    scores = vectors @ query
+    return np.argsort(-scores)[:k]
+
+def report(label, times):
+    times = sorted(times)
+    print(f"{label:<36} {percentile(times, 50) * 1000:>9.2f} {percentile(times, 95) * 1000:>9.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Similar companies benchmark')
+    parser.add_argument('--rows', type=int, default=100000, help='Companies in the table')
+    parser.add_argument('--queries', type=int, default=200, help='Lookups to time')
+    parser.add_argument('--limit', type=int, default=10, help='Similar companies per lookup')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'bench.db'))
+        app.config['SIMILAR_INDEX_PATH'] = os.path.join(tmp, 'company_vectors')
+        with app.app_context():
+            start = time.perf_counter()
+            seed(args.rows)
+            with db.engine.begin() as connection:
+                rebuild_term_stats(connection)
+            print(f"Seeded {args.rows} companies and their term stats in {time.perf_counter() - start:.1f}s")
+
+            start = time.perf_counter()
+            rebuild_similar_index()
+            elapsed = time.perf_counter() - start
+            index = get_index()
+            print(f"Embedded and indexed them in {elapsed:.1f}s ({args.rows / elapsed:.0f} companies/s), "
+                  f"{os.path.getsize(index.vectors_path) / 1e6:.0f} MB of vectors")
+
+            ids, vectors, _ = index._load()
+            rng = random.Random(7)
+            picks = [rng.randrange(args.rows) for _ in range(args.queries)]
+            k = 2 * args.limit + 1
+
+            timings = {'index search': [], 'index search, batch': [], 'unchunked product + full sort': [],
+                       'similar_companies': []}
+            for position in picks:
+                start = time.perf_counter()
+                index.nearest(vectors[position], k)
+                timings['index search'].append(time.perf_counter() - start)
+                start = time.perf_counter()
+                full_sort(vectors, vectors[position], k)
+                timings['unchunked product + full sort'].append(time.perf_counter() - start)
+                start = time.perf_counter()
+                similar_companies(int(ids[position]), limit=args.limit)
+                timings['similar_companies'].append(time.perf_counter() - start)
+            for batch_start in range(0, args.queries, QUERY_BATCH):
+                queries = vectors[picks[batch_start:batch_start + QUERY_BATCH]]
+                start = time.perf_counter()
+                index.nearest(queries, k)
+                timings['index search, batch'].append((time.perf_counter() - start) / len(queries))
+
+            print(f"{args.rows} vectors, top {args.limit}")
+            print(f"{'lookup':<36} {'p50 ms':>9} {'p95 ms':>9}")
+            report('index search', timings['index search'])
+            report(f"index search, per query of {QUERY_BATCH}", timings['index search, batch'])
+            report('unchunked product + full sort', timings['unchunked product + full sort'])
+            report('similar_companies (API lookup)', timings['similar_companies'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark the streaming pipeline against collect-then-process
+
+The buffered path is what /api/scrape used to do: scrape everything into one
+DataFrame, enrich it, save it, then serialize the whole CSV. The streaming path
+enriches, saves and emits each batch as it arrives. Reports time to the first
+row, total time and peak Python heap (tracemalloc).
+
+Usage: python -m benchmarks.bench_streaming [--pages 500] [--latency 0.01] [--concurrency 4]
+"""
+import argparse
+import glob
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.bench_db_save import create_bench_app
+from benchmarks.bench_html_extract import FIXTURE_DIR
+from benchmarks.stand_in_server import StandInServer
+from leads import run_scraper
+from models import upsert_companies
+from pipeline import RESULT_COLUMNS, stream_scrape
+from utils.csv_stream import csv_lines
+from utils.http_client import configure_cache
+from utils.nlp_processor import process_descriptions
+
+def buffered(params, search, csv_path):
+    df = run_scraper(**params, output_csv=None, search_func=search)
+    df = process_descriptions(df)
+    df.to_csv(csv_path, index=False)
+    upsert_companies(df)
+    body = df.to_csv(index=False)
+    # Nothing reaches the client until the whole body exists
+    yield body
+
+def streaming(params, search, csv_path):
+    yield from csv_lines(stream_scrape(params, search_func=search, output_csv=csv_path), RESULT_COLUMNS)
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming pipeline benchmark')
+    parser.add_argument('--pages', type=int, default=500, help='Company pages to scrape')
+    parser.add_argument('--latency', type=float, default=0.01, help='Stand-in server latency (seconds)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Fetch workers')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    # Measure fetching, not the response cache
+    configure_cache(enabled=False)
+    fixtures = [open(path, encoding='utf-8').read() for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html')))]
+    pages = {f"/company/company-{i}": fixtures[i % len(fixtures)] for i in range(args.pages)}
+    params = {'max_results': args.pages, 'sleep_time': 0, 'concurrency': args.concurrency}
+
+    print(f"{args.pages} pages, {args.concurrency} workers, {args.latency * 1000:.0f} ms latency")
+    print(f"{'path':<12} {'first row s':>12} {'total s':>8} {'peak MB':>8}")
+    with StandInServer(latency=args.latency, pages=pages) as server:
+        search = lambda query: server.company_urls(args.pages)
+        for label, run in [('buffered', buffered), ('streaming', streaming)]:
+            with tempfile.TemporaryDirectory() as tmp:
+                app = create_bench_app(os.path.join(tmp, 'bench.db'))
+                with app.app_context():
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    first_row = None
+                    chunks = run(params, search, os.path.join(tmp, 'out.csv'))
+                    next(chunks)  # the streaming path emits its header before any work
+                    for chunk in chunks:
+                        if first_row is None:
+                            first_row = time.perf_counter() - start
+                    if first_row is None:
+                        first_row = time.perf_counter() - start
+                    elapsed = time.perf_counter() - start
+                    peak = tracemalloc.get_traced_memory()[1] / 1e6
+                    tracemalloc.stop()
+            print(f"{label:<12} {first_row:>12.3f} {elapsed:>8.2f} {peak:>8.1f}")
+
+if __name__ == '__main__':
+    main()
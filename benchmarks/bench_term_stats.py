@@ -0,0 +1,99 @@
+"""
+Benchmark incremental TF-IDF term stats against recounting the corpus
+
+Grows a company table through a series of checkpoints. At each one it times
+enriching batches of new descriptions against the term_stat table (look up the
+batch's document frequencies, add the batch to them), which is what a scrape
+pays per batch, and a full recount of every stored description, which is what
+keeping exact corpus stats without the table would cost per batch.
+
+Usage: python -m benchmarks.bench_term_stats [--checkpoints 10000,50000,100000]
+"""
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.bench_db_save import create_bench_app
+from benchmarks.bench_search import vocabulary
+from keywords import rebuild_term_stats
+from models import Company, DatabaseTermStats, TermStat, db
+from utils.metrics import percentile
+from utils.nlp_processor import enrich_records
+
+BATCH_SIZE = 25
+
+class Descriptions:
+    """Zipf-distributed random descriptions, so new batches keep bringing rare terms"""
+    def __init__(self, seed=42):
+        self.words, weights = vocabulary()
+        self.rng = random.Random(seed)
+        self.cumulative = []
+        total = 0.0
+        for weight in weights:
+            total += weight
+            self.cumulative.append(total)
+
+    def next(self):
+        return ' '.join(self.rng.choices(self.words, cum_weights=self.cumulative, k=self.rng.randint(40, 120)))
+
+def grow(descriptions, start, end, chunk=20000):
+    now = datetime.now()
+    for offset in range(start, end, chunk):
+        db.session.execute(insert(Company), [
+            {'name': f"Company {i}", 'description': descriptions.next(),
+             'linkedin_url': f"https://linkedin.com/company/company-{i}", 'scraped_at': now}
+            for i in range(offset, min(offset + chunk, end))
+        ])
+    db.session.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental term stats benchmark')
+    parser.add_argument('--checkpoints', type=str, default='10000,50000,100000',
+                        help='Comma-separated corpus sizes to measure at')
+    parser.add_argument('--batches', type=int, default=20, help=f"Batches of {BATCH_SIZE} to time per checkpoint")
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    descriptions = Descriptions()
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_bench_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            stats = DatabaseTermStats()
+            print(f"{'corpus':>8} {'terms':>8} {'batch p50 ms':>13} {'batch p95 ms':>13} "
+                  f"{'in-batch ms':>12} {'recount s':>10}")
+            size = 0
+            for checkpoint in [int(c) for c in args.checkpoints.split(',')]:
+                grow(descriptions, size, checkpoint)
+                size = checkpoint
+
+                start = time.perf_counter()
+                with db.engine.begin() as connection:
+                    rebuild_term_stats(connection)
+                recount = time.perf_counter() - start
+                terms = db.session.execute(select(func.count()).select_from(TermStat)).scalar()
+
+                corpus_times = []
+                batch_times = []
+                for _ in range(args.batches):
+                    batch = [{'description': descriptions.next()} for _ in range(BATCH_SIZE)]
+                    start = time.perf_counter()
+                    enrich_records([dict(record) for record in batch], term_stats=stats)
+                    corpus_times.append(time.perf_counter() - start)
+                    # Reference: scored against the batch alone, as before the corpus stats
+                    start = time.perf_counter()
+                    enrich_records(batch)
+                    batch_times.append(time.perf_counter() - start)
+                corpus_times.sort()
+                batch_times.sort()
+                print(f"{size:>8} {terms:>8} {percentile(corpus_times, 50) * 1000:>13.1f} "
+                      f"{percentile(corpus_times, 95) * 1000:>13.1f} {percentile(batch_times, 50) * 1000:>12.1f} "
+                      f"{recount:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Local stand-in for LinkedIn company pages, used by the benchmarks
+Serves /company/<slug> with a fixed artificial latency so runs are repeatable
+"""
+import hashlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPANY_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<title>{name} | LinkedIn</title>
+<meta name="description" content="{name} | 1,234 followers on LinkedIn. {name} is a leading provider of cloud software and data analytics services.">
+</head>
+<body>
+<h1>{name}</h1>
+<a href="https://www.{slug}.example.com">Visit website</a>
+<p>51-200 employees</p>
+<span>Headquarters: London, England</span>
+<p>Founded 2016</p>
+</body>
+</html>
+"""
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        server.count_request()
+
+        page = server.pages.get(self.path) if server.pages else None
+        if page is None and server.page_factory is not None:
+            page = server.page_factory(self.path)
+        if page is None and self.path.startswith('/company/'):
+            slug = self.path.split('/')[2]
+            page = COMPANY_TEMPLATE.format(name=slug.replace('-', ' ').title(), slug=slug)
+        if page is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = page.encode('utf-8')
+        etag = f'"{hashlib.md5(body).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        server.count_bytes(len(body))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Keep benchmark output readable
+        pass
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0.0, pages=None, host='127.0.0.1', port=0, page_factory=None):
+        super().__init__((host, port), StandInHandler)
+        self.latency = latency
+        self.pages = pages
+        # path -> page body or None; builds pages on request when there are too many to hold
+        self.page_factory = page_factory
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def count_bytes(self, size):
+        with self._lock:
+            self.bytes_sent += size
+
+    def company_urls(self, count):
+        return [f"{self.base_url}/company/company-{i}" for i in range(count)]
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
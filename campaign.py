@@ -0,0 +1,189 @@
+"""
+Campaign mode: fan one wide search out into many narrow sub-queries
+
+Google caps the results of a single query, so a campaign crosses keyword lists,
+founded years, countries and sizes into one sub-query per combination. The
+sub-queries are searched with bounded concurrency, their URLs are merged and
+deduplicated, and every company is fetched once through a single pipeline.
+Per-sub-query stats show which combinations actually find new companies.
+
+A campaign spec lives under "campaign" in scraper_config.json, e.g.
+    "campaign": {
+        "keywords": ["IT services", "cloud consulting"],
+        "founded_years": ["2015", "2016", "2017"],
+        "countries": ["United kingdom", "Ireland"],
+        "sizes": ["11-50", "51-200"],
+        "max_results_per_query": 20
+    }
+Missing lists fall back to the top-level keywords/founded_years/country/size.
+"""
+import csv
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+
+from leads import (
+    build_search_query, iter_company_pages, load_config, log_cache_stats, rate_from_sleep, search_company_urls
+)
+from pipeline import DEFAULT_RESCRAPE_AFTER_DAYS, skip_known_filter, stream_records
+from utils.metrics import in_context
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_CONCURRENCY = 2
+DEFAULT_MAX_RESULTS_PER_QUERY = 20
+
+STATS_COLUMNS = (
+    'query', 'keywords', 'founded_year', 'country', 'size', 'found', 'new', 'duplicates',
+    'skipped', 'scraped', 'search_seconds', 'error'
+)
+
+def _as_list(value):
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+def plan_campaign(spec, config=None):
+    """
+    Expand a campaign spec into sub-query parameter dicts, one founded year each
+    """
+    config = config or {}
+    keywords = _as_list(spec.get('keywords')) or _as_list(config.get('keywords', 'IT services'))
+    years = _as_list(spec.get('founded_years')) or _as_list(config.get('founded_years', ['2015']))
+    countries = _as_list(spec.get('countries')) or _as_list(config.get('country', 'United kingdom'))
+    sizes = _as_list(spec.get('sizes')) or _as_list(config.get('size', '51-200'))
+    return [
+        {'keywords': keyword, 'founded_years': [year], 'country': country, 'size': size}
+        for keyword, year, country, size in product(keywords, years, countries, sizes)
+    ]
+
+def search_campaign(plan, max_results=DEFAULT_MAX_RESULTS_PER_QUERY, search_func=None,
+                    concurrency=DEFAULT_SEARCH_CONCURRENCY, cache_mode='default'):
+    """
+    Run every sub-query search, at most `concurrency` at a time
+    Returns (unique URLs, URL -> index of the sub-query that found it first, stats per sub-query).
+    URLs are credited in plan order, so results don't depend on which search finished first
+    """
+    def run(sub_query):
+        query = build_search_query(sub_query['keywords'], sub_query['founded_years'], sub_query['country'], sub_query['size'])
+        start = time.perf_counter()
+        try:
+            urls = search_company_urls(query, max_results, search_func=search_func, cache_mode=cache_mode)
+            error = None
+        except Exception as e:
+            logger.error(f"Search failed for {query}: {str(e)}")
+            urls, error = [], str(e)
+        return query, urls, time.perf_counter() - start, error
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix='campaign-search') as executor:
+        searches = [future.result() for future in [executor.submit(in_context(run), sub_query) for sub_query in plan]]
+
+    owners = {}
+    stats = []
+    for index, (sub_query, (query, urls, seconds, error)) in enumerate(zip(plan, searches)):
+        new = 0
+        for url in urls:
+            if url not in owners:
+                owners[url] = index
+                new += 1
+        stats.append({
+            'query': query,
+            'keywords': sub_query['keywords'],
+            'founded_year': sub_query['founded_years'][0],
+            'country': sub_query['country'],
+            'size': sub_query['size'],
+            'found': len(urls),
+            'new': new,
+            'duplicates': len(urls) - new,
+            'skipped': 0,
+            'scraped': 0,
+            'search_seconds': round(seconds, 3),
+            'error': error
+        })
+    return list(owners), owners, stats
+
+def iter_campaign(
+    spec=None,
+    config_path='scraper_config.json',
+    max_results=None,
+    search_concurrency=DEFAULT_SEARCH_CONCURRENCY,
+    user_agent='Mozilla/5.0',
+    timeout=10,
+    sleep_time=1.0,
+    search_func=None,
+    concurrency=1,
+    rate_limit=None,
+    cache_mode='default',
+    url_filter=None,
+    stats=None,
+    base_url=None
+):
+    """
+    Search all sub-queries of a campaign, then scrape the merged URLs once
+    Yields scraped records; pass a list as `stats` to receive the per-sub-query stats
+    `base_url` (or "linkedin_base_url" in the config) fetches company pages from another host
+    """
+    config = load_config(config_path)
+    spec = spec if spec is not None else config.get('campaign', {})
+    base_url = base_url or config.get('linkedin_base_url')
+    plan = plan_campaign(spec, config)
+    max_results = max_results or spec.get('max_results_per_query', DEFAULT_MAX_RESULTS_PER_QUERY)
+    logger.info(f"Campaign: {len(plan)} sub-queries, up to {max_results} results each")
+
+    urls, owners, sub_stats = search_campaign(
+        plan, max_results, search_func=search_func, concurrency=search_concurrency, cache_mode=cache_mode
+    )
+    if stats is not None:
+        stats[:] = sub_stats
+    if url_filter is not None:
+        kept = set(url_filter(urls))
+        for url in urls:
+            if url not in kept:
+                sub_stats[owners[url]]['skipped'] += 1
+        urls = [url for url in urls if url in kept]
+    logger.info(f"Campaign: {len(owners)} unique companies found, {len(urls)} to scrape")
+
+    for data in iter_company_pages(
+        urls,
+        user_agent=user_agent,
+        timeout=timeout,
+        concurrency=concurrency,
+        rate_limit=rate_limit if rate_limit is not None else rate_from_sleep(sleep_time),
+        cache_mode=cache_mode,
+        base_url=base_url
+    ):
+        owner = owners.get(data['companyLinkedinUrl'])
+        if owner is not None:
+            sub_stats[owner]['scraped'] += 1
+        yield data
+    log_cache_stats()
+
+def stream_campaign(spec=None, output_csv=None, persist=True, rescrape_after_days=DEFAULT_RESCRAPE_AFTER_DAYS,
+                    totals=None, stats=None, **kwargs):
+    """
+    iter_campaign fed through the streaming enrich/save/CSV pipeline
+    Needs an app context when `persist` is set
+    """
+    url_filter = skip_known_filter(rescrape_after_days) if persist else None
+    records = iter_campaign(spec, url_filter=url_filter, stats=stats, **kwargs)
+    yield from stream_records(records, output_csv=output_csv, persist=persist, totals=totals)
+
+def write_stats_csv(stats, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=STATS_COLUMNS)
+        writer.writeheader()
+        writer.writerows(stats)
+
+def format_stats(stats):
+    """
+    Text table of sub-query yields, most productive first
+    """
+    lines = [f"{'keywords':<24} {'year':>5} {'country':<16} {'size':<10} {'found':>6} {'new':>5} {'dupes':>6} {'skip':>5} {'scraped':>8} {'secs':>6}"]
+    for row in sorted(stats, key=lambda row: (-row['scraped'], -row['new'])):
+        lines.append(
+            f"{row['keywords'][:24]:<24} {row['founded_year']:>5} {row['country'][:16]:<16} {row['size'][:10]:<10} "
+            f"{row['found']:>6} {row['new']:>5} {row['duplicates']:>6} {row['skipped']:>5} {row['scraped']:>8} "
+            f"{row['search_seconds']:>6.2f}"
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,159 @@
+"""
+Server-side filtering, sorting and keyset pagination over the Company table
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_, select
+
+from models import Company, db, parse_founded_year
+
+# Columns shown in list views; description is deliberately left out
+LIST_FIELDS = (
+    'id', 'name', 'domain', 'domain_class', 'technologies', 'keywords', 'location',
+    'founded', 'sentiment', 'scraped_at', 'linkedin_url', 'website'
+)
+
+SORT_FIELDS = ('id', 'name', 'domain_class', 'founded', 'scraped_at')
+FILTER_FIELDS = ('name', 'domain_class', 'sentiment', 'founded')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def parse_filters(args):
+    """
+    Pick the supported, non-empty filters out of request args
+    """
+    return {field: args.get(field, '').strip() for field in FILTER_FIELDS if args.get(field, '').strip()}
+
+def apply_filters(statement, filters):
+    """
+    Add WHERE clauses for name (case-insensitive prefix), domain_class, sentiment
+    and founded year; each one can be served by an index
+    Raises ValueError when founded is not a year
+    """
+    if filters.get('name'):
+        # A range over lower(name) rather than LIKE, which only SQLite's NOCASE indexes can serve
+        prefix = filters['name'].lower()
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        statement = statement.where(func.lower(Company.name) >= prefix, func.lower(Company.name) < upper)
+    if filters.get('domain_class'):
+        statement = statement.where(Company.domain_class == filters['domain_class'])
+    if filters.get('sentiment'):
+        statement = statement.where(Company.sentiment == filters['sentiment'])
+    if filters.get('founded'):
+        year = parse_founded_year(str(filters['founded']))
+        if year is None:
+            raise ValueError("founded must be a year, e.g. 2016")
+        statement = statement.where(Company.founded_year == year)
+    return statement
+
+def encode_cursor(sort_value, company_id):
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, company_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor, sort):
+    """
+    Return (sort value, id) from a cursor token; raises ValueError if malformed
+    The sort value is None when the last row had no value for the sort column
+    """
+    try:
+        sort_value, company_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if sort == 'scraped_at' and sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(company_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def row_to_dict(row):
+    """
+    Convert a selected row into the same keys Company.to_dict() uses
+    """
+    data = dict(row._mapping)
+    if 'linkedin_url' in data:
+        data['companyLinkedinUrl'] = data.pop('linkedin_url')
+    if data.get('scraped_at') is not None:
+        data['scraped_at'] = data['scraped_at'].strftime('%Y-%m-%d %H:%M:%S')
+    return data
+
+def _after(column, sort_value, last_id, descending):
+    """Rows past (sort_value, last_id); the outer bound lets the index seek straight to them"""
+    if column is Company.id:
+        return Company.id < last_id if descending else Company.id > last_id
+    after_id = Company.id < last_id if descending else Company.id > last_id
+    if descending:
+        return and_(column <= sort_value, or_(column < sort_value, after_id))
+    return and_(column >= sort_value, or_(column > sort_value, after_id))
+
+def _page_segments(base, sort, descending, cursor):
+    """
+    The statements that read a page, in order. Rows with no sort value sort
+    lowest, so they come first ascending and last descending. Each statement
+    orders by the raw column and id and seeks past the cursor with plain
+    comparisons, so the column's index serves both the WHERE and the ORDER BY
+    """
+    column = getattr(Company, sort)
+    id_order = Company.id.desc() if descending else Company.id.asc()
+    values = base.order_by(column.desc() if descending else column.asc(), id_order)
+    if not column.nullable:
+        return [values.where(_after(column, *cursor, descending)) if cursor else values]
+
+    values = values.where(column.isnot(None))
+    nulls = base.where(column.is_(None)).order_by(id_order)
+    if not cursor:
+        return [values, nulls] if descending else [nulls, values]
+    sort_value, last_id = cursor
+    if sort_value is None:
+        # Still in the NULL rows; ascending, all the values come after them
+        nulls = nulls.where(_after(Company.id, None, last_id, descending))
+        return [nulls] if descending else [nulls, values]
+    values = values.where(_after(column, sort_value, last_id, descending))
+    return [values, nulls] if descending else [values]
+
+def list_companies(filters=None, sort='id', direction='asc', cursor=None, limit=DEFAULT_PAGE_SIZE, fields=LIST_FIELDS):
+    """
+    Return one page of companies and the cursor for the next page (None at the end)
+    Pages are keyed on (sort column, id), so deep pages cost the same as the first
+    """
+    if sort not in SORT_FIELDS:
+        raise ValueError(f"Cannot sort by {sort}")
+    unknown = [field for field in fields if field not in LIST_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    descending = direction == 'desc'
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    columns = [getattr(Company, field) for field in fields]
+    base = select(*columns, getattr(Company, sort).label('_sort_value'), Company.id.label('_id'))
+    base = apply_filters(base, filters or {})
+    segments = _page_segments(base, sort, descending, decode_cursor(cursor, sort) if cursor else None)
+
+    # Fetch one extra row to know whether another page exists
+    rows = []
+    for statement in segments:
+        rows.extend(db.session.execute(statement.limit(limit + 1 - len(rows))).fetchall())
+        if len(rows) > limit:
+            break
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]._mapping
+        next_cursor = encode_cursor(last['_sort_value'], last['_id'])
+
+    companies = []
+    for row in rows:
+        data = row_to_dict(row)
+        data.pop('_sort_value', None)
+        data.pop('_id', None)
+        companies.append(data)
+    return companies, next_cursor
+
+def domain_class_options():
+    """
+    Distinct industry classes for the filter dropdown (served from the index)
+    """
+    statement = select(Company.domain_class).where(Company.domain_class.isnot(None)).distinct().order_by(Company.domain_class)
+    return [value for value, in db.session.execute(statement) if value]
@@ -0,0 +1,190 @@
+"""
+Ranked full-text search over company names, descriptions, keywords and technologies
+
+On SQLite (the fallback database) the text lives in an FTS5 table, company_fts,
+that indexes the company table's rows in place (external content) and is kept
+in sync by triggers. On Postgres it is a generated tsvector column with a GIN
+index. Either way the database maintains the index on every insert, update
+and delete, whatever path the write came from.
+
+Queries are plain words (all must match), "quoted phrases" and prefix* terms.
+Both backends stem English words, so "consulting" also finds "consultancy".
+"""
+import html
+import logging
+import re
+
+from sqlalchemy import column, func, literal_column, select, table, text
+
+from company_queries import apply_filters, row_to_dict
+from models import Company, db
+from utils.nlp_processor import BASIC_STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ('name', 'description', 'keywords', 'technologies')
+RESULT_FIELDS = (
+    'id', 'name', 'domain', 'domain_class', 'technologies', 'keywords', 'location',
+    'founded', 'linkedin_url', 'website'
+)
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+# Words of description around the matches in a snippet
+SNIPPET_WORDS = 16
+
+FTS_TOKENIZER = 'porter unicode61 remove_diacritics 2'
+# bm25 weight of a match in each SEARCH_FIELDS column
+FTS_WEIGHTS = (10.0, 1.0, 4.0, 4.0)
+# Postgres: name is weighted A, keywords and technologies B, description C
+TSVECTOR_EXPRESSION = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(keywords, '') || ' ' || coalesce(technologies, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+# Snippets are marked with control characters, escaped, then given <mark> tags
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+TERM_PATTERN = re.compile(r'"([^"]*)"|(\w+)(\*?)')
+
+fts_table = table('company_fts', column('rowid'))
+
+def create_search_index(connection):
+    """
+    Create the full-text index for the connection's database and fill it from existing rows
+    """
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        fields = ', '.join(SEARCH_FIELDS)
+        old_values = ', '.join(f"old.{field}" for field in SEARCH_FIELDS)
+        new_values = ', '.join(f"new.{field}" for field in SEARCH_FIELDS)
+        statements = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS company_fts USING fts5("
+            f"{fields}, content='company', content_rowid='id', tokenize='{FTS_TOKENIZER}')",
+            f"CREATE TRIGGER IF NOT EXISTS company_fts_insert AFTER INSERT ON company BEGIN "
+            f"INSERT INTO company_fts(rowid, {fields}) VALUES (new.id, {new_values}); END",
+            f"CREATE TRIGGER IF NOT EXISTS company_fts_delete AFTER DELETE ON company BEGIN "
+            f"INSERT INTO company_fts(company_fts, rowid, {fields}) VALUES ('delete', old.id, {old_values}); END",
+            # Only text changes touch the index; refreshes that just bump scraped_at don't
+            f"CREATE TRIGGER IF NOT EXISTS company_fts_update AFTER UPDATE OF {fields} ON company BEGIN "
+            f"INSERT INTO company_fts(company_fts, rowid, {fields}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO company_fts(rowid, {fields}) VALUES (new.id, {new_values}); END",
+            "INSERT INTO company_fts(company_fts) VALUES ('rebuild')",
+        ]
+    elif dialect == 'postgresql':
+        statements = [
+            f"ALTER TABLE company ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({TSVECTOR_EXPRESSION}) STORED",
+            "CREATE INDEX IF NOT EXISTS ix_company_search_vector ON company USING GIN (search_vector)",
+        ]
+    else:
+        logger.warning(f"Full-text search is not available on {dialect}; no search index created")
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+def rebuild_search_index():
+    """
+    Rebuild the index from the company table and compact it (SQLite merges its
+    FTS segments into one, which makes queries faster after many small writes)
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        db.session.execute(text("INSERT INTO company_fts(company_fts) VALUES ('rebuild')"))
+        db.session.execute(text("INSERT INTO company_fts(company_fts) VALUES ('optimize')"))
+    elif dialect == 'postgresql':
+        db.session.execute(text("REINDEX INDEX ix_company_search_vector"))
+    else:
+        raise ValueError(f"Full-text search is not available on {dialect}")
+    db.session.commit()
+
+def parse_query(query):
+    """
+    Split a search string into (text, is_prefix, is_phrase) terms
+    Everything but word characters is dropped, so no query syntax reaches the database.
+    Stopwords are dropped next to other terms, as Postgres does: they match
+    nearly every row, and ranking every match is what makes a search slow
+    """
+    terms = []
+    for phrase, word, star in TERM_PATTERN.findall(query or ''):
+        if phrase:
+            words = re.findall(r'\w+', phrase)
+            if words:
+                terms.append((' '.join(words), False, len(words) > 1))
+        elif word:
+            terms.append((word, bool(star), False))
+    if not terms:
+        raise ValueError("Empty search query")
+    meaningful = [term for term in terms if term[1] or term[2] or term[0].lower() not in BASIC_STOPWORDS]
+    return meaningful or terms
+
+def fts5_match(terms):
+    """FTS5 MATCH expression: quoted strings, implicitly ANDed"""
+    return ' '.join(f'"{value}"' + ('*' if prefix else '') for value, prefix, _ in terms)
+
+def tsquery(terms):
+    """to_tsquery() input: terms ANDed, phrases as <->, prefixes as :*"""
+    parts = []
+    for value, prefix, phrase in terms:
+        if phrase:
+            parts.append('(' + ' <-> '.join(value.split()) + ')')
+        else:
+            parts.append(value + (':*' if prefix else ''))
+    return ' & '.join(parts)
+
+def highlight(snippet):
+    """HTML-escape a snippet and turn its match markers into <mark> tags"""
+    return html.escape(snippet or '').replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+def _search_statement(dialect, terms, columns):
+    if dialect == 'sqlite':
+        bm25 = literal_column(f"bm25(company_fts, {', '.join(str(weight) for weight in FTS_WEIGHTS)})")
+        snippet = literal_column(
+            f"snippet(company_fts, {SEARCH_FIELDS.index('description')}, char(2), char(3), '…', {SNIPPET_WORDS})"
+        )
+        # bm25() is lower for better matches
+        return (
+            select(*columns, (-bm25).label('rank'), snippet.label('snippet'))
+            .select_from(fts_table.join(Company.__table__, Company.id == fts_table.c.rowid))
+            .where(text('company_fts MATCH :match').bindparams(match=fts5_match(terms)))
+            .order_by(bm25, Company.id)
+        )
+    if dialect == 'postgresql':
+        query = func.to_tsquery('english', tsquery(terms))
+        vector = literal_column('company.search_vector')
+        options = f'StartSel="{MARK_START}", StopSel="{MARK_END}", MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}'
+        rank = func.ts_rank_cd(vector, query)
+        snippet = func.ts_headline('english', func.coalesce(Company.description, ''), query, options)
+        return (
+            select(*columns, rank.label('rank'), snippet.label('snippet'))
+            .where(vector.op('@@')(query))
+            .order_by(rank.desc(), Company.id)
+        )
+    raise ValueError(f"Full-text search is not available on {dialect}")
+
+def search_companies(query, filters=None, limit=DEFAULT_LIMIT, offset=0, fields=RESULT_FIELDS):
+    """
+    Best matches first, each with its rank and a highlighted description snippet
+    Returns (results, next offset or None); raises ValueError for empty queries
+    """
+    unknown = [field for field in fields if field not in RESULT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    offset = max(0, int(offset))
+
+    dialect = db.session.get_bind().dialect.name
+    statement = _search_statement(dialect, parse_query(query), [getattr(Company, field) for field in fields])
+    statement = apply_filters(statement, filters or {})
+    # One extra row tells whether there is another page
+    rows = db.session.execute(statement.limit(limit + 1).offset(offset)).fetchall()
+
+    results = []
+    for row in rows[:limit]:
+        data = row_to_dict(row)
+        data['rank'] = round(float(data['rank']), 6)
+        data['snippet'] = highlight(data['snippet'])
+        results.append(data)
+    return results, offset + limit if len(rows) > limit else None
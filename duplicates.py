@@ -0,0 +1,220 @@
+"""
+Near-duplicate companies, found by MinHash/LSH over their descriptions
+
+The same company reached through a renamed slug, or any other URL that
+normalize_linkedin_url can't map onto the one already stored, is saved as a
+separate row with an almost identical description. Every stored signature
+(utils.minhash) is filed under its LSH band buckets in minhash_bucket. A newly
+saved company is compared only with the companies sharing one of its buckets,
+never the whole table, and is flagged with duplicate_of when one of them is
+similar enough.
+
+`flask duplicates` reports the flagged companies. `--merge` folds each one into
+its original: the original's empty fields are filled in, the duplicate's URL is
+kept as an alias and the row is deleted. Scrapes skip aliased and flagged URLs
+before fetching anything.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from models import LOOKUP_BATCH_SIZE, Company, CompanyAlias, MinHashBucket, db
+from utils.metrics import timed
+from utils.minhash import DUPLICATE_THRESHOLD, band_keys, signature_bytes, similarity
+from utils.urls import normalize_linkedin_url
+
+logger = logging.getLogger(__name__)
+
+# Empty fields of an original that a merged duplicate may fill in
+MERGE_FIELDS = (
+    'description', 'website', 'domain', 'domain_class', 'size', 'location', 'founded',
+    'keywords', 'technologies', 'sentiment', 'description_length'
+)
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), LOOKUP_BATCH_SIZE):
+        yield values[start:start + LOOKUP_BATCH_SIZE]
+
+def index_companies(connection, rows, threshold=DUPLICATE_THRESHOLD):
+    """
+    File (id, minhash) rows under their LSH buckets and set their duplicate_of
+    A row's original is the most similar company (at or above `threshold`)
+    sharing one of its buckets, or that company's own original if it is a
+    duplicate too. Rows are taken in the order given, so pass them oldest first.
+    Returns {id: original id} for the rows flagged
+    """
+    ids = [company_id for company_id, _ in rows]
+    for chunk in _chunks(ids):
+        connection.execute(delete(MinHashBucket).where(MinHashBucket.company_id.in_(chunk)))
+    keys = {company_id: band_keys(minhash) for company_id, minhash in rows if minhash}
+
+    members = {}
+    for chunk in _chunks({key for row_keys in keys.values() for key in row_keys}):
+        statement = select(MinHashBucket.bucket, MinHashBucket.company_id).where(MinHashBucket.bucket.in_(chunk))
+        for bucket, company_id in connection.execute(statement):
+            members.setdefault(bucket, set()).add(company_id)
+
+    signatures = {}
+    originals = {}
+    for chunk in _chunks({company_id for bucket in members.values() for company_id in bucket}):
+        statement = select(Company.id, Company.minhash, Company.duplicate_of).where(Company.id.in_(chunk))
+        for company_id, minhash, duplicate_of in connection.execute(statement):
+            signatures[company_id] = minhash
+            originals[company_id] = duplicate_of
+
+    flagged = {}
+    for company_id, minhash in rows:
+        best = None
+        if minhash:
+            candidates = set().union(*(members.get(key, ()) for key in keys[company_id]))
+            for candidate in candidates:
+                original = originals.get(candidate) or candidate
+                if original == company_id or signatures.get(candidate) is None:
+                    continue
+                score = similarity(minhash, signatures[candidate])
+                if score >= threshold and (best is None or (score, -original) > best):
+                    best = (score, -original)
+            # Later rows in this batch can match this one
+            for key in keys[company_id]:
+                members.setdefault(key, set()).add(company_id)
+            signatures[company_id] = minhash
+        originals[company_id] = -best[1] if best else None
+        if best:
+            flagged[company_id] = -best[1]
+
+    if ids:
+        connection.execute(
+            update(Company.__table__).where(Company.id == bindparam('_id')).values(duplicate_of=bindparam('_original')),
+            [{'_id': company_id, '_original': originals[company_id]} for company_id in ids]
+        )
+    buckets = [{'bucket': key, 'company_id': company_id} for company_id, row_keys in keys.items() for key in row_keys]
+    if buckets:
+        connection.execute(insert(MinHashBucket), buckets)
+    return flagged
+
+def flag_near_duplicates(records, threshold=DUPLICATE_THRESHOLD):
+    """
+    Index the companies just saved from these records and flag the near duplicates
+    Returns {id: original id} for the companies flagged; needs an app context
+    """
+    urls = {normalize_linkedin_url(record.get('companyLinkedinUrl')) for record in records} - {None}
+    with timed('near_duplicates'):
+        rows = []
+        for chunk in _chunks(urls):
+            rows.extend(db.session.execute(
+                select(Company.id, Company.minhash).where(Company.linkedin_url.in_(chunk))
+            ).all())
+        flagged = index_companies(db.session.connection(), sorted(rows), threshold)
+        db.session.commit()
+    for company_id, original in flagged.items():
+        logger.info(f"Company {company_id} looks like a duplicate of company {original}")
+    return flagged
+
+def known_duplicate_urls(urls):
+    """
+    The subset of (normalized) URLs that are merged aliases or flagged duplicates
+    """
+    known = set()
+    for chunk in _chunks(urls):
+        known.update(url for url, in db.session.execute(
+            select(CompanyAlias.linkedin_url).where(CompanyAlias.linkedin_url.in_(chunk))
+        ))
+        known.update(url for url, in db.session.execute(
+            select(Company.linkedin_url).where(Company.linkedin_url.in_(chunk), Company.duplicate_of.isnot(None))
+        ))
+    return known
+
+def reindex_duplicates(connection, threshold=DUPLICATE_THRESHOLD):
+    """
+    Sign descriptions that have no signature yet, then rebuild the bucket index
+    and every duplicate_of flag from scratch, oldest company first
+    Returns the number of companies flagged
+    """
+    rows = connection.execute(
+        select(Company.id, Company.description).where(Company.minhash.is_(None), Company.description.isnot(None))
+    ).fetchall()
+    signed = [{'_id': company_id, '_minhash': signature_bytes(description)} for company_id, description in rows]
+    signed = [row for row in signed if row['_minhash'] is not None]
+    if signed:
+        connection.execute(
+            update(Company.__table__).where(Company.id == bindparam('_id')).values(minhash=bindparam('_minhash')),
+            signed
+        )
+    logger.info(f"Computed MinHash signatures for {len(signed)} companies")
+
+    connection.execute(delete(MinHashBucket))
+    connection.execute(update(Company.__table__).values(duplicate_of=None))
+    flagged = 0
+    last_id = 0
+    while True:
+        batch = connection.execute(
+            select(Company.id, Company.minhash).where(Company.id > last_id).order_by(Company.id).limit(LOOKUP_BATCH_SIZE)
+        ).fetchall()
+        if not batch:
+            break
+        flagged += len(index_companies(connection, [tuple(row) for row in batch], threshold))
+        last_id = batch[-1][0]
+    logger.info(f"Indexed company signatures: {flagged} near duplicates flagged")
+    return flagged
+
+def duplicate_groups(limit=None):
+    """
+    Flagged companies grouped under their originals, most duplicated first
+    """
+    statement = select(Company).where(Company.duplicate_of.isnot(None)).order_by(Company.duplicate_of, Company.id)
+    duplicates = db.session.execute(statement).scalars().all()
+    original_ids = sorted({company.duplicate_of for company in duplicates})
+    originals = {}
+    for chunk in _chunks(original_ids):
+        originals.update((company.id, company) for company in db.session.execute(
+            select(Company).where(Company.id.in_(chunk))
+        ).scalars())
+
+    groups = {}
+    for company in duplicates:
+        original = originals.get(company.duplicate_of)
+        if original is None:
+            continue
+        groups.setdefault(original.id, (original, []))[1].append(company)
+    ordered = sorted(groups.values(), key=lambda group: (-len(group[1]), group[0].id))
+    return ordered[:limit] if limit else ordered
+
+def merge_duplicates(groups=None):
+    """
+    Fold flagged duplicates into their originals: fill the original's empty
+    fields, keep the duplicate's URL as an alias and delete the duplicate
+    Returns the number of companies merged
+    """
+    groups = duplicate_groups() if groups is None else groups
+    merged = 0
+    try:
+        for original, duplicates in groups:
+            if original.duplicate_of is not None:
+                # Flagged itself since; its duplicates move to its original when it is merged
+                continue
+            for duplicate in duplicates:
+                for field in MERGE_FIELDS:
+                    if getattr(original, field) in (None, '') and getattr(duplicate, field) not in (None, ''):
+                        setattr(original, field, getattr(duplicate, field))
+                if duplicate.linkedin_url:
+                    db.session.merge(CompanyAlias(
+                        linkedin_url=duplicate.linkedin_url, company_id=original.id, merged_at=datetime.now()
+                    ))
+                db.session.execute(
+                    update(CompanyAlias).where(CompanyAlias.company_id == duplicate.id).values(company_id=original.id)
+                )
+                db.session.execute(
+                    update(Company).where(Company.duplicate_of == duplicate.id).values(duplicate_of=original.id)
+                )
+                db.session.execute(delete(MinHashBucket).where(MinHashBucket.company_id == duplicate.id))
+                db.session.delete(duplicate)
+                merged += 1
+            db.session.flush()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info(f"Merged {merged} duplicate companies")
+    return merged
@@ -0,0 +1,305 @@
+"""
+Background scrape jobs
+
+Jobs are rows in the scrape_job table, so any process sharing the database can
+pick them up and they survive restarts. Each app process runs one JobRunner: a
+dispatcher thread claims queued jobs with a conditional UPDATE (only one process
+wins a given job) and hands them to a bounded thread pool. Running jobs send a
+heartbeat; a job whose heartbeat goes stale (its process died) is queued again,
+up to MAX_ATTEMPTS times. Each job writes its records to its own CSV under the
+runner's output directory, so concurrent jobs never share a file. That CSV is
+where the results live: a job holds no more than one batch of records in
+memory, and only the counts go into its row.
+"""
+import csv
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update
+
+from models import ScrapeJob, db
+from pipeline import stream_scrape
+from utils.metrics import collect_timings
+from utils.profiling import PROFILERS, profile_run
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+POLL_INTERVAL = 2.0
+HEARTBEAT_INTERVAL = 15.0
+# A running job not heard from for this long is assumed to have lost its process
+STALE_AFTER = 120.0
+MAX_ATTEMPTS = 3
+# Minimum seconds between progress writes while pages are being scraped
+PROGRESS_INTERVAL = 1.0
+
+# Result columns that aren't text, converted back when a job's CSV is read
+NUMERIC_COLUMNS = {'description_length': int}
+
+JOB_OUTPUT_DIR = os.environ.get(
+    'JOB_OUTPUT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'jobs')
+)
+
+# Parameters a job accepts, passed straight through to the scraper (see leads.iter_scrape)
+JOB_PARAMS = (
+    'keywords', 'founded_years', 'country', 'size', 'max_results', 'sleep_time', 'concurrency', 'cache_mode',
+    'rescrape_after_days', 'profile'
+)
+
+def submit_job(params):
+    """
+    Queue a scrape job and return it; the caller gets the id back immediately
+    """
+    unknown = [key for key in params if key not in JOB_PARAMS]
+    if unknown:
+        raise ValueError(f"Unknown job parameters: {', '.join(unknown)}")
+    if params.get('profile') not in (None, False, True) + PROFILERS:
+        raise ValueError(f"profile must be true, false or one of {', '.join(PROFILERS)}")
+    if params.get('profile') and not current_app.config.get('ALLOW_PROFILING'):
+        # Profiled jobs write files on the server, so clients may only ask for them where allowed
+        raise ValueError("Profiling is disabled on this server (set ALLOW_PROFILING=1 to enable it)")
+    job = ScrapeJob(id=uuid.uuid4().hex, status='queued', params=json.dumps(params), created_at=datetime.now())
+    db.session.add(job)
+    db.session.commit()
+    logger.info(f"Queued scrape job {job.id}")
+    if _runner is not None:
+        _runner.wake()
+    return job
+
+def get_job(job_id):
+    return db.session.get(ScrapeJob, job_id)
+
+def recent_jobs(limit=50):
+    statement = select(ScrapeJob).order_by(ScrapeJob.created_at.desc()).limit(limit)
+    return db.session.execute(statement).scalars().all()
+
+def job_results(job):
+    """
+    A finished job's records, read back one at a time from its output CSV
+    Jobs run before the CSV was kept stored their records in the row instead
+    """
+    if job.output_csv and os.path.exists(job.output_csv):
+        with open(job.output_csv, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                yield {
+                    key: None if value == '' else NUMERIC_COLUMNS.get(key, str)(value)
+                    for key, value in row.items()
+                }
+    elif job.results:
+        yield from json.loads(job.results)
+
+def job_output_path(output_dir, job_id):
+    return os.path.join(output_dir, f"job-{job_id}.csv")
+
+class JobRunner:
+    """
+    Claims queued jobs from the database and runs at most `workers` at a time
+    Each job's records go to job-<id>.csv in `output_dir`; with None only the counts are kept
+    """
+    def __init__(self, app, workers=DEFAULT_WORKERS, search_func=None, output_dir=JOB_OUTPUT_DIR):
+        self.app = app
+        self.workers = max(1, int(workers))
+        self.search_func = search_func
+        self.output_dir = output_dir
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scrape-job')
+        self._running = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_heartbeat = 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._dispatch_loop, name='scrape-job-dispatcher', daemon=True)
+        self._thread.start()
+        logger.info(f"Job runner {self.worker_id} started with {self.workers} workers")
+        return self
+
+    def stop(self, wait=True):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=wait)
+
+    def wake(self):
+        self._wake.set()
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self._heartbeat()
+                    self._requeue_stale()
+                    while self._free_slots() > 0:
+                        job_id = self._claim_next()
+                        if job_id is None:
+                            break
+                        with self._lock:
+                            self._running.add(job_id)
+                        self._executor.submit(self._run_job, job_id)
+            except Exception as e:
+                logger.error(f"Job dispatcher error: {str(e)}")
+                logger.error(traceback.format_exc())
+            self._wake.wait(POLL_INTERVAL)
+            self._wake.clear()
+
+    def _free_slots(self):
+        with self._lock:
+            return self.workers - len(self._running)
+
+    def _heartbeat(self):
+        now = time.monotonic()
+        if now - self._last_heartbeat < HEARTBEAT_INTERVAL:
+            return
+        self._last_heartbeat = now
+        with self._lock:
+            running = list(self._running)
+        if running:
+            db.session.execute(
+                update(ScrapeJob).where(ScrapeJob.id.in_(running)).values(heartbeat_at=datetime.now())
+            )
+            db.session.commit()
+
+    def _requeue_stale(self):
+        """
+        Give jobs orphaned by a dead process back to the queue, or fail them
+        once they have used up their attempts
+        """
+        cutoff = datetime.now() - timedelta(seconds=STALE_AFTER)
+        stale = (ScrapeJob.status == 'running') & (ScrapeJob.heartbeat_at < cutoff)
+        failed = db.session.execute(
+            update(ScrapeJob).where(stale, ScrapeJob.attempts >= MAX_ATTEMPTS).values(
+                status='failed', error='Worker stopped responding', finished_at=datetime.now()
+            )
+        ).rowcount
+        requeued = db.session.execute(
+            update(ScrapeJob).where(stale).values(status='queued', worker=None)
+        ).rowcount
+        db.session.commit()
+        if failed or requeued:
+            logger.warning(f"Recovered stale jobs: {requeued} requeued, {failed} failed")
+
+    def _claim_next(self):
+        """
+        Mark the oldest queued job as ours; returns None when the queue is empty
+        """
+        while True:
+            job_id = db.session.execute(
+                select(ScrapeJob.id).where(ScrapeJob.status == 'queued').order_by(ScrapeJob.created_at).limit(1)
+            ).scalar()
+            if job_id is None:
+                db.session.commit()
+                return None
+            now = datetime.now()
+            claimed = db.session.execute(
+                update(ScrapeJob).where(ScrapeJob.id == job_id, ScrapeJob.status == 'queued').values(
+                    status='running', worker=self.worker_id, started_at=now, heartbeat_at=now,
+                    attempts=ScrapeJob.attempts + 1
+                )
+            ).rowcount
+            db.session.commit()
+            if claimed:
+                return job_id
+            # Another process got there first; try the next one
+
+    def _run_job(self, job_id):
+        try:
+            with self.app.app_context():
+                self._execute(job_id)
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+            self.wake()
+
+    def _execute(self, job_id):
+        job = get_job(job_id)
+        params = json.loads(job.params)
+        profiler = params.pop('profile', None)
+        if profiler is True:
+            profiler = 'cprofile'
+        logger.info(f"Running scrape job {job_id} with {params}")
+        engine = db.engine
+        last_write = 0.0
+
+        def report_progress(done, total):
+            # Called from the scraper threads, so write through the engine directly
+            nonlocal last_write
+            now = time.monotonic()
+            if done and done < total and now - last_write < PROGRESS_INTERVAL:
+                return
+            last_write = now
+            with engine.begin() as connection:
+                connection.execute(
+                    update(ScrapeJob).where(ScrapeJob.id == job_id).values(
+                        progress_done=done, progress_total=total, heartbeat_at=datetime.now()
+                    )
+                )
+
+        try:
+            # Each batch is saved and appended to the job's CSV as soon as it is scraped
+            output_csv = None
+            if self.output_dir:
+                os.makedirs(self.output_dir, exist_ok=True)
+                output_csv = job_output_path(self.output_dir, job_id)
+            totals = {}
+            profiling = profile_run(f"job-{job_id}", profiler=profiler) if profiler else nullcontext()
+            with collect_timings() as timings, profiling as profile:
+                count = sum(1 for _ in stream_scrape(
+                    params,
+                    search_func=self.search_func,
+                    output_csv=output_csv,
+                    progress_callback=report_progress,
+                    totals=totals
+                ))
+            job = get_job(job_id)
+            job.status = 'succeeded'
+            job.inserted = totals['inserted']
+            job.updated = totals['updated']
+            job.result_count = count
+            job.output_csv = output_csv
+            summary = timings.to_dict()
+            if profile is not None:
+                summary['profile'] = profile.to_dict()
+            job.timings = json.dumps(summary)
+            job.finished_at = datetime.now()
+            db.session.commit()
+            logger.info(f"Scrape job {job_id} finished with {count} companies")
+        except Exception as e:
+            logger.error(f"Scrape job {job_id} failed: {str(e)}")
+            logger.error(traceback.format_exc())
+            db.session.rollback()
+            job = get_job(job_id)
+            job.status = 'failed'
+            job.error = str(e)
+            job.finished_at = datetime.now()
+            db.session.commit()
+
+_runner = None
+
+def start_job_runner(app, workers=DEFAULT_WORKERS, search_func=None, output_dir=JOB_OUTPUT_DIR):
+    """
+    Start this process's job runner (once); queued jobs left over from a
+    previous run are picked up straight away
+    """
+    global _runner
+    if _runner is None:
+        _runner = JobRunner(app, workers=workers, search_func=search_func, output_dir=output_dir).start()
+    return _runner
+
+def stop_job_runner(wait=True):
+    global _runner
+    if _runner is not None:
+        _runner.stop(wait=wait)
+        _runner = None
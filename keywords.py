@@ -0,0 +1,74 @@
+"""
+Maintenance of the corpus-wide term stats behind TF-IDF keywords
+
+The term_stat table grows as the pipeline analyzes new descriptions
+(models.DatabaseTermStats). Counts are never taken back out when a description
+changes or a company is deleted, and keywords scored early on saw a smaller
+corpus. `flask term-stats --rebuild` recounts the table from the stored
+descriptions; `--rescore` recomputes every company's keywords against it.
+"""
+import logging
+from collections import Counter
+
+from sqlalchemy import bindparam, delete, select, update
+
+from models import DOCUMENTS_TERM, Company, DatabaseTermStats, TermStat, db, increment_term_stats
+from utils.nlp_processor import preprocess_text
+from utils.tfidf import top_terms
+
+logger = logging.getLogger(__name__)
+
+# Descriptions read and flushed per round
+BATCH_SIZE = 5000
+
+def rebuild_term_stats(connection, batch_size=BATCH_SIZE):
+    """
+    Recount term_stat from the distinct stored descriptions
+    Returns the number of documents counted
+    """
+    connection.execute(delete(TermStat))
+    result = connection.execution_options(yield_per=batch_size).execute(
+        select(Company.description).where(Company.description.isnot(None)).distinct()
+    )
+    documents = 0
+    for partition in result.partitions():
+        counts = Counter()
+        batch_documents = 0
+        for description, in partition:
+            terms = set(preprocess_text(description))
+            if terms:
+                batch_documents += 1
+                counts.update(terms)
+        counts[DOCUMENTS_TERM] = batch_documents
+        increment_term_stats(connection, counts)
+        documents += batch_documents
+    logger.info(f"Counted terms of {documents} descriptions")
+    return documents
+
+def rescore_keywords(batch_size=BATCH_SIZE):
+    """
+    Recompute every company's keywords against the current term stats
+    Returns the number of companies updated; needs an app context
+    """
+    stats = DatabaseTermStats()
+    statement = (
+        update(Company.__table__).where(Company.id == bindparam('_id')).values(keywords=bindparam('_keywords'))
+    )
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Company.id, Company.description).where(Company.id > last_id).order_by(Company.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        token_lists = [preprocess_text(description) for _, description in rows]
+        keywords = [", ".join(terms) for terms in top_terms(token_lists, stats)]
+        db.session.execute(statement, [
+            {'_id': company_id, '_keywords': value} for (company_id, _), value in zip(rows, keywords)
+        ])
+        db.session.commit()
+        updated += len(rows)
+        last_id = rows[-1][0]
+    logger.info(f"Rescored keywords of {updated} companies")
+    return updated
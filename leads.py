@@ -1,169 +1,64 @@
 import json
 import pandas as pd
-import requests
-import time
 import logging
 import os
+import threading
 from bs4 import BeautifulSoup
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
+from itertools import islice
+from urllib.parse import unquote
+from utils.csv_stream import CsvAppender
+from utils.domain_classifier import classify_domain, configure_taxonomy
+from utils.html_extractor import extract_company_fields
+from utils.http_cache import DEFAULT_MAX_BYTES, DEFAULT_TTL, HTTP_CACHE_PATH
+from utils.http_client import cache_stats, configure_cache, ensure_pool_size, fetch, get_cache
+from utils.metrics import PAGES_SCRAPED, collect_timings, format_timings, in_context, timed
+from utils.profiling import PROFILE_DIR, PROFILERS, profile_run
+from utils.rate_limiter import HostRateLimiter
+from utils.urls import dedupe_urls, normalize_linkedin_url, rebase_url
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def classify_domain(domain, company_name='', description=''):
-    """
-    Classify a company domain into specific business categories
-    Uses multiple data points: domain name, company name, and description
-    """
-    # Ensure we're working with lowercase strings
-    domain = (domain or '').lower()
-    company_name = (company_name or '').lower()
-    description = (description or '').lower()
-    
-    # Combined text for better classification
-    combined_text = f"{domain} {company_name} {description}"
-    
-    # Define specific industry categories with their keywords
-    industry_categories = {
-        # IT & Tech Services
-        'Cloud Services': ['cloud', 'aws', 'azure', 'gcp', 'hosting', 'iaas', 'paas', 'saas'],
-        'IT Services': ['it service', 'tech support', 'helpdesk', 'managed service', 'infrastructure', 'network', 'system'],
-        'Software Development': ['software', 'development', 'programming', 'code', 'developer', 'app development'],
-        'Digital Transformation': ['digital transformation', 'digitization', 'digital strategy', 'digital solution'],
-        'Cybersecurity': ['cyber', 'security', 'threat', 'encryption', 'firewall', 'protection', 'data security'],
-        'Data Analytics': ['data', 'analytics', 'big data', 'business intelligence', 'bi', 'data science'],
-        'AI & Machine Learning': ['ai', 'machine learning', 'artificial intelligence', 'ml', 'neural', 'nlp', 'deep learning'],
-        
-        # Finance
-        'Financial Services': ['financial', 'finance', 'banking', 'investment', 'wealth management'],
-        'FinTech': ['fintech', 'payment', 'transaction', 'digital payment', 'banking tech', 'financial technology'],
-        'Investment Banking': ['investment bank', 'capital market', 'ipo', 'merger', 'acquisition'],
-        'Insurance': ['insurance', 'policy', 'risk management', 'underwriting', 'claim'],
-        
-        # Healthcare
-        'Healthcare Services': ['healthcare', 'medical', 'health service', 'patient care', 'clinic'],
-        'HealthTech': ['healthtech', 'health tech', 'medical technology', 'ehealth', 'health platform'],
-        'Pharmaceutical': ['pharma', 'pharmaceutical', 'drug', 'medicine', 'therapeutic'],
-        'Biotech': ['biotech', 'biotechnology', 'life science', 'genomic', 'biological'],
-        
-        # Marketing & Media
-        'Digital Marketing': ['digital marketing', 'seo', 'sem', 'content marketing', 'social media marketing'],
-        'Advertising': ['advertising', 'ad agency', 'adtech', 'media buying', 'programmatic'],
-        'PR & Communications': ['pr', 'public relations', 'communication', 'media relation'],
-        'Media & Entertainment': ['media', 'entertainment', 'streaming', 'publishing', 'broadcast'],
-        
-        # Other Industries
-        'E-commerce': ['ecommerce', 'e-commerce', 'online store', 'online retail', 'webshop'],
-        'Retail': ['retail', 'store', 'merchant', 'shop', 'consumer goods'],
-        'Manufacturing': ['manufacturing', 'production', 'factory', 'industrial', 'assembly'],
-        'Consulting': ['consulting', 'consultancy', 'advisor', 'business consultant'],
-        'Education': ['education', 'learning', 'school', 'university', 'training', 'edtech'],
-        'Real Estate': ['real estate', 'property', 'realty', 'building', 'construction', 'proptech'],
-        'Legal Services': ['legal', 'law firm', 'attorney', 'lawyer', 'legal service'],
-        'Transportation & Logistics': ['transport', 'logistics', 'shipping', 'delivery', 'supply chain'],
-        'Energy': ['energy', 'power', 'utility', 'electricity', 'renewable', 'oil', 'gas'],
-        'Telecom': ['telecom', 'telecommunication', 'cellular', 'network provider', 'mobile carrier']
-    }
-    
-    # Calculate relevance scores for each industry
-    scores = {}
-    for industry, keywords in industry_categories.items():
-        # Count how many keywords from this industry appear in the text
-        industry_score = 0
-        for keyword in keywords:
-            if keyword in combined_text:
-                industry_score += 1
-                
-                # Add bonus points for exact matches in name or domain
-                if keyword in domain or keyword in company_name:
-                    industry_score += 2
-                    
-                # Add bonus for phrases (keywords with spaces)
-                if ' ' in keyword and keyword in combined_text:
-                    industry_score += 3
-        
-        if industry_score > 0:
-            scores[industry] = industry_score
-    
-    # If no industry matched, try to determine a general category
-    if not scores:
-        # General categories as fallback
-        general_categories = {
-            'Technology': ['tech', 'software', 'digital', 'comp', 'it', 'app', 'online', 'computer', 'technology', 'systems'],
-            'Financial Services': ['finance', 'bank', 'invest', 'capital', 'financial', 'insurance', 'asset', 'money'],
-            'Healthcare': ['health', 'med', 'care', 'doctor', 'hospital', 'clinic', 'therapy', 'wellness', 'patient'],
-            'Professional Services': ['service', 'solution', 'consulting', 'professional', 'management', 'advisor']
-        }
-        
-        for category, keywords in general_categories.items():
-            category_score = sum(1 for kw in keywords if kw in combined_text)
-            if category_score > 0:
-                scores[category] = category_score
-    
-    # Return the industry with the highest score, or Other if none found
-    if scores:
-        return max(scores, key=scores.get)
-    else:
-        return 'Other'
-
-def scrape_linkedin_company_page(url, user_agent='Mozilla/5.0', timeout=10):
+def scrape_linkedin_company_page(url, user_agent='Mozilla/5.0', timeout=10, html_backend='html.parser', cache_mode='default',
+                                 base_url=None):
     """
     Scrape a LinkedIn company page for company information
+    Pages come from the HTTP response cache when a fresh copy is stored
+    With `base_url` the page is fetched from that host instead (a mirror or a
+    stand-in server); the record keeps the LinkedIn URL
     """
-    headers = {'User-Agent': user_agent}
     logger.debug(f"Scraping LinkedIn URL: {url}")
     
     try:
-        resp = requests.get(url, headers=headers, timeout=timeout)
+        resp = fetch(rebase_url(url, base_url), user_agent=user_agent, timeout=timeout, use_cache=True, cache_mode=cache_mode)
         if resp.status_code != 200:
             logger.warning(f"Failed to retrieve {url} - Status code: {resp.status_code}")
+            PAGES_SCRAPED.inc(result='failed')
             return None
         
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        
-        # Extract company name
-        name_elem = soup.find('h1')
-        name = name_elem.text.strip() if name_elem else ''
-        
-        # Extract description
-        desc_elem = soup.find('meta', {'name': 'description'})
-        desc = desc_elem['content'].strip() if desc_elem and desc_elem.has_attr('content') else ''
+        # Collect every field in one pass over the page
+        with timed('html_parse'):
+            fields = extract_company_fields(resp.text, backend=html_backend)
+        name = fields['name']
+        desc = fields['description']
+        website = fields['website']
+        size = fields['size']
+        location = fields['location']
+        founded = fields['founded']
         
         # Extract domain from URL
         domain = url.split('/')[4] if len(url.split('/')) > 4 else ''
         
-        # Try to find website URL
-        website = ''
-        for a in soup.find_all('a', href=True):
-            if 'website' in a.text.lower():
-                website = a['href']
-                break
-        
-        # Try to extract company size
-        size = ''
-        for p in soup.find_all('p'):
-            if 'employees' in p.text.lower():
-                size = p.text.strip()
-                break
-        
-        # Try to extract location
-        location = ''
-        for span in soup.find_all('span'):
-            if 'headquarter' in span.text.lower():
-                location = span.text.strip()
-                break
-        
-        # Try to extract founding year
-        founded = ''
-        for p in soup.find_all('p'):
-            if 'founded' in p.text.lower():
-                founded = p.text.strip()
-                break
-        
         # Use improved domain classification with multiple data points
-        domain_class = classify_domain(domain, name, desc)
+        with timed('classify_domain'):
+            domain_class = classify_domain(domain, name, desc)
         
+        PAGES_SCRAPED.inc(result='ok')
         return {
             'companyLinkedinUrl': url,
             'name': name,
@@ -178,57 +73,208 @@ def scrape_linkedin_company_page(url, user_agent='Mozilla/5.0', timeout=10):
         }
     except Exception as e:
         logger.error(f"Error scraping {url}: {str(e)}")
+        PAGES_SCRAPED.inc(result='failed')
         return None
 
-def google_search_linkedin_companies(query, max_results=10):
+def parse_search_results(html):
+    """
+    LinkedIn company links on a Google results page, unwrapped from Google's redirects
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for link in soup.find_all('a'):
+        href = link.get('href', '')
+        if 'linkedin.com/company/' in href:
+            # Extract actual URL from Google redirect
+            if '/url?q=' in href:
+                href = unquote(href.split('/url?q=')[1].split('&')[0])
+            links.append(href)
+    return links
+
+def google_search_linkedin_companies(query, max_results=10, cache_mode='default'):
     """
     Search for LinkedIn company URLs via Google
+    Results are normalized, deduplicated and kept in the search cache, so repeating
+    a query within SEARCH_TTL costs nothing; in offline mode only the cache is used
     """
+    cache = get_cache()
+    if cache is not None and cache_mode != 'refresh':
+        cached = cache.search_results(query, max_results, allow_stale=cache_mode == 'offline')
+        if cached is not None:
+            logger.debug(f"Using {len(cached)} cached LinkedIn URLs for: {query}")
+            return cached
+    if cache_mode == 'offline':
+        logger.warning(f"No cached search results for: {query}")
+        return []
+    
     logger.debug(f"Searching for: {query}")
     urls = []
+    seen = set()
+    
+    def add(url):
+        normalized = normalize_linkedin_url(url)
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            urls.append(normalized)
+        return len(urls) >= max_results
     
     try:
         # Try using googlesearch-python
         from googlesearch import search
         for url in search(query, num_results=max_results*2):  # Get more results to filter
-            if 'linkedin.com/company/' in url and url not in urls:
-                urls.append(url)
-                if len(urls) >= max_results:
-                    break
+            if 'linkedin.com/company/' in url and add(url):
+                break
     except ImportError:
         logger.warning("googlesearch-python not installed, using alternative method")
         try:
             # Try using custom search with requests + BeautifulSoup
             search_url = f"https://www.google.com/search?q={query.replace(' ', '+')}"
-            headers = {'User-Agent': 'Mozilla/5.0'}
-            response = requests.get(search_url, headers=headers)
+            response = fetch(search_url)
             
             if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                links = soup.find_all('a')
-                
-                for link in links:
-                    href = link.get('href', '')
-                    if 'linkedin.com/company/' in href and href not in urls:
-                        # Extract actual URL from Google redirect
-                        if '/url?q=' in href:
-                            href = href.split('/url?q=')[1].split('&')[0]
-                        urls.append(href)
-                        if len(urls) >= max_results:
-                            break
+                for href in parse_search_results(response.text):
+                    if add(href):
+                        break
         except Exception as e:
             logger.error(f"Error in custom Google search: {str(e)}")
-            # Fall back to mock data if all else fails
-            urls = [
-                "https://uk.linkedin.com/company/microsoft",
-                "https://uk.linkedin.com/company/google",
-                "https://uk.linkedin.com/company/amazon"
-            ]
-            
+            # Fall back to mock data if all else fails (never cached)
+            return [
+                "https://linkedin.com/company/microsoft",
+                "https://linkedin.com/company/google",
+                "https://linkedin.com/company/amazon"
+            ][:max_results]
+    
+    if cache is not None and urls:
+        cache.store_search_results(query, max_results, urls)
     logger.debug(f"Found {len(urls)} LinkedIn URLs")
-    return urls[:max_results]  # Ensure we only return up to max_results
+    return urls
 
-def run_scraper(
+def _configure_cache_from(config):
+    """
+    Reopen the HTTP cache with the location/limits from the scraper config
+    """
+    path = config.get('http_cache_path', HTTP_CACHE_PATH)
+    ttl = config.get('http_cache_ttl', DEFAULT_TTL)
+    max_bytes = int(config.get('http_cache_max_mb', DEFAULT_MAX_BYTES / 1e6) * 1e6)
+    cache = get_cache()
+    if cache is None or (cache.path, cache.ttl, cache.max_bytes) != (path, ttl, max_bytes):
+        configure_cache(path, ttl=ttl, max_bytes=max_bytes)
+
+def load_config(config_path='scraper_config.json'):
+    """
+    Read the scraper config (if it exists) and apply its taxonomy and cache settings
+    """
+    config = {}
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+    
+    # Optional custom industry taxonomy
+    if config.get('taxonomy_path'):
+        configure_taxonomy(config['taxonomy_path'])
+    
+    # Optional HTTP cache location and limits
+    if any(key in config for key in ('http_cache_path', 'http_cache_ttl', 'http_cache_max_mb')):
+        _configure_cache_from(config)
+    return config
+
+def build_search_query(keywords, founded_years, country, size):
+    return f"{keywords} companies founded {','.join(founded_years)} in {country} with {size} employees linkedin"
+
+def search_company_urls(query, max_results=10, search_func=None, cache_mode='default'):
+    """
+    Normalized, deduplicated company URLs for a query, from `search_func` or Google
+    """
+    with timed('search'):
+        if search_func is not None:
+            return dedupe_urls(search_func(query))
+        return google_search_linkedin_companies(query, max_results, cache_mode=cache_mode)
+
+def log_cache_stats():
+    stats = cache_stats()
+    if stats:
+        logger.info(
+            f"HTTP cache: {stats['hits']} hits, {stats['revalidated']} revalidated, {stats['misses']} misses, "
+            f"{stats['bytes_saved'] / 1e6:.1f} MB not downloaded"
+        )
+
+def rate_from_sleep(sleep_time):
+    """
+    Convert the legacy per-request sleep into a per-host request rate
+    """
+    return 1.0 / sleep_time if sleep_time and sleep_time > 0 else None
+
+# Columns of a scraped record, in CSV order
+SCRAPED_COLUMNS = (
+    'companyLinkedinUrl', 'name', 'description', 'website', 'domain', 'domain_class',
+    'size', 'location', 'founded', 'scraped_at'
+)
+
+def iter_company_pages(urls, user_agent='Mozilla/5.0', timeout=10, concurrency=1, rate_limit=None, progress_callback=None,
+                       cache_mode='default', base_url=None):
+    """
+    Scrape LinkedIn company pages, yielding each record as soon as it is ready
+    Requests to the same host are spaced by a token bucket instead of a global sleep
+    Results keep the order of `urls`; failed pages are dropped. With several
+    workers only a small window of pages is in flight, so results that the
+    consumer hasn't taken yet don't pile up
+    `progress_callback(done, total)` is called after each page, from the worker threads
+    `base_url` fetches the pages from another host (see scrape_linkedin_company_page)
+    """
+    limiter = HostRateLimiter(rate_limit)
+    cache = get_cache()
+    total = len(urls)
+    done = 0
+    progress_lock = threading.Lock()
+    
+    def scrape_one(item):
+        nonlocal done
+        i, url = item
+        fetch_url = rebase_url(url, base_url)
+        # Pages served from the cache don't touch the host, so they skip the rate limit
+        if cache_mode != 'offline' and (cache_mode == 'refresh' or cache is None or not cache.is_fresh(fetch_url)):
+            with timed('rate_limit_wait'):
+                limiter.wait(fetch_url)
+        logger.info(f"Scraping {i+1}/{total}: {url}")
+        data = scrape_linkedin_company_page(
+            url, user_agent=user_agent, timeout=timeout, cache_mode=cache_mode, base_url=base_url
+        )
+        if progress_callback is not None:
+            with progress_lock:
+                done += 1
+                progress_callback(done, total)
+        return data
+    
+    workers = max(1, min(int(concurrency or 1), total or 1))
+    if workers == 1:
+        for data in map(scrape_one, enumerate(urls)):
+            if data:
+                yield data
+        return
+    
+    # Make sure every worker can hold a pooled connection to the same host
+    ensure_pool_size(workers)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scraper') as executor:
+        items = enumerate(urls)
+        # Workers run in the consumer's context so stage timings reach its summary
+        pending = deque(executor.submit(in_context(scrape_one), item) for item in islice(items, workers * 2))
+        while pending:
+            data = pending.popleft().result()
+            for item in islice(items, 1):
+                pending.append(executor.submit(in_context(scrape_one), item))
+            if data:
+                yield data
+
+def scrape_company_pages(urls, user_agent='Mozilla/5.0', timeout=10, concurrency=1, rate_limit=None, progress_callback=None,
+                         cache_mode='default', base_url=None):
+    """
+    Scrape a list of LinkedIn company pages into a list (see iter_company_pages)
+    """
+    return list(iter_company_pages(
+        urls, user_agent, timeout, concurrency, rate_limit, progress_callback, cache_mode, base_url
+    ))
+
+def iter_scrape(
     keywords=None,
     founded_years=None,
     country=None,
@@ -237,57 +283,114 @@ def run_scraper(
     max_results=10,
     user_agent='Mozilla/5.0',
     timeout=10,
-    output_csv='lead1.csv',
     sleep_time=1.0,
-    search_func=None
+    search_func=None,
+    concurrency=1,
+    rate_limit=None,
+    progress_callback=None,
+    cache_mode='default',
+    url_filter=None,
+    base_url=None
 ):
     """
-    Main function to run the LinkedIn company scraper
+    Search for LinkedIn companies and yield each scraped record as it arrives
+    Parameters are the same as run_scraper's, without the CSV output
+    `url_filter(urls)` can drop URLs before anything is fetched
     """
-    # Load config if it exists
-    config = {}
-    if os.path.exists(config_path):
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+    config = load_config(config_path)
     
     # Use provided parameters or defaults from config
     keywords = keywords or config.get('keywords', 'IT services')
     founded_years = founded_years or config.get('founded_years', ['2015'])
     country = country or config.get('country', 'United kingdom')
     size = size or config.get('size', '51-200')
+    base_url = base_url or config.get('linkedin_base_url')
     
     # Build search query
-    query = f"{keywords} companies founded {','.join(founded_years)} in {country} with {size} employees linkedin"
+    query = build_search_query(keywords, founded_years, country, size)
     logger.info(f"Search Query: {query}")
     
-    # Get LinkedIn company URLs
-    urls = []
-    if search_func is not None:
-        urls = search_func(query)
-    else:
-        urls = google_search_linkedin_companies(query, max_results)
+    # Get LinkedIn company URLs, one per company
+    urls = search_company_urls(query, max_results, search_func=search_func, cache_mode=cache_mode)
+    if url_filter is not None:
+        kept = url_filter(urls)
+        if len(kept) < len(urls):
+            logger.info(f"Skipping {len(urls) - len(kept)} companies that were scraped recently")
+        urls = kept
+    if progress_callback is not None:
+        progress_callback(0, len(urls))
     
     # Scrape each company page
-    results = []
-    for i, url in enumerate(urls):
-        logger.info(f"Scraping {i+1}/{len(urls)}: {url}")
-        data = scrape_linkedin_company_page(url, user_agent=user_agent, timeout=timeout)
-        if data:
-            results.append(data)
-        # Add sleep to avoid rate limiting
-        if i < len(urls) - 1:  # Don't sleep after the last one
-            logger.debug(f"Sleeping for {sleep_time} seconds")
-            time.sleep(sleep_time)
+    yield from iter_company_pages(
+        urls,
+        user_agent=user_agent,
+        timeout=timeout,
+        concurrency=concurrency,
+        rate_limit=rate_limit if rate_limit is not None else rate_from_sleep(sleep_time),
+        progress_callback=progress_callback,
+        cache_mode=cache_mode,
+        base_url=base_url
+    )
     
-    # Create DataFrame from results
-    df = pd.DataFrame(results)
+    log_cache_stats()
+
+def run_scraper(
+    keywords=None,
+    founded_years=None,
+    country=None,
+    size=None,
+    config_path='scraper_config.json',
+    max_results=10,
+    user_agent='Mozilla/5.0',
+    timeout=10,
+    output_csv='lead1.csv',
+    sleep_time=1.0,
+    search_func=None,
+    concurrency=1,
+    rate_limit=None,
+    progress_callback=None,
+    cache_mode='default',
+    base_url=None
+):
+    """
+    Main function to run the LinkedIn company scraper
+    `concurrency` sets the number of fetch workers; `rate_limit` is the allowed
+    requests per second per host (defaults to one request every `sleep_time` seconds)
+    `progress_callback(done, total)` reports scraped pages once the URLs are known
+    `cache_mode` is 'default', 'refresh' (ignore cached pages) or 'offline' (cache only)
+    `base_url` (or "linkedin_base_url" in the config) fetches company pages from another host
+    Rows are appended to `output_csv` as they are scraped
+    """
+    records = iter_scrape(
+        keywords=keywords,
+        founded_years=founded_years,
+        country=country,
+        size=size,
+        config_path=config_path,
+        max_results=max_results,
+        user_agent=user_agent,
+        timeout=timeout,
+        sleep_time=sleep_time,
+        search_func=search_func,
+        concurrency=concurrency,
+        rate_limit=rate_limit,
+        progress_callback=progress_callback,
+        cache_mode=cache_mode,
+        base_url=base_url
+    )
     
-    # Save to CSV if output path provided
+    results = []
     if output_csv:
-        df.to_csv(output_csv, index=False)
+        with CsvAppender(output_csv, SCRAPED_COLUMNS) as csv_out:
+            for data in records:
+                csv_out.append([data])
+                results.append(data)
         logger.info(f"Results saved to {output_csv}")
+    else:
+        results = list(records)
     
-    return df
+    # Create DataFrame from results
+    return pd.DataFrame(results)
 
 if __name__ == '__main__':
     import argparse
@@ -302,21 +405,48 @@ if __name__ == '__main__':
     parser.add_argument('--timeout', type=int, default=10, help='Request timeout')
     parser.add_argument('--output_csv', type=str, default='lead1.csv', help='Output CSV file')
     parser.add_argument('--sleep_time', type=float, default=1.0, help='Sleep time between requests (seconds)')
+    parser.add_argument('--concurrency', type=int, default=1, help='Number of concurrent page fetches')
+    parser.add_argument('--rate_limit', type=float, default=None, help='Max requests per second per host (overrides sleep_time)')
+    parser.add_argument('--refresh', action='store_true', help='Re-download pages even if they are cached')
+    parser.add_argument('--offline', action='store_true', help='Only use cached pages, never the network')
+    parser.add_argument('--base_url', type=str, default=None, help='Fetch company pages from this host instead of LinkedIn')
+    parser.add_argument('--timings', action='store_true', help='Print where the run spent its time, per stage')
+    parser.add_argument('--profile', nargs='?', const='cprofile', choices=PROFILERS, default=None,
+                        help='Profile the run (cprofile or sampling); combine with --offline to replay cached pages')
+    parser.add_argument('--profile_dir', type=str, default=PROFILE_DIR, help='Where profile files are written')
     
     args = parser.parse_args()
     founded_years = args.founded_years.split(',') if args.founded_years else None
+    cache_mode = 'offline' if args.offline else 'refresh' if args.refresh else 'default'
     
-    df = run_scraper(
-        keywords=args.keywords,
-        founded_years=founded_years,
-        country=args.country,
-        size=args.size,
-        config_path=args.config_path,
-        max_results=args.max_results,
-        user_agent=args.user_agent,
-        timeout=args.timeout,
-        output_csv=args.output_csv,
-        sleep_time=args.sleep_time
+    profiling = (
+        profile_run(f"scrape-{datetime.now():%Y%m%d-%H%M%S}", profiler=args.profile, output_dir=args.profile_dir)
+        if args.profile else nullcontext()
     )
+    with collect_timings() as timings, profiling as profile:
+        df = run_scraper(
+            keywords=args.keywords,
+            founded_years=founded_years,
+            country=args.country,
+            size=args.size,
+            config_path=args.config_path,
+            max_results=args.max_results,
+            user_agent=args.user_agent,
+            timeout=args.timeout,
+            output_csv=args.output_csv,
+            sleep_time=args.sleep_time,
+            concurrency=args.concurrency,
+            rate_limit=args.rate_limit,
+            cache_mode=cache_mode,
+            base_url=args.base_url
+        )
     
     print(f"Scraped {len(df)} companies and saved to {args.output_csv}")
+    stats = cache_stats()
+    if stats:
+        print(f"HTTP cache: {stats['hits']} hits, {stats['revalidated']} revalidated, {stats['misses']} misses, "
+              f"{stats['offline_misses']} offline misses, {stats['bytes_saved'] / 1e6:.1f} MB saved")
+    if args.timings:
+        print(format_timings(timings.to_dict()))
+    if args.profile:
+        print(f"Profile written to {profile.pstats_path} and {profile.collapsed_path}")
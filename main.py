@@ -1,13 +1,31 @@
 import json
 import os
 import logging
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, flash
-import pandas as pd
-from leads import run_scraper
-from utils.nlp_processor import process_descriptions
+import time
+import click
+from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, flash, stream_with_context
+from utils.nlp_processor import NLP_PIPELINE_VERSION, prepare_nlp_resources
 import io
 import traceback
-from models import db, Company
+from models import DOCUMENTS_TERM, db, Company, Enrichment, TermStat, prune_enrichments
+from migrations import run_migrations
+from company_search import DEFAULT_LIMIT as SEARCH_LIMIT, rebuild_search_index, search_companies
+from company_queries import DEFAULT_PAGE_SIZE, SORT_FIELDS, domain_class_options, list_companies, parse_filters
+from duplicates import duplicate_groups, merge_duplicates, reindex_duplicates
+from keywords import rebuild_term_stats, rescore_keywords
+from similar import DEFAULT_LIMIT as SIMILAR_LIMIT, SIMILAR_INDEX_PATH, get_index
+from similar import ensure_similar_index, rebuild_similar_index, similar_companies
+from exports import EXPORT_FORMATS, export_chunks, export_filename, write_export
+from exports import parse_fields as parse_export_fields
+from jobs import JOB_PARAMS, get_job, job_results, recent_jobs, start_job_runner, submit_job
+from pipeline import RESULT_COLUMNS, stream_scrape
+from campaign import DEFAULT_SEARCH_CONCURRENCY, format_stats, plan_campaign, stream_campaign, write_stats_csv
+from leads import build_search_query, load_config
+from refresh import DEFAULT_BUDGET, DEFAULT_MAX_AGE_DAYS, refresh_companies
+from utils.csv_stream import csv_lines, ndjson_lines
+from utils.http_client import get_cache
+from utils.metrics import REGISTRY
+from utils.minhash import DUPLICATE_THRESHOLD, similarity
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -38,9 +56,209 @@ if not app.config["SQLALCHEMY_DATABASE_URI"]:
 # Initialize database
 db.init_app(app)
 
-# Create tables if they don't exist
+# Create tables if they don't exist, then bring existing ones up to date
 with app.app_context():
     db.create_all()
+    try:
+        run_migrations(db.engine)
+    except Exception as e:
+        logger.error(f"Database migration failed: {str(e)}")
+        logger.error(traceback.format_exc())
+
+# Background scrape workers per process; set to 0 on hosts that can't run
+# background threads (e.g. serverless) and run `flask worker` elsewhere
+app.config["SCRAPE_JOB_WORKERS"] = int(os.environ.get("SCRAPE_JOB_WORKERS", 2))
+
+# Whether API clients may ask for profiled jobs, which write profile files on the server
+app.config["ALLOW_PROFILING"] = os.environ.get("ALLOW_PROFILING", "0") == "1"
+
+# Memory-mapped company vectors behind /api/companies/<id>/similar; `flask
+# migrate` builds them for existing companies, or the first lookup does
+app.config["SIMILAR_INDEX_PATH"] = SIMILAR_INDEX_PATH
+
+@app.before_request
+def ensure_job_runner():
+    if app.config["SCRAPE_JOB_WORKERS"] > 0:
+        start_job_runner(app, workers=app.config["SCRAPE_JOB_WORKERS"])
+
+@app.cli.command('worker')
+def worker():
+    """Run queued scrape jobs in the foreground until interrupted"""
+    runner = start_job_runner(app, workers=max(1, app.config["SCRAPE_JOB_WORKERS"]))
+    print(f"Job runner {runner.worker_id} waiting for jobs (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        runner.stop()
+
+@app.cli.command('http-cache')
+@click.option('--clear', is_flag=True, help='Delete every cached response')
+def http_cache(clear):
+    """Show the size of the HTTP response cache, or clear it"""
+    cache = get_cache()
+    if cache is None:
+        raise SystemExit("The HTTP cache is disabled (HTTP_CACHE=off)")
+    if clear:
+        cache.clear()
+    stats = cache.stats()
+    print(f"{cache.path}: {stats['entries']} responses, {stats['size_bytes'] / 1e6:.1f} MB compressed")
+
+@app.cli.command('campaign')
+@click.option('--config', 'config_path', default='scraper_config.json', help='Config file with a "campaign" section')
+@click.option('--max-results', type=int, default=None, help='Results per sub-query')
+@click.option('--search-concurrency', type=int, default=DEFAULT_SEARCH_CONCURRENCY, help='Searches run at once')
+@click.option('--concurrency', type=int, default=1, help='Concurrent page fetches')
+@click.option('--sleep-time', type=float, default=1.0, help='Seconds between requests to one host')
+@click.option('--output-csv', default='lead1.csv', help='CSV the results are appended to')
+@click.option('--stats-csv', default=None, help='Write per-sub-query stats to this CSV')
+@click.option('--dry-run', is_flag=True, help='Only print the sub-queries')
+def campaign(config_path, max_results, search_concurrency, concurrency, sleep_time, output_csv, stats_csv, dry_run):
+    """Run a multi-query campaign and report which sub-queries paid off"""
+    config = load_config(config_path)
+    if dry_run:
+        for sub_query in plan_campaign(config.get('campaign', {}), config):
+            print(build_search_query(**sub_query))
+        return
+    stats = []
+    totals = {}
+    for _ in stream_campaign(
+        config_path=config_path,
+        max_results=max_results,
+        search_concurrency=search_concurrency,
+        concurrency=concurrency,
+        sleep_time=sleep_time,
+        output_csv=output_csv,
+        totals=totals,
+        stats=stats
+    ):
+        pass
+    print(format_stats(stats))
+    print(f"{totals['count']} companies scraped ({totals['inserted']} new, {totals['updated']} updated)")
+    if stats_csv:
+        write_stats_csv(stats, stats_csv)
+
+@app.cli.command('refresh')
+@click.option('--max-age-days', type=float, default=None, help='Refresh companies scraped longer ago than this')
+@click.option('--budget', type=int, default=None, help='Most pages to fetch in this run')
+@click.option('--concurrency', type=int, default=1, help='Concurrent page fetches')
+@click.option('--sleep-time', type=float, default=1.0, help='Seconds between requests to one host')
+def refresh(max_age_days, budget, concurrency, sleep_time):
+    """Re-fetch stale companies and save only the ones whose pages changed"""
+    config = load_config()
+    stats = refresh_companies(
+        max_age_days=max_age_days if max_age_days is not None else config.get('refresh_max_age_days', DEFAULT_MAX_AGE_DAYS),
+        budget=budget if budget is not None else config.get('refresh_budget', DEFAULT_BUDGET),
+        concurrency=concurrency,
+        sleep_time=sleep_time,
+        base_url=config.get('linkedin_base_url')
+    )
+    print(
+        f"Selected {stats['selected']}: {stats['changed']} changed, {stats['unchanged']} unchanged, "
+        f"{stats['failed']} could not be fetched"
+    )
+
+@app.cli.command('nlp-cache')
+@click.option('--prune', is_flag=True, help='Delete enrichments cached by older NLP pipeline versions')
+def nlp_cache(prune):
+    """Show the size of the NLP enrichment cache, or prune stale versions"""
+    if prune:
+        print(f"Removed {prune_enrichments(NLP_PIPELINE_VERSION)} enrichments from older versions")
+    current = Enrichment.query.filter_by(version=NLP_PIPELINE_VERSION).count()
+    print(f"{current} descriptions cached for NLP pipeline version {NLP_PIPELINE_VERSION}")
+
+@app.cli.command('term-stats')
+@click.option('--rebuild', is_flag=True, help='Recount document frequencies from the stored descriptions')
+@click.option('--rescore', is_flag=True, help="Recompute every company's keywords against the term stats")
+@click.option('--top', type=int, default=20, help='Most common terms to list')
+def term_stats(rebuild, rescore, top):
+    """Show the corpus term stats behind TF-IDF keywords, rebuild them or rescore keywords"""
+    if rebuild:
+        with db.engine.begin() as connection:
+            rebuild_term_stats(connection)
+    if rescore:
+        print(f"Rescored keywords of {rescore_keywords()} companies")
+    documents = db.session.get(TermStat, DOCUMENTS_TERM)
+    common = TermStat.query.filter(TermStat.term != DOCUMENTS_TERM).order_by(TermStat.doc_count.desc()).limit(top).all()
+    print(f"{documents.doc_count if documents else 0} documents, "
+          f"{TermStat.query.count() - (1 if documents else 0)} terms")
+    print(', '.join(f"{stat.term} ({stat.doc_count})" for stat in common))
+
+@app.cli.command('duplicates')
+@click.option('--rescan', is_flag=True, help='Re-sign descriptions and rebuild all near-duplicate flags first')
+@click.option('--threshold', type=float, default=DUPLICATE_THRESHOLD, help='Similarity that counts as a duplicate (with --rescan)')
+@click.option('--merge', is_flag=True, help='Merge flagged duplicates into their originals')
+@click.option('--limit', type=int, default=20, help='Groups to list')
+def duplicates(rescan, threshold, merge, limit):
+    """Report companies whose descriptions nearly match an earlier company's, or merge them"""
+    if rescan:
+        with db.engine.begin() as connection:
+            flagged = reindex_duplicates(connection, threshold)
+        print(f"Rescanned: {flagged} near duplicates flagged")
+    groups = duplicate_groups()
+    for original, copies in groups[:limit]:
+        print(f"{original.id} {original.name} <{original.linkedin_url}>")
+        for company in copies:
+            print(f"    {company.id} {company.name} <{company.linkedin_url}> "
+                  f"similarity {similarity(original.minhash, company.minhash):.2f}")
+    print(f"{sum(len(copies) for _, copies in groups)} near duplicates of {len(groups)} companies")
+    if merge:
+        print(f"Merged {merge_duplicates(groups)} duplicates; their URLs won't be scraped again")
+
+@app.cli.command('export')
+@click.argument('path')
+@click.option('--format', 'export_format', type=click.Choice(list(EXPORT_FORMATS)), default='csv', help='Output format')
+@click.option('--fields', default=None, help='Comma-separated columns (default: all)')
+@click.option('--domain-class', default=None, help='Only this industry class')
+@click.option('--founded', default=None, help='Only companies founded in this year')
+def export(path, export_format, fields, domain_class, founded):
+    """Stream the company table to a file without loading it into memory"""
+    filters = {key: value for key, value in (('domain_class', domain_class), ('founded', founded)) if value}
+    try:
+        written = write_export(path, export_format, filters=filters, fields=parse_export_fields(fields))
+    except ValueError as e:
+        raise SystemExit(str(e))
+    print(f"Wrote {written / 1e6:.1f} MB to {path}")
+
+@app.cli.command('search-index')
+@click.option('--rebuild', is_flag=True, help='Rebuild the full-text index from the company table and compact it')
+def search_index(rebuild):
+    """Rebuild the full-text search index"""
+    if not rebuild:
+        raise SystemExit("The index is kept up to date automatically; pass --rebuild to rebuild it anyway")
+    start = time.perf_counter()
+    rebuild_search_index()
+    print(f"Rebuilt the search index over {Company.query.count()} companies in {time.perf_counter() - start:.1f}s")
+
+@app.cli.command('similar-index')
+@click.option('--rebuild', is_flag=True, help='Re-embed every company against the current term stats and compact the index')
+def similar_index(rebuild):
+    """Show or rebuild the company vectors behind similar-company lookups"""
+    if rebuild:
+        start = time.perf_counter()
+        indexed = rebuild_similar_index()
+        print(f"Rebuilt the similarity index over {indexed} companies in {time.perf_counter() - start:.1f}s")
+    elif ensure_similar_index():
+        print("Built the similarity index for the existing companies")
+    index = get_index()
+    print(f"{len(index)} vectors in {index.vectors_path} ({Company.query.count()} companies)")
+
+@app.cli.command('migrate')
+def migrate():
+    """Apply pending schema migrations to the configured database"""
+    applied = run_migrations(db.engine)
+    print(f"Applied {len(applied)} migrations: {', '.join(applied) or 'none pending'}")
+    indexed = ensure_similar_index()
+    if indexed:
+        print(f"Built the similarity index over {indexed} existing companies")
+
+@app.cli.command('prepare-nlp')
+def prepare_nlp():
+    """Download the NLTK corpora used by the NLP processor into the local data directory"""
+    if prepare_nlp_resources():
+        print("NLTK resources are ready")
+    else:
+        raise SystemExit("Some NLTK resources could not be downloaded")
 
 @app.route('/')
 def index():
@@ -68,57 +286,16 @@ def scrape():
         
         logger.debug(f"Scraping with parameters: keywords={keywords}, years={founded_years}, country={country}, size={size}")
         
-        # Run the scraper
-        results_df = run_scraper(
-            keywords=keywords,
-            founded_years=founded_years,
-            country=country,
-            size=size,
-            max_results=max_results,
-            sleep_time=sleep_time
-        )
-        
-        # Process descriptions with NLP
-        if not results_df.empty:
-            results_df = process_descriptions(results_df)
-            results_df.to_csv('lead1.csv', index=False)
-            
-            # Save to database
-            companies_saved = 0
-            for _, row in results_df.iterrows():
-                try:
-                    # Convert row to dict and create Company object
-                    company_data = row.to_dict()
-                    
-                    # Check if company already exists (by LinkedIn URL)
-                    existing_company = Company.query.filter_by(linkedin_url=company_data.get('companyLinkedinUrl')).first()
-                    
-                    if existing_company:
-                        # Update existing company
-                        for key, value in company_data.items():
-                            if key == 'companyLinkedinUrl':
-                                continue  # Skip the URL as it's already set
-                            if hasattr(existing_company, key):
-                                setattr(existing_company, key, value)
-                            elif key == 'linkedin_url':
-                                setattr(existing_company, 'linkedin_url', value)
-                        db.session.commit()
-                    else:
-                        # Create new company record
-                        new_company = Company.from_dict(company_data)
-                        db.session.add(new_company)
-                        db.session.commit()
-                    
-                    companies_saved += 1
-                except Exception as e:
-                    logger.error(f"Error saving company to database: {str(e)}")
-                    db.session.rollback()
-            
-            flash(f"Scraping completed successfully! Saved {companies_saved} companies to database.", "success")
-            return render_template('results.html', results=results_df.to_dict('records'))
-        else:
-            flash("No results found. Try adjusting your search parameters.", "warning")
-            return redirect(url_for('index'))
+        # Queue the scrape; the job page shows progress and then the results
+        job = submit_job({
+            'keywords': keywords,
+            'founded_years': founded_years,
+            'country': country,
+            'size': size,
+            'max_results': max_results,
+            'sleep_time': sleep_time
+        })
+        return redirect(url_for('view_job', job_id=job.id))
             
     except Exception as e:
         logger.error(f"Error during scraping: {str(e)}")
@@ -126,83 +303,186 @@ def scrape():
         flash(f"An error occurred: {str(e)}", "danger")
         return redirect(url_for('index'))
 
+@app.route('/jobs/<job_id>')
+def view_job(job_id):
+    job = get_job(job_id)
+    if job is None:
+        flash("Scrape job not found.", "warning")
+        return redirect(url_for('index'))
+    if job.status == 'failed':
+        flash(f"An error occurred: {job.error}", "danger")
+        return redirect(url_for('index'))
+    if job.status == 'succeeded':
+        results = list(job_results(job))
+        if not results:
+            flash("No new companies found. Companies scraped in the last week are skipped; try adjusting your search parameters.", "warning")
+            return redirect(url_for('index'))
+        flash(f"Scraping completed successfully! Saved {job.inserted + job.updated} companies to database.", "success")
+        return render_template('results.html', results=results)
+    return render_template('job.html', job=job.to_dict())
+
 @app.route('/download')
 def download():
+    """
+    Export companies from the database, streamed in cursor batches
+    ?format=csv (default), csv.gz, ndjson, parquet or arrow; ?fields=a,b picks
+    columns; the listing filters (name, domain_class, sentiment, founded) apply.
+    ?source=last_run serves lead1.csv from the most recent scrape instead
+    """
     try:
-        # Create a CSV string from the DataFrame
-        if os.path.exists('lead1.csv'):
-            return send_file('lead1.csv', as_attachment=True)
-        else:
+        if request.args.get('source') == 'last_run':
+            if os.path.exists('lead1.csv'):
+                return send_file('lead1.csv', as_attachment=True)
             flash("No data available to download. Please run a scrape first.", "warning")
             return redirect(url_for('index'))
+        
+        export_format = request.args.get('format', 'csv')
+        fields = parse_export_fields(request.args.get('fields'))
+        chunks = export_chunks(export_format, filters=parse_filters(request.args), fields=fields)
+        mimetype = EXPORT_FORMATS[export_format][0]
+        return app.response_class(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{export_filename(export_format)}"'}
+        )
+    except ValueError as e:
+        flash(str(e), "danger")
+        return redirect(url_for('view_companies'))
     except Exception as e:
         flash(f"Error downloading file: {str(e)}", "danger")
         return redirect(url_for('index'))
 
+def _list_args():
+    """
+    Read listing parameters shared by the HTML and JSON company views
+    """
+    return {
+        'filters': parse_filters(request.args),
+        'sort': request.args.get('sort', 'id'),
+        'direction': 'desc' if request.args.get('direction') == 'desc' else 'asc',
+        'cursor': request.args.get('cursor') or None,
+        'limit': request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+    }
+
 @app.route('/companies')
 def view_companies():
     try:
-        # Get companies from database
-        companies = Company.query.all()
-        company_list = [company.to_dict() for company in companies]
+        # Get one page of companies from the database
+        list_args = _list_args()
+        companies, next_cursor = list_companies(**list_args)
         
         # Pass to template for display
-        return render_template('companies.html', companies=company_list)
+        return render_template(
+            'companies.html',
+            companies=companies,
+            next_cursor=next_cursor,
+            filters=list_args['filters'],
+            sort=list_args['sort'],
+            direction=list_args['direction'],
+            limit=list_args['limit'],
+            sort_fields=SORT_FIELDS,
+            domain_classes=domain_class_options()
+        )
+    except ValueError as e:
+        flash(f"Invalid listing parameters: {str(e)}", "warning")
+        return redirect(url_for('view_companies'))
     except Exception as e:
         logger.error(f"Error viewing companies: {str(e)}")
         logger.error(traceback.format_exc())
         flash(f"Error retrieving companies: {str(e)}", "danger")
         return redirect(url_for('index'))
 
+@app.route('/api/companies')
+def api_companies():
+    try:
+        list_args = _list_args()
+        fields = request.args.get('fields')
+        if fields:
+            list_args['fields'] = tuple(field.strip() for field in fields.split(',') if field.strip())
+        companies, next_cursor = list_companies(**list_args)
+        return jsonify({'companies': companies, 'next_cursor': next_cursor, 'count': len(companies)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"API error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/search')
+def api_search():
+    """
+    Full-text search: ?q=cloud "data platform" analyt* ranked best first, with
+    <mark>ed description snippets; the listing filters and ?fields= also apply
+    """
+    try:
+        options = {}
+        fields = request.args.get('fields')
+        if fields:
+            options['fields'] = tuple(field.strip() for field in fields.split(',') if field.strip())
+        results, next_offset = search_companies(
+            request.args.get('q', ''),
+            filters=parse_filters(request.args),
+            limit=request.args.get('limit', SEARCH_LIMIT, type=int),
+            offset=request.args.get('offset', 0, type=int),
+            **options
+        )
+        return jsonify({'results': results, 'next_offset': next_offset, 'count': len(results)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Search error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/companies/<int:company_id>/similar')
+def api_similar_companies(company_id):
+    """
+    Companies most like this one by description, domain class and technologies,
+    best first with their cosine similarity; ?limit= and ?fields= apply
+    """
+    try:
+        options = {}
+        fields = request.args.get('fields')
+        if fields:
+            options['fields'] = tuple(field.strip() for field in fields.split(',') if field.strip())
+        results = similar_companies(company_id, limit=request.args.get('limit', SIMILAR_LIMIT, type=int), **options)
+        if results is None:
+            return jsonify({'error': 'Company not found'}), 404
+        return jsonify({'company_id': company_id, 'results': results, 'count': len(results)})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Similar companies error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/scrape', methods=['POST'])
 def api_scrape():
     try:
         body = request.get_json()
-        keywords = body.get('keywords', 'IT services')
-        founded_years = body.get('founded_years', ['2015'])
-        country = body.get('country', 'United kingdom')
-        size = body.get('size', '51-200')
-        
-        # Run the scraper
-        df = run_scraper(keywords, founded_years, country, size)
-        
-        # Process with NLP
-        df = process_descriptions(df)
-        
-        # Save to CSV
-        df.to_csv('lead1.csv', index=False)
-        
-        # Save to database
-        for _, row in df.iterrows():
-            try:
-                company_data = row.to_dict()
-                existing_company = Company.query.filter_by(linkedin_url=company_data.get('companyLinkedinUrl')).first()
-                
-                if existing_company:
-                    # Update existing company
-                    for key, value in company_data.items():
-                        if key == 'companyLinkedinUrl':
-                            continue
-                        if hasattr(existing_company, key):
-                            setattr(existing_company, key, value)
-                        elif key == 'linkedin_url':
-                            setattr(existing_company, 'linkedin_url', value)
-                    db.session.commit()
-                else:
-                    # Create new company record
-                    new_company = Company.from_dict(company_data)
-                    db.session.add(new_company)
-                    db.session.commit()
-            except Exception as e:
-                logger.error(f"Error saving company to database: {str(e)}")
-                db.session.rollback()
+        params = {
+            'keywords': body.get('keywords', 'IT services'),
+            'founded_years': body.get('founded_years', ['2015']),
+            'country': body.get('country', 'United kingdom'),
+            'size': body.get('size', '51-200')
+        }
+        # "profile": true (or "sampling") profiles the run where ALLOW_PROFILING is set;
+        # with "cache_mode": "offline" it replays cached pages without touching the network
+        for key in ('profile', 'cache_mode'):
+            if key in body:
+                params[key] = body[key]
+        job = submit_job(params)
         
-        # Return as CSV string
-        csv_str = df.to_csv(index=False)
+        # The scrape runs in the background; poll the job for status and results
         return {
-            "statusCode": 200,
-            "headers": {"Content-Type": "text/csv"},
-            "body": csv_str
+            "statusCode": 202,
+            "headers": {"Content-Type": "application/json"},
+            "body": json.dumps(_job_links(job))
+        }
+    except ValueError as e:
+        return {
+            "statusCode": 400,
+            "body": json.dumps({"error": str(e)})
         }
     except Exception as e:
         logger.error(f"API error: {str(e)}")
@@ -212,5 +492,102 @@ def api_scrape():
             "body": json.dumps({"error": str(e)})
         }
 
+@app.route('/api/scrape/stream', methods=['POST'])
+def api_scrape_stream():
+    """
+    Scrape inside the request and stream each company back as soon as it is
+    saved, as NDJSON (default) or CSV; nothing is buffered server-side
+    """
+    body = request.get_json() or {}
+    output_format = request.args.get('format', 'ndjson')
+    if output_format not in ('ndjson', 'csv'):
+        return jsonify({'error': f"Unsupported format: {output_format}"}), 400
+    # Profiling is for background jobs (see /api/jobs/<id>/profile)
+    params = {key: body[key] for key in JOB_PARAMS if key in body and key != 'profile'}
+    
+    records = stream_scrape(params, output_csv='lead1.csv')
+    if output_format == 'csv':
+        return app.response_class(stream_with_context(csv_lines(records, RESULT_COLUMNS)), mimetype='text/csv')
+    return app.response_class(stream_with_context(ndjson_lines(records)), mimetype='application/x-ndjson')
+
+def _job_links(job):
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': url_for('api_job', job_id=job.id),
+        'results_url': url_for('api_job_results', job_id=job.id)
+    }
+
+@app.route('/api/jobs', methods=['GET', 'POST'])
+def api_jobs():
+    if request.method == 'GET':
+        return jsonify({'jobs': [job.to_dict() for job in recent_jobs(request.args.get('limit', 50, type=int))]})
+    try:
+        job = submit_job(request.get_json() or {})
+        return jsonify(_job_links(job)), 202
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"API error: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>')
+def api_job(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/api/jobs/<job_id>/results')
+def api_job_results(job_id):
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status != 'succeeded':
+        return jsonify({'error': job.error or 'Job has not finished', 'status': job.status}), 409
+    # Read back from the job's CSV as the response is sent, never loaded whole
+    output_format = request.args.get('format', 'json')
+    if output_format == 'csv' and job.output_csv and os.path.exists(job.output_csv):
+        return send_file(job.output_csv, mimetype='text/csv')
+    records = job_results(job)
+    if output_format == 'csv':
+        return app.response_class(stream_with_context(csv_lines(records, RESULT_COLUMNS)), mimetype='text/csv')
+    if output_format == 'ndjson':
+        return app.response_class(stream_with_context(ndjson_lines(records)), mimetype='application/x-ndjson')
+    header = {
+        'job_id': job.id,
+        'count': job.result_count,
+        'output_csv': job.output_csv,
+        'timings': json.loads(job.timings) if job.timings else None,
+    }
+    return app.response_class(stream_with_context(_json_results(header, records)), mimetype='application/json')
+
+def _json_results(header, records):
+    """`header` as a JSON object with the records streamed into its "results" list"""
+    yield json.dumps(header)[:-1] + ', "results": ['
+    for index, record in enumerate(records):
+        yield (', ' if index else '') + json.dumps(record, default=str)
+    yield ']}'
+
+@app.route('/api/jobs/<job_id>/profile')
+def api_job_profile(job_id):
+    """Download a profiled job's flamegraph stacks (default) or pstats file"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    profile = (json.loads(job.timings) if job.timings else {}).get('profile')
+    if profile is None:
+        return jsonify({'error': 'Job was not profiled', 'status': job.status}), 404
+    if request.args.get('format', 'collapsed') == 'pstats':
+        return send_file(profile['pstats'], as_attachment=True, download_name=f"job-{job.id}.pstats")
+    return send_file(profile['collapsed'], mimetype='text/plain', as_attachment=True,
+                     download_name=f"job-{job.id}.collapsed")
+
+@app.route('/metrics')
+def metrics():
+    """Stage timers and counters for this process, in the Prometheus text format"""
+    return app.response_class(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,213 @@
+"""
+Lightweight schema migrations for existing SQLite and Postgres databases
+
+db.create_all() only creates missing tables, so changes to existing tables
+(new indexes, constraints, columns) are applied here, in order, exactly once.
+Applied versions are recorded in the schema_migrations table.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, MetaData, String, Table, inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from company_search import create_search_index
+from duplicates import reindex_duplicates
+from keywords import rebuild_term_stats
+from models import CompanyAlias, MinHashBucket, TermStat, parse_founded_year
+from utils.fingerprint import CONTENT_FIELDS, content_hash
+from utils.urls import normalize_linkedin_url
+
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations', metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+def dedupe_linkedin_urls(connection):
+    """
+    Normalize stored LinkedIn URLs and drop duplicate rows, keeping the most
+    recently scraped row for each company
+    """
+    rows = connection.execute(text('SELECT id, linkedin_url, scraped_at FROM company')).fetchall()
+
+    keep = {}
+    renames = []
+    deletes = []
+    for company_id, url, scraped_at in rows:
+        normalized = normalize_linkedin_url(url)
+        if normalized != url:
+            renames.append({'id': company_id, 'url': normalized})
+        if normalized is None:
+            continue
+        current = keep.get(normalized)
+        # SQLite hands back timestamps as ISO strings, Postgres as datetimes; both sort as text
+        candidate = (str(scraped_at) if scraped_at else '', company_id)
+        if current is None:
+            keep[normalized] = candidate
+        elif candidate > current:
+            deletes.append({'id': current[1]})
+            keep[normalized] = candidate
+        else:
+            deletes.append({'id': company_id})
+
+    if deletes:
+        connection.execute(text('DELETE FROM company WHERE id = :id'), deletes)
+    deleted = {row['id'] for row in deletes}
+    renames = [row for row in renames if row['id'] not in deleted]
+    if renames:
+        connection.execute(text('UPDATE company SET linkedin_url = :url WHERE id = :id'), renames)
+    logger.info(f"Deduplicated company URLs: {len(deletes)} duplicates removed, {len(renames)} URLs normalized")
+
+def add_company_indexes(connection):
+    """
+    Unique index on linkedin_url plus indexes on the common filter/sort columns
+    Names match the ones db.create_all() gives a fresh database
+    """
+    statements = [
+        'CREATE UNIQUE INDEX IF NOT EXISTS ix_company_linkedin_url ON company (linkedin_url)',
+        'CREATE INDEX IF NOT EXISTS ix_company_domain_class ON company (domain_class)',
+        'CREATE INDEX IF NOT EXISTS ix_company_founded ON company (founded)',
+        'CREATE INDEX IF NOT EXISTS ix_company_scraped_at ON company (scraped_at)',
+    ]
+    for statement in statements:
+        connection.execute(text(statement))
+
+def add_company_content_hash(connection):
+    """
+    Add company.content_hash and fill it in for rows scraped before it existed
+    """
+    columns = {column['name'] for column in inspect(connection).get_columns('company')}
+    if 'content_hash' not in columns:
+        connection.execute(text('ALTER TABLE company ADD COLUMN content_hash VARCHAR(64)'))
+
+    fields = ', '.join(CONTENT_FIELDS)
+    rows = connection.execute(text(f'SELECT id, {fields} FROM company WHERE content_hash IS NULL')).fetchall()
+    updates = [{'id': row.id, 'hash': content_hash(row._mapping)} for row in rows]
+    if updates:
+        connection.execute(text('UPDATE company SET content_hash = :hash WHERE id = :id'), updates)
+    logger.info(f"Computed content hashes for {len(updates)} companies")
+
+def add_scrape_job_timings(connection):
+    """
+    Add scrape_job.timings, the per-stage timing summary of a finished job
+    """
+    inspector = inspect(connection)
+    if not inspector.has_table('scrape_job'):
+        return
+    if 'timings' not in {column['name'] for column in inspector.get_columns('scrape_job')}:
+        connection.execute(text('ALTER TABLE scrape_job ADD COLUMN timings TEXT'))
+
+def add_company_search_index(connection):
+    """
+    Full-text index over company text (FTS5 on SQLite, tsvector + GIN on Postgres),
+    filled from the rows already stored
+    """
+    create_search_index(connection)
+
+def add_company_minhash(connection):
+    """
+    Add company.minhash and company.duplicate_of and the LSH bucket and alias
+    tables, then sign and index the companies already stored
+    """
+    columns = {column['name'] for column in inspect(connection).get_columns('company')}
+    if 'minhash' not in columns:
+        binary = LargeBinary().compile(dialect=connection.dialect)
+        connection.execute(text(f'ALTER TABLE company ADD COLUMN minhash {binary}'))
+    if 'duplicate_of' not in columns:
+        connection.execute(text('ALTER TABLE company ADD COLUMN duplicate_of INTEGER'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_company_duplicate_of ON company (duplicate_of)'))
+    MinHashBucket.__table__.create(connection, checkfirst=True)
+    CompanyAlias.__table__.create(connection, checkfirst=True)
+    reindex_duplicates(connection)
+
+def add_term_stats(connection):
+    """
+    Create the term_stat table behind TF-IDF keywords and count the stored descriptions
+    """
+    TermStat.__table__.create(connection, checkfirst=True)
+    rebuild_term_stats(connection)
+
+def add_scrape_job_output_csv(connection):
+    """
+    Add scrape_job.output_csv, the per-job CSV a finished job wrote its records to
+    """
+    inspector = inspect(connection)
+    if not inspector.has_table('scrape_job'):
+        return
+    if 'output_csv' not in {column['name'] for column in inspector.get_columns('scrape_job')}:
+        connection.execute(text('ALTER TABLE scrape_job ADD COLUMN output_csv VARCHAR(500)'))
+
+def add_company_founded_year(connection):
+    """
+    Add company.founded_year, filled from the stored founded text, plus the
+    name index (sorting) and lower(name) index (prefix filters)
+    """
+    if 'founded_year' not in {column['name'] for column in inspect(connection).get_columns('company')}:
+        connection.execute(text('ALTER TABLE company ADD COLUMN founded_year INTEGER'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_company_founded_year ON company (founded_year)'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_company_name ON company (name)'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_company_name_lower ON company (lower(name))'))
+    rows = connection.execute(text('SELECT id, founded FROM company WHERE founded IS NOT NULL')).fetchall()
+    years = [{'id': company_id, 'year': parse_founded_year(founded)} for company_id, founded in rows]
+    years = [row for row in years if row['year'] is not None]
+    if years:
+        connection.execute(text('UPDATE company SET founded_year = :year WHERE id = :id'), years)
+
+def add_company_refresh_backoff(connection):
+    """
+    Add company.refresh_failures and refresh_retry_after, so refreshes back off
+    from pages that keep failing to fetch
+    """
+    columns = {column['name'] for column in inspect(connection).get_columns('company')}
+    if 'refresh_failures' not in columns:
+        connection.execute(text('ALTER TABLE company ADD COLUMN refresh_failures INTEGER DEFAULT 0'))
+    if 'refresh_retry_after' not in columns:
+        timestamp = DateTime().compile(dialect=connection.dialect)
+        connection.execute(text(f'ALTER TABLE company ADD COLUMN refresh_retry_after {timestamp}'))
+
+# (version, name, function taking a connection); append only, never reorder
+MIGRATIONS = [
+    (1, 'dedupe_linkedin_urls', dedupe_linkedin_urls),
+    (2, 'add_company_indexes', add_company_indexes),
+    (3, 'add_company_content_hash', add_company_content_hash),
+    (4, 'add_scrape_job_timings', add_scrape_job_timings),
+    (5, 'add_company_search_index', add_company_search_index),
+    (6, 'add_company_minhash', add_company_minhash),
+    (7, 'add_term_stats', add_term_stats),
+    (8, 'add_scrape_job_output_csv', add_scrape_job_output_csv),
+    (9, 'add_company_founded_year', add_company_founded_year),
+    (10, 'add_company_refresh_backoff', add_company_refresh_backoff),
+]
+
+def run_migrations(engine):
+    """
+    Apply pending migrations, each in its own transaction
+    Returns the names of the migrations that were applied
+    """
+    metadata.create_all(engine)
+    with engine.connect() as connection:
+        applied_versions = {row[0] for row in connection.execute(schema_migrations.select())}
+
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version in applied_versions:
+            continue
+        logger.info(f"Applying migration {version}: {name}")
+        try:
+            with engine.begin() as connection:
+                migrate(connection)
+                connection.execute(schema_migrations.insert().values(
+                    version=version, name=name, applied_at=datetime.now()
+                ))
+        except IntegrityError:
+            # Another process applied this migration first
+            logger.info(f"Migration {version} was applied concurrently")
+            continue
+        applied.append(name)
+    return applied
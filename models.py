@@ -1,5 +1,18 @@
+import json
+import logging
+import math
+import re
+from collections import Counter
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from utils.fingerprint import CONTENT_FIELDS, content_hash
+from utils.metrics import ROWS_SAVED, timed
+from utils.minhash import signature_bytes
+from utils.urls import normalize_linkedin_url
+
+logger = logging.getLogger(__name__)
 
 # Initialize SQLAlchemy
 db = SQLAlchemy()
@@ -7,20 +20,37 @@ db = SQLAlchemy()
 class Company(db.Model):
     """Model for storing LinkedIn company data"""
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(255), nullable=False)
+    name = db.Column(db.String(255), nullable=False, index=True)
     description = db.Column(db.Text)
     website = db.Column(db.String(255))
-    linkedin_url = db.Column(db.String(255))
+    # Stored normalized (see utils.urls.normalize_linkedin_url); NULL when unknown
+    linkedin_url = db.Column(db.String(255), unique=True, index=True)
     domain = db.Column(db.String(100))
-    domain_class = db.Column(db.String(50))
+    domain_class = db.Column(db.String(50), index=True)
     size = db.Column(db.String(100))
     location = db.Column(db.String(255))
-    founded = db.Column(db.String(100))
+    founded = db.Column(db.String(100), index=True)
+    # Year parsed out of the scraped founded text, for exact filtering
+    founded_year = db.Column(db.Integer, index=True)
     keywords = db.Column(db.Text)
     technologies = db.Column(db.Text)
     sentiment = db.Column(db.String(20))
     description_length = db.Column(db.Integer)
-    scraped_at = db.Column(db.DateTime, default=datetime.now)
+    scraped_at = db.Column(db.DateTime, default=datetime.now, index=True)
+    # Hash of the scraped content fields (utils.fingerprint), to spot unchanged pages
+    content_hash = db.Column(db.String(64))
+    # MinHash signature of the description (utils.minhash); NULL for short or missing ones
+    minhash = db.Column(db.LargeBinary)
+    # Set when the description nearly matches an earlier company's (see duplicates.py)
+    duplicate_of = db.Column(db.Integer, index=True)
+    # Consecutive refreshes that could not fetch the page, and when to try it again (see refresh.py)
+    refresh_failures = db.Column(db.Integer, default=0)
+    refresh_retry_after = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Serves case-insensitive name prefix filters (company_queries.apply_filters)
+        db.Index('ix_company_name_lower', db.func.lower(name)),
+    )
     
     def __repr__(self):
         return f'<Company {self.name}>'
@@ -52,15 +82,420 @@ class Company(db.Model):
             name=data.get('name', ''),
             description=data.get('description', ''),
             website=data.get('website', ''),
-            linkedin_url=data.get('companyLinkedinUrl', ''),
+            linkedin_url=normalize_linkedin_url(data.get('companyLinkedinUrl')),
             domain=data.get('domain', ''),
             domain_class=data.get('domain_class', ''),
             size=data.get('size', ''),
             location=data.get('location', ''),
             founded=data.get('founded', ''),
+            founded_year=parse_founded_year(data.get('founded')),
             keywords=data.get('keywords', ''),
             technologies=data.get('technologies', ''),
             sentiment=data.get('sentiment', ''),
             description_length=data.get('description_length', 0),
-            scraped_at=datetime.now()
-        )
\ No newline at end of file
+            scraped_at=datetime.now(),
+            content_hash=content_hash(data),
+            minhash=signature_bytes(data.get('description'))
+        )
+
+YEAR_PATTERN = re.compile(r'\b(1[5-9]\d\d|20\d\d)\b')
+
+def parse_founded_year(value):
+    """
+    The year in scraped founded text such as "Founded 2016", or None
+    """
+    if not isinstance(value, str):
+        return None
+    match = YEAR_PATTERN.search(value)
+    return int(match.group(1)) if match else None
+
+# Company columns that can be written from a scraped/enriched record
+COMPANY_FIELDS = (
+    'name', 'description', 'website', 'linkedin_url', 'domain', 'domain_class',
+    'size', 'location', 'founded', 'keywords', 'technologies', 'sentiment',
+    'description_length', 'scraped_at'
+)
+
+# Keep parameter lists well under SQLite's bound-variable limit
+LOOKUP_BATCH_SIZE = 500
+
+def _clean(value):
+    # pandas hands missing values over as NaN
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value
+
+def company_values(data):
+    """
+    Map a scraped record (DataFrame row dict) onto Company column values
+    """
+    values = {}
+    for field in COMPANY_FIELDS:
+        key = 'companyLinkedinUrl' if field == 'linkedin_url' else field
+        if key in data:
+            values[field] = _clean(data[key])
+    if values.get('name') is None:
+        values['name'] = ''
+    if 'linkedin_url' in values:
+        values['linkedin_url'] = normalize_linkedin_url(values['linkedin_url'])
+    if values.get('description_length') is not None:
+        values['description_length'] = int(values['description_length'])
+    if 'founded' in values:
+        values['founded_year'] = parse_founded_year(values['founded'])
+    if any(field in values for field in CONTENT_FIELDS):
+        values['content_hash'] = content_hash(values)
+    if 'description' in values:
+        values['minhash'] = signature_bytes(values['description'])
+    scraped_at = values.get('scraped_at')
+    if isinstance(scraped_at, str):
+        scraped_at = datetime.strptime(scraped_at, '%Y-%m-%d %H:%M:%S')
+    values['scraped_at'] = scraped_at or datetime.now()
+    return values
+
+def _existing_ids(urls):
+    """
+    Look up the ids of companies already stored for the given LinkedIn URLs
+    """
+    existing = {}
+    urls = list(urls)
+    for start in range(0, len(urls), LOOKUP_BATCH_SIZE):
+        chunk = urls[start:start + LOOKUP_BATCH_SIZE]
+        rows = db.session.execute(
+            select(Company.id, Company.linkedin_url).where(Company.linkedin_url.in_(chunk))
+        )
+        for company_id, url in rows:
+            existing.setdefault(url, company_id)
+    return existing
+
+def recently_scraped_urls(urls, since):
+    """
+    The subset of (normalized) LinkedIn URLs whose company was scraped at or after `since`
+    """
+    recent = set()
+    urls = list(urls)
+    for start in range(0, len(urls), LOOKUP_BATCH_SIZE):
+        chunk = urls[start:start + LOOKUP_BATCH_SIZE]
+        rows = db.session.execute(
+            select(Company.linkedin_url).where(Company.linkedin_url.in_(chunk), Company.scraped_at >= since)
+        )
+        recent.update(url for url, in rows)
+    return recent
+
+def _execute_batch(statement, rows, errors):
+    """
+    Run one executemany inside a savepoint; if it fails, retry row by row so a
+    single bad record is reported without rolling back the rest of the batch
+    """
+    if not rows:
+        return 0
+    try:
+        with db.session.begin_nested():
+            db.session.execute(statement, [values for _, values in rows])
+        return len(rows)
+    except Exception as e:
+        logger.warning(f"Batch write failed ({str(e)}), retrying row by row")
+
+    written = 0
+    for index, values in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(statement, [values])
+            written += 1
+        except Exception as e:
+            errors.append({'index': index, 'linkedin_url': values.get('linkedin_url'), 'error': str(e)})
+    return written
+
+UPSERT_DIALECTS = {'postgresql': postgresql, 'sqlite': sqlite}
+
+def _upsert_statement(dialect_name, fields):
+    """
+    INSERT ... ON CONFLICT (linkedin_url) DO UPDATE of the given fields
+    Fields missing from the records are left untouched on existing rows
+    """
+    statement = UPSERT_DIALECTS[dialect_name].insert(Company.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=['linkedin_url'],
+        set_={field: statement.excluded[field] for field in fields if field != 'linkedin_url'}
+    )
+
+def upsert_companies(records):
+    """
+    Insert or update scraped companies, matched by normalized LinkedIn URL
+    Existing URLs are loaded in one query to tell inserts from updates; rows are
+    then written with batched INSERT ... ON CONFLICT statements (or a batched
+    INSERT plus UPDATE on other databases) in a single transaction
+    Returns a dict with inserted/updated counts and per-row errors
+    """
+    with timed('db_save'):
+        result = _upsert_companies(records)
+    ROWS_SAVED.inc(result['inserted'], result='inserted')
+    ROWS_SAVED.inc(result['updated'], result='updated')
+    ROWS_SAVED.inc(len(result['errors']), result='error')
+    return result
+
+def _upsert_companies(records):
+    if hasattr(records, 'to_dict'):
+        records = records.to_dict('records')
+
+    errors = []
+    by_url = {}
+    without_url = []
+    for index, data in enumerate(records):
+        try:
+            values = company_values(data)
+        except Exception as e:
+            errors.append({'index': index, 'linkedin_url': data.get('companyLinkedinUrl'), 'error': str(e)})
+            continue
+        if values.get('linkedin_url'):
+            # The last record for a URL wins, like the row-by-row updates did
+            by_url[values['linkedin_url']] = (index, values)
+        else:
+            without_url.append((index, values))
+
+    existing = _existing_ids(by_url)
+    dialect_name = db.session.get_bind().dialect.name
+    try:
+        inserted = _execute_batch(insert(Company), without_url, errors)
+        if dialect_name in UPSERT_DIALECTS:
+            # executemany needs one statement per set of columns
+            groups = {}
+            for index, values in by_url.values():
+                groups.setdefault(tuple(values), []).append((index, values))
+            written = sum(
+                _execute_batch(_upsert_statement(dialect_name, fields), rows, errors)
+                for fields, rows in groups.items()
+            )
+            failed = {error['linkedin_url'] for error in errors}
+            updated = sum(1 for url in existing if url not in failed)
+            inserted += written - updated
+        else:
+            inserts = []
+            updates = []
+            for url, (index, values) in by_url.items():
+                if url in existing:
+                    updates.append((index, dict(values, id=existing[url])))
+                else:
+                    inserts.append((index, values))
+            inserted += _execute_batch(insert(Company), inserts, errors)
+            updated = _execute_batch(update(Company), updates, errors)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for error in errors:
+        logger.error(f"Error saving company {error['linkedin_url']} to database: {error['error']}")
+    return {'inserted': inserted, 'updated': updated, 'errors': errors}
+
+class ScrapeJob(db.Model):
+    """Background scrape job; the table doubles as the queue shared by all app processes"""
+    id = db.Column(db.String(32), primary_key=True)
+    # queued -> running -> succeeded | failed
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    params = db.Column(db.Text, nullable=False)
+    progress_done = db.Column(db.Integer, default=0)
+    progress_total = db.Column(db.Integer)
+    attempts = db.Column(db.Integer, default=0)
+    worker = db.Column(db.String(100))
+    inserted = db.Column(db.Integer)
+    updated = db.Column(db.Integer)
+    result_count = db.Column(db.Integer)
+    # CSV file the job's records were written to, served by the results endpoint
+    output_csv = db.Column(db.String(500))
+    # JSON list of the enriched records; only jobs from before output_csv have it
+    results = db.Column(db.Text)
+    # JSON per-stage timing summary (utils.metrics.TimingSummary)
+    timings = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.now, index=True)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<ScrapeJob {self.id} {self.status}>'
+    
+    @property
+    def finished(self):
+        return self.status in ('succeeded', 'failed')
+    
+    def to_dict(self):
+        """Convert ScrapeJob object to dictionary (without the results)"""
+        def timestamp(value):
+            return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+        return {
+            'id': self.id,
+            'status': self.status,
+            'params': json.loads(self.params),
+            'progress': {'done': self.progress_done or 0, 'total': self.progress_total},
+            'attempts': self.attempts,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'result_count': self.result_count,
+            'output_csv': self.output_csv,
+            'error': self.error,
+            'timings': json.loads(self.timings) if self.timings else None,
+            'created_at': timestamp(self.created_at),
+            'started_at': timestamp(self.started_at),
+            'finished_at': timestamp(self.finished_at)
+        }
+
+class MinHashBucket(db.Model):
+    """LSH band index: companies whose signatures agree on a whole band share a bucket"""
+    __tablename__ = 'minhash_bucket'
+    bucket = db.Column(db.BigInteger, primary_key=True)
+    company_id = db.Column(db.Integer, primary_key=True, index=True)
+
+class CompanyAlias(db.Model):
+    """LinkedIn URL of a duplicate merged into another company, so it is not scraped again"""
+    linkedin_url = db.Column(db.String(255), primary_key=True)
+    company_id = db.Column(db.Integer, nullable=False, index=True)
+    merged_at = db.Column(db.DateTime, default=datetime.now)
+
+class Enrichment(db.Model):
+    """NLP output for one description text, keyed by its hash and the NLP pipeline version"""
+    description_hash = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, primary_key=True)
+    keywords = db.Column(db.Text)
+    technologies = db.Column(db.Text)
+    sentiment = db.Column(db.String(20))
+    description_length = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+
+ENRICHMENT_FIELDS = ('keywords', 'technologies', 'sentiment', 'description_length')
+
+class DatabaseEnrichmentCache:
+    """
+    Enrichment cache for utils.nlp_processor backed by the enrichment table
+    Only rows written under `version` are read, so bumping the pipeline version
+    invalidates everything cached before it. Needs an app context
+    """
+    def __init__(self, version):
+        self.version = version
+    
+    def get(self, hashes):
+        hashes = list(hashes)
+        found = {}
+        for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+            rows = db.session.execute(
+                select(Enrichment).where(
+                    Enrichment.version == self.version,
+                    Enrichment.description_hash.in_(hashes[start:start + LOOKUP_BATCH_SIZE])
+                )
+            ).scalars()
+            found.update(
+                (row.description_hash, {field: getattr(row, field) for field in ENRICHMENT_FIELDS}) for row in rows
+            )
+        return found
+    
+    def put(self, entries):
+        rows = [
+            dict({field: values[field] for field in ENRICHMENT_FIELDS},
+                 description_hash=description_hash, version=self.version, created_at=datetime.now())
+            for description_hash, values in entries.items()
+        ]
+        if not rows:
+            return
+        dialect_name = db.session.get_bind().dialect.name
+        try:
+            if dialect_name in UPSERT_DIALECTS:
+                # Another worker may have cached the same text meanwhile; either copy will do
+                statement = UPSERT_DIALECTS[dialect_name].insert(Enrichment.__table__).on_conflict_do_nothing()
+                db.session.execute(statement, rows)
+            else:
+                existing = set(self.get(entries))
+                rows = [row for row in rows if row['description_hash'] not in existing]
+                if rows:
+                    db.session.execute(insert(Enrichment), rows)
+            db.session.commit()
+        except Exception as e:
+            # The cache is an optimization; a failed write only means recomputing later
+            db.session.rollback()
+            logger.warning(f"Could not cache {len(rows)} enrichments: {str(e)}")
+
+def prune_enrichments(keep_version):
+    """
+    Delete cached enrichments written by other NLP pipeline versions
+    Returns the number of rows removed
+    """
+    result = db.session.execute(delete(Enrichment).where(Enrichment.version != keep_version))
+    db.session.commit()
+    return result.rowcount
+
+class TermStat(db.Model):
+    """Number of distinct analyzed descriptions containing a term, for TF-IDF keywords"""
+    term = db.Column(db.String(100), primary_key=True)
+    doc_count = db.Column(db.Integer, nullable=False, default=0)
+
+# The term_stat row counting documents rather than a term (tokens are never empty)
+DOCUMENTS_TERM = ''
+MAX_TERM_LENGTH = 100
+
+def increment_term_stats(connection, counts):
+    """
+    Add {term: documents} (plus DOCUMENTS_TERM: total) to term_stat in one statement
+    The increment happens in the database, so concurrent writers don't lose counts
+    """
+    rows = [{'term': term, 'doc_count': count} for term, count in counts.items() if len(term) <= MAX_TERM_LENGTH]
+    if not rows:
+        return
+    dialect_name = connection.dialect.name
+    if dialect_name in UPSERT_DIALECTS:
+        statement = UPSERT_DIALECTS[dialect_name].insert(TermStat.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=['term'], set_={'doc_count': TermStat.__table__.c.doc_count + statement.excluded.doc_count}
+        )
+        connection.execute(statement, rows)
+        return
+    existing = set()
+    for start in range(0, len(rows), LOOKUP_BATCH_SIZE):
+        chunk = [row['term'] for row in rows[start:start + LOOKUP_BATCH_SIZE]]
+        existing.update(term for term, in connection.execute(select(TermStat.term).where(TermStat.term.in_(chunk))))
+    updates = [row for row in rows if row['term'] in existing]
+    if updates:
+        connection.execute(
+            update(TermStat.__table__).where(TermStat.term == bindparam('_term'))
+            .values(doc_count=TermStat.__table__.c.doc_count + bindparam('_count')),
+            [{'_term': row['term'], '_count': row['doc_count']} for row in updates]
+        )
+    inserts = [row for row in rows if row['term'] not in existing]
+    if inserts:
+        connection.execute(insert(TermStat), inserts)
+
+class DatabaseTermStats:
+    """
+    Term stats for utils.tfidf backed by the term_stat table, i.e. the whole
+    Company corpus; counts only grow as new descriptions are analyzed, so the
+    index is never recomputed (`flask term-stats --rebuild` does that on demand)
+    Needs an app context
+    """
+    def document_frequencies(self, terms):
+        terms = [term for term in terms if len(term) <= MAX_TERM_LENGTH]
+        found = {}
+        for start in range(0, len(terms), LOOKUP_BATCH_SIZE):
+            chunk = terms[start:start + LOOKUP_BATCH_SIZE]
+            found.update(db.session.execute(
+                select(TermStat.term, TermStat.doc_count).where(TermStat.term.in_(chunk))
+            ).all())
+        documents = db.session.execute(
+            select(TermStat.doc_count).where(TermStat.term == DOCUMENTS_TERM)
+        ).scalar() or 0
+        return documents, found
+
+    def add_documents(self, term_sets):
+        counts = Counter()
+        documents = 0
+        for terms in term_sets:
+            if terms:
+                documents += 1
+                counts.update(terms)
+        if not documents:
+            return
+        counts[DOCUMENTS_TERM] = documents
+        try:
+            increment_term_stats(db.session.connection(), counts)
+            db.session.commit()
+        except Exception as e:
+            # Stale counts only skew keyword weights a little; don't fail the save
+            db.session.rollback()
+            logger.warning(f"Could not update term stats for {documents} documents: {str(e)}")
@@ -0,0 +1,107 @@
+"""
+Streaming scrape pipeline: scrape -> enrich -> save -> append to CSV, batch by batch
+
+Records flow through as soon as each page is scraped instead of being collected
+into one DataFrame at the end, so memory stays flat and the first row is
+available after a single page fetch.
+"""
+import logging
+from datetime import datetime, timedelta
+from itertools import islice
+
+from duplicates import flag_near_duplicates, known_duplicate_urls
+from leads import SCRAPED_COLUMNS, iter_scrape
+from models import DatabaseEnrichmentCache, DatabaseTermStats, recently_scraped_urls, upsert_companies
+from similar import index_saved_companies
+from utils.csv_stream import CsvAppender
+from utils.nlp_processor import NLP_COLUMNS, NLP_PIPELINE_VERSION, enrich_records
+
+logger = logging.getLogger(__name__)
+
+# Columns of an enriched record, in the order lead1.csv has always used
+RESULT_COLUMNS = SCRAPED_COLUMNS + NLP_COLUMNS
+
+DEFAULT_BATCH_SIZE = 25
+
+# Companies scraped more recently than this are not fetched again
+DEFAULT_RESCRAPE_AFTER_DAYS = 7
+
+def growing_batches(iterable, max_size=DEFAULT_BATCH_SIZE):
+    """
+    Group items into lists of 1, 2, 4, ... up to max_size items
+    The first item goes out on its own so the consumer sees it straight away;
+    later batches grow so per-batch costs (a DB transaction) are amortized
+    """
+    iterator = iter(iterable)
+    size = 1
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+        size = min(size * 2, max_size)
+
+def skip_known_filter(rescrape_after_days):
+    """
+    URL filter for iter_scrape that drops companies stored within the window
+    (none when it is 0) and URLs known to be near duplicates of other companies
+    """
+    def url_filter(urls):
+        skip = known_duplicate_urls(urls)
+        if rescrape_after_days:
+            skip |= recently_scraped_urls(urls, datetime.now() - timedelta(days=rescrape_after_days))
+        return [url for url in urls if url not in skip]
+    return url_filter
+
+def stream_scrape(params, search_func=None, output_csv=None, persist=True, batch_size=DEFAULT_BATCH_SIZE,
+                  progress_callback=None, totals=None):
+    """
+    Run a scrape and yield enriched records as they are saved
+    Each batch is NLP-enriched, upserted (when `persist` is set) and appended to
+    `output_csv` before its records are yielded. Pass a `totals` dict to collect
+    the count of records and inserted/updated rows.
+    Companies already stored within `params['rescrape_after_days']` (default
+    DEFAULT_RESCRAPE_AFTER_DAYS; 0 re-scrapes everything) are not fetched again,
+    nor are known near duplicates.
+    Saving needs an app context, like upsert_companies
+    """
+    params = dict(params)
+    rescrape_after_days = params.pop('rescrape_after_days', DEFAULT_RESCRAPE_AFTER_DAYS)
+    url_filter = skip_known_filter(rescrape_after_days) if persist else None
+    records = iter_scrape(
+        **params, search_func=search_func, progress_callback=progress_callback, url_filter=url_filter
+    )
+    yield from stream_records(records, output_csv=output_csv, persist=persist, batch_size=batch_size, totals=totals)
+
+def stream_records(records, output_csv=None, persist=True, batch_size=DEFAULT_BATCH_SIZE, totals=None):
+    """
+    Enrich, save and append scraped records batch by batch, yielding them as they are done
+    When saving, enrichment of descriptions seen before comes from the enrichment table,
+    new descriptions are added to the corpus term stats that weight keywords, and
+    saved companies are checked for near duplicates and added to the similarity index
+    """
+    if totals is None:
+        totals = {}
+    for key in ('count', 'inserted', 'updated', 'errors', 'duplicates'):
+        totals.setdefault(key, 0)
+    csv_out = CsvAppender(output_csv, RESULT_COLUMNS) if output_csv else None
+    enrichment_cache = DatabaseEnrichmentCache(NLP_PIPELINE_VERSION) if persist else None
+    term_stats = DatabaseTermStats() if persist else None
+    try:
+        for batch in growing_batches(records, batch_size):
+            enrich_records(batch, cache=enrichment_cache, term_stats=term_stats)
+            if persist:
+                save_result = upsert_companies(batch)
+                totals['inserted'] += save_result['inserted']
+                totals['updated'] += save_result['updated']
+                totals['errors'] += len(save_result['errors'])
+                totals['duplicates'] += len(flag_near_duplicates(batch))
+                index_saved_companies(batch)
+            if csv_out is not None:
+                csv_out.append(batch)
+            totals['count'] += len(batch)
+            yield from batch
+    finally:
+        if csv_out is not None:
+            csv_out.close()
+            logger.info(f"Results saved to {output_csv} ({csv_out.rows} rows)")
@@ -0,0 +1,164 @@
+"""
+Incremental refresh of stored companies, oldest and least complete first
+
+Instead of re-running searches, a refresh picks companies whose scraped_at is
+older than a cut-off, re-fetches just those pages (up to a per-run budget) and
+compares each page's content hash with the stored one. Unchanged companies
+only get their scraped_at moved forward; NLP enrichment and the full upsert
+run for the ones that actually changed. A page that can't be fetched is
+retried after a backoff that doubles with each consecutive failure, so dead
+pages don't stay the stalest rows and use up every run's budget.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, case, or_, select, update
+
+from duplicates import flag_near_duplicates
+from leads import iter_company_pages, log_cache_stats, rate_from_sleep
+from models import LOOKUP_BATCH_SIZE, Company, DatabaseEnrichmentCache, DatabaseTermStats, db, upsert_companies
+from pipeline import growing_batches
+from similar import index_saved_companies
+from utils.fingerprint import content_hash
+from utils.nlp_processor import NLP_PIPELINE_VERSION, enrich_records
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE_DAYS = 30
+DEFAULT_BUDGET = 100
+# Days before a page that failed to fetch is tried again, doubled per consecutive failure
+FAILURE_BACKOFF_DAYS = 1
+MAX_FAILURE_BACKOFF_DAYS = 90
+
+# Fields whose absence moves a company up the refresh queue
+COMPLETENESS_FIELDS = ('website', 'size', 'location', 'founded', 'description')
+
+def _missing_fields():
+    return sum(
+        case((or_(getattr(Company, field).is_(None), getattr(Company, field) == ''), 1), else_=0)
+        for field in COMPLETENESS_FIELDS
+    )
+
+def select_stale_companies(max_age_days=DEFAULT_MAX_AGE_DAYS, budget=DEFAULT_BUDGET, now=None):
+    """
+    Up to `budget` companies scraped before the cut-off, as (id, linkedin_url,
+    content_hash, refresh_failures); pages still backing off after a failed fetch
+    are skipped. The least complete come first, then the oldest
+    """
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=max_age_days)
+    statement = (
+        select(Company.id, Company.linkedin_url, Company.content_hash, Company.refresh_failures)
+        .where(
+            Company.linkedin_url.isnot(None),
+            or_(Company.scraped_at < cutoff, Company.scraped_at.is_(None)),
+            or_(Company.refresh_retry_after.is_(None), Company.refresh_retry_after <= now)
+        )
+        .order_by(_missing_fields().desc(), Company.scraped_at.asc(), Company.id.asc())
+        .limit(budget)
+    )
+    return db.session.execute(statement).fetchall()
+
+def _mark_checked(ids, checked_at):
+    for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+        chunk = ids[start:start + LOOKUP_BATCH_SIZE]
+        db.session.execute(update(Company).where(Company.id.in_(chunk)).values(scraped_at=checked_at))
+    db.session.commit()
+
+def _clear_failures(ids):
+    for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+        chunk = ids[start:start + LOOKUP_BATCH_SIZE]
+        db.session.execute(
+            update(Company).where(Company.id.in_(chunk), Company.refresh_failures > 0)
+            .values(refresh_failures=0, refresh_retry_after=None)
+        )
+    db.session.commit()
+
+def _record_failures(rows, failed_at):
+    """Count a failed fetch for each (id, previous failures) and schedule the retry"""
+    if not rows:
+        return
+    values = []
+    for company_id, failures in rows:
+        failures = (failures or 0) + 1
+        days = min(FAILURE_BACKOFF_DAYS * 2 ** (failures - 1), MAX_FAILURE_BACKOFF_DAYS)
+        values.append({'_id': company_id, '_failures': failures, '_retry_after': failed_at + timedelta(days=days)})
+    db.session.execute(
+        update(Company.__table__).where(Company.id == bindparam('_id')).values(
+            refresh_failures=bindparam('_failures'), refresh_retry_after=bindparam('_retry_after')
+        ),
+        values
+    )
+    db.session.commit()
+
+def refresh_companies(
+    max_age_days=DEFAULT_MAX_AGE_DAYS,
+    budget=DEFAULT_BUDGET,
+    user_agent='Mozilla/5.0',
+    timeout=10,
+    sleep_time=1.0,
+    concurrency=1,
+    rate_limit=None,
+    cache_mode='default',
+    batch_size=25,
+    base_url=None
+):
+    """
+    Re-fetch the stalest companies and save only what changed
+    Returns counts of selected, fetched, unchanged, changed and failed pages
+    `base_url` fetches the pages from another host (see iter_company_pages)
+    Needs an app context
+    """
+    stale = select_stale_companies(max_age_days, budget)
+    known_hashes = {row.linkedin_url: row.content_hash for row in stale}
+    ids = {row.linkedin_url: row.id for row in stale}
+    logger.info(f"Refreshing {len(stale)} companies older than {max_age_days} days")
+
+    stats = {'selected': len(stale), 'fetched': 0, 'unchanged': 0, 'changed': 0, 'failed': 0, 'errors': 0}
+    unchanged_ids = []
+    fetched_urls = set()
+    # A changed page often keeps its description, whose enrichment is then reused
+    enrichment_cache = DatabaseEnrichmentCache(NLP_PIPELINE_VERSION)
+    term_stats = DatabaseTermStats()
+
+    def changed_records(pages):
+        for data in pages:
+            stats['fetched'] += 1
+            fetched_urls.add(data['companyLinkedinUrl'])
+            if known_hashes.get(data['companyLinkedinUrl']) == content_hash(data):
+                unchanged_ids.append(ids[data['companyLinkedinUrl']])
+            else:
+                yield data
+
+    pages = iter_company_pages(
+        [row.linkedin_url for row in stale],
+        user_agent=user_agent,
+        timeout=timeout,
+        concurrency=concurrency,
+        rate_limit=rate_limit if rate_limit is not None else rate_from_sleep(sleep_time),
+        cache_mode=cache_mode,
+        base_url=base_url
+    )
+    for batch in growing_batches(changed_records(pages), batch_size):
+        enrich_records(batch, cache=enrichment_cache, term_stats=term_stats)
+        save_result = upsert_companies(batch)
+        # A changed description can make (or stop making) a company a near duplicate
+        flag_near_duplicates(batch)
+        index_saved_companies(batch)
+        stats['changed'] += len(batch)
+        stats['errors'] += len(save_result['errors'])
+
+    now = datetime.now()
+    _mark_checked(unchanged_ids, now)
+    _clear_failures([ids[url] for url in fetched_urls if url in ids])
+    failed = [(row.id, row.refresh_failures) for row in stale if row.linkedin_url not in fetched_urls]
+    _record_failures(failed, now)
+    if failed:
+        logger.info(f"{len(failed)} pages could not be fetched and will be retried after a backoff")
+    stats['unchanged'] = len(unchanged_ids)
+    stats['failed'] = stats['selected'] - stats['fetched']
+    log_cache_stats()
+    logger.info(
+        f"Refresh done: {stats['changed']} changed, {stats['unchanged']} unchanged, {stats['failed']} failed"
+    )
+    return stats
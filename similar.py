@@ -0,0 +1,336 @@
+"""
+"More companies like this one": nearest neighbours over company embeddings
+
+Every company is embedded (utils.embeddings) into a row of a float32 matrix
+kept in two append-only files next to the database: <path>.f32 holds the
+vectors and <path>.ids the company id of each row. Both are memory-mapped, so
+a lookup reads the matrix from the page cache instead of the database, and
+scores it in blocks of SEARCH_CHUNK rows with one matrix product per block,
+keeping only each block's best rows.
+
+Saved companies are appended by the pipeline. A company saved again gets a new
+row and its older rows are ignored; deleted and flagged duplicate companies are
+dropped when the results are read back. Writers in every process and thread
+take an exclusive lock on <path>.lock, so appends never interleave. An empty
+index over a table that has companies is built by `flask migrate` (or by the
+first lookup, if nothing ran that), and `flask similar-index --rebuild`
+re-embeds the whole table against the current term stats and compacts the
+files. The index lives where the app's SIMILAR_INDEX_PATH says;
+an app without one (e.g. a benchmark) doesn't index anything.
+"""
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import select
+
+from company_queries import row_to_dict
+from company_search import RESULT_FIELDS
+from models import LOOKUP_BATCH_SIZE, Company, DatabaseTermStats, db
+from utils.embeddings import DIMENSIONS, embed_companies
+from utils.metrics import timed
+from utils.urls import normalize_linkedin_url
+
+try:
+    import fcntl
+except ImportError:
+    # No flock (Windows): appends are only serialized within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SIMILAR_INDEX_PATH = os.environ.get(
+    'SIMILAR_INDEX_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'company_vectors')
+)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+# How much further a lookup searches when flagged or deleted companies left it short
+WIDEN = 4
+# Rows scored per matrix product; bounds the working memory, not the index size
+SEARCH_CHUNK = 65536
+# Companies read and embedded per round when rebuilding
+BATCH_SIZE = 5000
+
+ROW_BYTES = DIMENSIONS * 4
+EMBED_COLUMNS = (Company.id, Company.description, Company.domain_class, Company.technologies)
+
+class VectorIndex:
+    """
+    Append-only company vectors at `path` (<path>.f32 and <path>.ids)
+    The ids file is written last and gives the row count, so a reader never
+    sees a row whose vector isn't there yet
+    """
+    def __init__(self, path):
+        self.path = path
+        self.vectors_path = path + '.f32'
+        self.ids_path = path + '.ids'
+        self.lock_path = path + '.lock'
+        self._lock = threading.Lock()
+        self._loaded = None
+
+    @contextmanager
+    def locked(self):
+        """Exclusive hold on the index files, across threads and processes"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Closing the file releases the flock
+            yield
+
+    def __len__(self):
+        try:
+            return os.path.getsize(self.ids_path) // 8
+        except OSError:
+            return 0
+
+    def append(self, ids, vectors):
+        """Add a row per company id, holding the lock so concurrent appends can't interleave"""
+        if not len(ids):
+            return
+        with self.locked():
+            rows = len(self)
+            with open(self.vectors_path, 'ab') as vectors_file:
+                # Drop whatever an interrupted append left past the last complete row
+                vectors_file.truncate(rows * ROW_BYTES)
+                vectors_file.write(np.ascontiguousarray(vectors, dtype='<f4').tobytes())
+            with open(self.ids_path, 'ab') as ids_file:
+                ids_file.truncate(rows * 8)
+                ids_file.write(np.asarray(ids, dtype='<i8').tobytes())
+
+    def _load(self):
+        """
+        (ids, vectors, current) memory-mapped, reopened when the files change
+        `current` masks out rows superseded by a later row for the same company
+        (None when there are none)
+        """
+        try:
+            stat = os.stat(self.ids_path)
+        except OSError:
+            return np.empty(0, dtype='<i8'), np.empty((0, DIMENSIONS), dtype='<f4'), None
+        key = (stat.st_ino, stat.st_size)
+        loaded = self._loaded
+        if loaded is None or loaded[0] != key:
+            rows = stat.st_size // 8
+            if rows:
+                ids = np.memmap(self.ids_path, dtype='<i8', mode='r', shape=(rows,))
+                vectors = np.memmap(self.vectors_path, dtype='<f4', mode='r', shape=(rows, DIMENSIONS))
+            else:
+                ids, vectors = np.empty(0, dtype='<i8'), np.empty((0, DIMENSIONS), dtype='<f4')
+            unique, last = np.unique(ids[::-1], return_index=True)
+            current = None
+            if len(unique) < rows:
+                current = np.zeros(rows, dtype=bool)
+                current[rows - 1 - last] = True
+            loaded = self._loaded = (key, ids, vectors, current)
+        return loaded[1:]
+
+    def nearest(self, queries, k):
+        """
+        The `k` best rows for each query vector by dot product (cosine
+        similarity, as rows are unit vectors): a list of (ids, scores), best first
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        ids, vectors, current = self._load()
+        rows = len(ids)
+        if not rows or k < 1:
+            return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in queries]
+
+        positions = []
+        scores = []
+        for start in range(0, rows, SEARCH_CHUNK):
+            block = vectors[start:start + SEARCH_CHUNK] @ queries.T
+            if current is not None:
+                block[~current[start:start + len(block)]] = -np.inf
+            take = min(k, len(block))
+            top = np.argpartition(-block, take - 1, axis=0)[:take]
+            positions.append(top + start)
+            scores.append(np.take_along_axis(block, top, axis=0))
+        positions = np.concatenate(positions).T
+        scores = np.concatenate(scores).T
+
+        results = []
+        for row_positions, row_scores in zip(positions, scores):
+            order = np.argsort(-row_scores, kind='stable')[:k]
+            order = order[np.isfinite(row_scores[order])]
+            results.append((np.asarray(ids[row_positions[order]]), row_scores[order]))
+        return results
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_index(path=None):
+    """Shared VectorIndex for a path (default: the app's SIMILAR_INDEX_PATH), or None if there is none"""
+    path = path or current_app.config.get('SIMILAR_INDEX_PATH')
+    if not path:
+        return None
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = VectorIndex(path)
+        return _indexes[path]
+
+def _embed_rows(rows, term_stats):
+    return embed_companies(
+        [row.description for row in rows], [row.domain_class for row in rows],
+        [row.technologies for row in rows], term_stats
+    )
+
+def index_saved_companies(records):
+    """
+    Embed the companies just saved from these records and append them to the index
+    Needs an app context; a failure is logged, not raised, so it can't fail the save
+    """
+    index = get_index()
+    urls = {normalize_linkedin_url(record.get('companyLinkedinUrl')) for record in records} - {None}
+    if index is None or not urls:
+        return
+    try:
+        with timed('similar_index'):
+            urls = list(urls)
+            rows = []
+            for start in range(0, len(urls), LOOKUP_BATCH_SIZE):
+                rows.extend(db.session.execute(
+                    select(*EMBED_COLUMNS).where(Company.linkedin_url.in_(urls[start:start + LOOKUP_BATCH_SIZE]))
+                ).all())
+            if rows:
+                index.append([row.id for row in rows], _embed_rows(rows, DatabaseTermStats()))
+    except Exception as e:
+        logger.warning(f"Could not add {len(urls)} companies to the similarity index: {str(e)}")
+
+def _embed_ids(index, ids, term_stats):
+    """Embed the companies with these ids (those still in the table) and append them to `index`"""
+    ids = [int(company_id) for company_id in ids]
+    for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+        rows = db.session.execute(
+            select(*EMBED_COLUMNS).where(Company.id.in_(ids[start:start + LOOKUP_BATCH_SIZE]))
+        ).all()
+        if rows:
+            index.append([row.id for row in rows], _embed_rows(rows, term_stats))
+
+def _build(building, batch_size, term_stats):
+    """Embed every company into `building`, starting from empty files; returns how many"""
+    for stale in (building.vectors_path, building.ids_path):
+        if os.path.exists(stale):
+            os.remove(stale)
+    indexed = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(*EMBED_COLUMNS).where(Company.id > last_id).order_by(Company.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        building.append([row.id for row in rows], _embed_rows(rows, term_stats))
+        indexed += len(rows)
+        last_id = rows[-1].id
+    return indexed
+
+def _swap(index, building):
+    """Put the built files in place of the index's; call while holding index.locked()"""
+    if len(building):
+        os.replace(building.vectors_path, index.vectors_path)
+        os.replace(building.ids_path, index.ids_path)
+        return
+    for path in (index.vectors_path, index.ids_path, building.vectors_path, building.ids_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+def rebuild_similar_index(path=None, batch_size=BATCH_SIZE):
+    """
+    Re-embed every company into a fresh index and swap it in place of the old one
+    Saves keep appending to the old index while this runs; the companies they
+    appended are embedded again under the lock just before the swap, so none are
+    lost. Returns the number of companies indexed; needs an app context
+    """
+    index = get_index(path)
+    if index is None:
+        raise ValueError("No similarity index is configured (SIMILAR_INDEX_PATH)")
+    building = VectorIndex(index.path + '.building')
+    term_stats = DatabaseTermStats()
+    start_rows = len(index)
+    indexed = _build(building, batch_size, term_stats)
+    with index.locked():
+        if len(index) > start_rows:
+            appended = np.fromfile(index.ids_path, dtype='<i8', offset=start_rows * 8)
+            _embed_ids(building, np.unique(appended), term_stats)
+        _swap(index, building)
+    logger.info(f"Rebuilt the similarity index over {indexed} companies")
+    return indexed
+
+def ensure_similar_index(batch_size=BATCH_SIZE):
+    """
+    Build the app's index if it is empty while the table has companies (a new
+    install, or companies saved before the index existed); returns how many were
+    indexed. Holds the lock throughout, so concurrent starts build it once
+    """
+    index = get_index()
+    if index is None or len(index):
+        return 0
+    with index.locked():
+        if len(index) or db.session.execute(select(Company.id).limit(1)).first() is None:
+            return 0
+        building = VectorIndex(index.path + '.building')
+        indexed = _build(building, batch_size, DatabaseTermStats())
+        _swap(index, building)
+    logger.info(f"Built the similarity index over {indexed} existing companies")
+    return indexed
+
+def similar_companies(company_id, limit=DEFAULT_LIMIT, fields=RESULT_FIELDS):
+    """
+    The companies most similar to one, best first, each with its similarity
+    Flagged near duplicates are left out. Returns None when the company doesn't
+    exist; raises ValueError for unknown fields or when no index is configured
+    """
+    unknown = [field for field in fields if field not in RESULT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    limit = max(1, min(int(limit), MAX_LIMIT))
+    index = get_index()
+    if index is None:
+        raise ValueError("No similarity index is configured (SIMILAR_INDEX_PATH)")
+
+    company = db.session.execute(select(*EMBED_COLUMNS).where(Company.id == company_id)).first()
+    if company is None:
+        return None
+    # Nothing to search until the existing companies are indexed (normally by `flask migrate`)
+    ensure_similar_index()
+    query = _embed_rows([company], DatabaseTermStats())
+    columns = [getattr(Company, field) for field in fields]
+    if 'id' not in fields:
+        columns.append(Company.id)
+
+    scores = {}
+    rows = []
+    # Room for the company itself and for deleted or flagged rows, which are dropped;
+    # when too many were dropped, ask for WIDEN times as many until the index runs out
+    k = 2 * limit + 1
+    while True:
+        with timed('similar_search'):
+            ids, found = index.nearest(query, k)[0]
+        candidates = [
+            int(candidate) for candidate in ids if candidate != company_id and int(candidate) not in scores
+        ]
+        scores.update((int(candidate), float(score)) for candidate, score in zip(ids, found))
+        for start in range(0, len(candidates), LOOKUP_BATCH_SIZE):
+            rows.extend(db.session.execute(
+                select(*columns).where(
+                    Company.id.in_(candidates[start:start + LOOKUP_BATCH_SIZE]), Company.duplicate_of.is_(None)
+                )
+            ).fetchall())
+        if len(rows) >= limit or len(ids) < k:
+            break
+        k *= WIDEN
+
+    results = []
+    for row in sorted(rows, key=lambda row: -scores[row.id])[:limit]:
+        data = row_to_dict(row)
+        data['similarity'] = round(scores[row.id], 6)
+        if 'id' not in fields:
+            data.pop('id')
+        results.append(data)
+    return results
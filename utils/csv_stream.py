@@ -0,0 +1,69 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+class CsvAppender:
+    """
+    Write records to a CSV file as they arrive, with a fixed column order
+    Rows go to a temporary file next to `path`, which replaces `path` on close.
+    Runs writing to the same path at once then each produce a whole file (the
+    last one closed wins) instead of interleaving rows. The header is written
+    when the file is opened and every append is flushed, so the temporary file
+    is always a valid CSV of the rows seen so far
+    """
+    def __init__(self, path, columns):
+        self.path = path
+        self.columns = list(columns)
+        self.rows = 0
+        directory, name = os.path.split(os.path.abspath(path))
+        fd, self.temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix='.tmp', dir=directory)
+        self._file = os.fdopen(fd, 'w', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction='ignore')
+        self._writer.writeheader()
+        self._file.flush()
+
+    def append(self, records):
+        for record in records:
+            self._writer.writerow(record)
+            self.rows += 1
+        self._file.flush()
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        os.replace(self.temp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def csv_lines(records, columns):
+    """
+    Yield a CSV header and then one encoded line per record, for chunked responses
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(columns), extrasaction='ignore')
+
+    def take():
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writeheader()
+    yield take()
+    for record in records:
+        writer.writerow(record)
+        yield take()
+
+def ndjson_lines(records):
+    """
+    Yield one JSON document per line
+    """
+    for record in records:
+        yield json.dumps(record, default=str) + '\n'
@@ -0,0 +1,253 @@
+import json
+import logging
+import re
+import pandas as pd
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Specific industry categories with their keywords
+# Keywords match whole words; a trailing '*' matches any word starting with the stem
+INDUSTRY_CATEGORIES = {
+    # IT & Tech Services
+    'Cloud Services': ['cloud', 'aws', 'azure', 'gcp', 'hosting', 'iaas', 'paas', 'saas'],
+    'IT Services': ['it service', 'tech support', 'helpdesk', 'managed service', 'infrastructure', 'network', 'system'],
+    'Software Development': ['software', 'development', 'programming', 'code', 'developer', 'app development'],
+    'Digital Transformation': ['digital transformation', 'digitization', 'digital strategy', 'digital solution'],
+    'Cybersecurity': ['cyber*', 'security', 'threat', 'encryption', 'firewall', 'protection', 'data security'],
+    'Data Analytics': ['data', 'analytics', 'big data', 'business intelligence', 'bi', 'data science'],
+    'AI & Machine Learning': ['ai', 'machine learning', 'artificial intelligence', 'ml', 'neural', 'nlp', 'deep learning'],
+
+    # Finance
+    'Financial Services': ['financial', 'finance', 'banking', 'investment', 'wealth management'],
+    'FinTech': ['fintech', 'payment', 'transaction', 'digital payment', 'banking tech', 'financial technology'],
+    'Investment Banking': ['investment bank', 'capital market', 'ipo', 'merger', 'acquisition'],
+    'Insurance': ['insurance', 'policy', 'risk management', 'underwriting', 'claim'],
+
+    # Healthcare
+    'Healthcare Services': ['healthcare', 'medical', 'health service', 'patient care', 'clinic'],
+    'HealthTech': ['healthtech', 'health tech', 'medical technology', 'ehealth', 'health platform'],
+    'Pharmaceutical': ['pharma', 'pharmaceutical', 'drug', 'medicine', 'therapeutic'],
+    'Biotech': ['biotech', 'biotechnology', 'life science', 'genomic', 'biological'],
+
+    # Marketing & Media
+    'Digital Marketing': ['digital marketing', 'seo', 'sem', 'content marketing', 'social media marketing'],
+    'Advertising': ['advertising', 'ad agency', 'adtech', 'media buying', 'programmatic'],
+    'PR & Communications': ['pr', 'public relations', 'communication', 'media relation'],
+    'Media & Entertainment': ['media', 'entertainment', 'streaming', 'publishing', 'broadcast'],
+
+    # Other Industries
+    'E-commerce': ['ecommerce', 'e-commerce', 'online store', 'online retail', 'webshop'],
+    'Retail': ['retail', 'store', 'merchant', 'shop', 'consumer goods'],
+    'Manufacturing': ['manufacturing', 'production', 'factory', 'industrial', 'assembly'],
+    'Consulting': ['consulting', 'consultancy', 'advisor', 'business consultant'],
+    'Education': ['education', 'learning', 'school', 'university', 'training', 'edtech'],
+    'Real Estate': ['real estate', 'property', 'realty', 'building', 'construction', 'proptech'],
+    'Legal Services': ['legal', 'law firm', 'attorney', 'lawyer', 'legal service'],
+    'Transportation & Logistics': ['transport', 'logistics', 'shipping', 'delivery', 'supply chain'],
+    'Energy': ['energy', 'power', 'utility', 'electricity', 'renewable', 'oil', 'gas'],
+    'Telecom': ['telecom', 'telecommunication', 'cellular', 'network provider', 'mobile carrier']
+}
+
+# General categories used as a fallback when no industry matched
+GENERAL_CATEGORIES = {
+    'Technology': ['tech*', 'software', 'digital', 'comput*', 'it', 'app', 'online', 'systems'],
+    'Financial Services': ['financ*', 'bank*', 'invest*', 'capital', 'insurance', 'asset', 'money'],
+    'Healthcare': ['health*', 'medic*', 'care', 'doctor', 'hospital', 'clinic', 'therap*', 'wellness', 'patient'],
+    'Professional Services': ['service', 'solution', 'consult*', 'professional', 'management', 'advis*']
+}
+
+# Everything except ASCII letters and digits separates words
+_SEPARATORS = str.maketrans({
+    char: ' ' for char in
+    [chr(i) for i in range(128) if not chr(i).isalnum()] + list('\u2018\u2019\u201c\u201d\u2013\u2014\u2026\u2022\u00b7\u00a0')
+})
+
+def _words(lowered):
+    return lowered.translate(_SEPARATORS).split()
+
+def _tokenize(text):
+    return _words(text.lower()) if text else []
+
+def _contains_phrase(words, phrase):
+    # list.index jumps between occurrences of the first word in C
+    size = len(phrase)
+    first = phrase[0]
+    start = 0
+    try:
+        while True:
+            i = words.index(first, start)
+            if tuple(words[i:i + size]) == phrase:
+                return True
+            start = i + 1
+    except ValueError:
+        return False
+
+class KeywordMatcher:
+    """
+    Taxonomy compiled into word-level lookup tables
+    A text is split into words once; a set intersection then picks out the words
+    that can start a keyword, so only those are checked for phrases and stems
+    """
+    def __init__(self, categories):
+        self.categories = list(categories)
+        # keyword id -> (keyword, category index, is phrase)
+        self.keywords = []
+        # first word -> [(phrase words or None for single words, keyword id)]
+        self._by_first_word = {}
+        self._stems = {}
+
+        for category_index, category in enumerate(self.categories):
+            for keyword in categories[category]:
+                keyword_id = len(self.keywords)
+                self.keywords.append((keyword, category_index, ' ' in keyword))
+                if keyword.endswith('*'):
+                    self._stems.setdefault(keyword[:-1].lower(), []).append(keyword_id)
+                    continue
+                words = tuple(_tokenize(keyword))
+                if not words:
+                    continue
+                for variant in self._variants(words):
+                    phrase = variant if len(variant) > 1 else None
+                    self._by_first_word.setdefault(variant[0], []).append((phrase, keyword_id))
+        self._first_words = frozenset(self._by_first_word)
+        self._stem_lengths = sorted({len(stem) for stem in self._stems})
+        self._stem_pattern = None
+        if self._stems:
+            stems = sorted(self._stems, key=len, reverse=True)
+            self._stem_pattern = re.compile(r'(?<![a-z0-9])(?:' + '|'.join(map(re.escape, stems)) + r')[a-z0-9]*')
+
+    @staticmethod
+    def _variants(words):
+        # Allow a plural last word, but not for short words like 'it' -> 'its'
+        yield words
+        last = words[-1]
+        if len(last) >= 4:
+            yield words[:-1] + (last + 's',)
+            if last.endswith(('s', 'x', 'ch', 'sh')):
+                yield words[:-1] + (last + 'es',)
+            elif last.endswith('y'):
+                yield words[:-1] + (last[:-1] + 'ies',)
+
+    def match(self, text, found, in_header):
+        """
+        Add the ids of keywords appearing in lowercase `text` to `found`
+        `found` maps keyword id -> True if any match was in the domain or name
+        """
+        words = _words(text)
+        for word in self._first_words.intersection(words):
+            for phrase, keyword_id in self._by_first_word[word]:
+                if phrase is not None and not _contains_phrase(words, phrase):
+                    continue
+                found[keyword_id] = found.get(keyword_id, False) or in_header
+        # Cheap substring test first; most texts contain none of the stems
+        if self._stem_pattern is not None and any(stem in text for stem in self._stems):
+            for word in set(self._stem_pattern.findall(text)):
+                for length in self._stem_lengths:
+                    if length > len(word):
+                        break
+                    for keyword_id in self._stems.get(word[:length], ()):
+                        found[keyword_id] = found.get(keyword_id, False) or in_header
+        return found
+
+    def scores(self, header_texts, body_text, bonus=True):
+        """
+        Score each category: 1 per keyword found, +2 when it appears in the
+        domain or name and +3 for multi-word phrases
+        """
+        found = {}
+        for text in header_texts:
+            self.match(text, found, True)
+        self.match(body_text, found, False)
+
+        scores = {}
+        for keyword_id, in_header in found.items():
+            keyword, category_index, is_phrase = self.keywords[keyword_id]
+            score = 1
+            if bonus:
+                if in_header:
+                    score += 2
+                if is_phrase:
+                    score += 3
+            category = self.categories[category_index]
+            scores[category] = scores.get(category, 0) + score
+        # Keep taxonomy order so ties resolve to the earlier category
+        return {category: scores[category] for category in self.categories if category in scores}
+
+class DomainClassifier:
+    """
+    Classifies companies into industry categories using a compiled taxonomy
+    """
+    def __init__(self, industry_categories=None, general_categories=None):
+        self.industry = KeywordMatcher(industry_categories or INDUSTRY_CATEGORIES)
+        self.general = KeywordMatcher(general_categories or GENERAL_CATEGORIES)
+
+    def classify(self, domain='', company_name='', description=''):
+        header_texts = (domain.lower(), company_name.lower())
+        body_text = description.lower()
+
+        scores = self.industry.scores(header_texts, body_text)
+        if not scores:
+            # General categories only count matches, without bonuses
+            scores = self.general.scores(header_texts, body_text, bonus=False)
+
+        # Return the industry with the highest score, or Other if none found
+        if scores:
+            return max(scores, key=scores.get)
+        return 'Other'
+
+def load_taxonomy(path):
+    """
+    Build a classifier from a JSON file with "industry" and optional "general"
+    objects mapping category names to keyword lists
+    """
+    with open(path, 'r') as f:
+        taxonomy = json.load(f)
+    logger.info(f"Loaded domain taxonomy from {path}")
+    return DomainClassifier(taxonomy.get('industry'), taxonomy.get('general'))
+
+_classifier = DomainClassifier()
+
+def configure_taxonomy(path=None):
+    """
+    Replace the module-wide classifier; None restores the built-in taxonomy
+    """
+    global _classifier
+    _classifier = load_taxonomy(path) if path else DomainClassifier()
+    return _classifier
+
+def classify_domain(domain, company_name='', description=''):
+    """
+    Classify a company domain into specific business categories
+    Uses multiple data points: domain name, company name, and description
+    """
+    return _classifier.classify(domain or '', company_name or '', description or '')
+
+def classify_domains(data, classifier=None):
+    """
+    Classify a whole batch at once
+    `data` is a DataFrame with domain/name/description columns or a Series of
+    descriptions; returns a Series of categories with the same index
+    """
+    classifier = classifier or _classifier
+    if isinstance(data, pd.DataFrame):
+        columns = [
+            data[column] if column in data.columns else pd.Series('', index=data.index)
+            for column in ('domain', 'name', 'description')
+        ]
+    else:
+        columns = [pd.Series('', index=data.index), pd.Series('', index=data.index), data]
+    domains, names, descriptions = (
+        column.where(column.notna(), '').astype(str).tolist() for column in columns
+    )
+
+    # Identical rows are classified once
+    cache = {}
+    categories = []
+    for row in zip(domains, names, descriptions):
+        category = cache.get(row)
+        if category is None:
+            category = classifier.classify(*row)
+            cache[row] = category
+        categories.append(category)
+    return pd.Series(categories, index=data.index, name='domain_class')
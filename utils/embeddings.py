@@ -0,0 +1,77 @@
+"""
+Fixed-size company vectors for "similar companies" lookups
+
+A company is embedded from its description, domain_class and technologies
+with the hashing trick: every feature is hashed (CRC32) to one of DIMENSIONS
+columns and a sign, so no vocabulary has to be stored and a vector can be made
+for any company at any time. Description terms are weighted by TF-IDF against
+the corpus term stats (utils.tfidf); the domain class and each technology are
+single features. The three parts are normalized separately, combined with the
+weights below and normalized again, so the dot product of two vectors is their
+cosine similarity.
+"""
+import zlib
+
+import numpy as np
+
+from utils.nlp_processor import preprocess_text
+from utils.tfidf import MemoryTermStats, count_matrix, idf_vector
+
+DIMENSIONS = 256
+
+# Share of each part in a vector; a matching description matters most
+DESCRIPTION_WEIGHT = 1.0
+DOMAIN_CLASS_WEIGHT = 0.5
+TECHNOLOGIES_WEIGHT = 0.5
+
+def _buckets(features):
+    hashes = np.fromiter(
+        (zlib.crc32(feature.encode('utf-8')) for feature in features), dtype=np.uint32, count=len(features)
+    )
+    # The low bits pick the column and the top bit a sign, so colliding features tend to cancel out
+    return (hashes % DIMENSIONS).astype(np.int64), np.where(hashes >> 31, -1.0, 1.0)
+
+def _normalized(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+def _hashed(indptr, indices, values, features):
+    """Unit rows of hashed feature values, from a CSR matrix as utils.tfidf.count_matrix makes"""
+    rows = len(indptr) - 1
+    matrix = np.zeros((rows, DIMENSIONS), dtype=np.float64)
+    if len(indices):
+        buckets, signs = _buckets(features)
+        row_ids = np.repeat(np.arange(rows), np.diff(indptr))
+        np.add.at(matrix, (row_ids, buckets[indices]), signs[indices] * values)
+    return _normalized(matrix)
+
+def _technology_features(value):
+    if not isinstance(value, str):
+        return []
+    return [f"technology:{name.strip().lower()}" for name in value.split(',') if name.strip()]
+
+def embed_companies(descriptions, domain_classes, technologies, term_stats=None):
+    """
+    One unit float32 vector (a row of DIMENSIONS) per company
+    Without term stats, idf comes from the batch itself; a company with none of
+    the three fields gets a zero row, which is similar to nothing
+    """
+    token_lists = [preprocess_text(description) for description in descriptions]
+    indptr, indices, counts, vocabulary = count_matrix(token_lists)
+    if term_stats is None:
+        term_stats = MemoryTermStats()
+        term_stats.add_documents(set(tokens) for tokens in token_lists)
+    weights = (1.0 + np.log(counts)) * idf_vector(vocabulary, term_stats)[indices] if len(indices) else counts
+    description_part = _hashed(indptr, indices, weights, vocabulary)
+
+    domain_part = _hashed(*count_matrix([
+        [f"domain_class:{value.strip().lower()}"] if isinstance(value, str) and value.strip() else []
+        for value in domain_classes
+    ]))
+    technology_part = _hashed(*count_matrix([_technology_features(value) for value in technologies]))
+
+    combined = (
+        DESCRIPTION_WEIGHT * description_part + DOMAIN_CLASS_WEIGHT * domain_part
+        + TECHNOLOGIES_WEIGHT * technology_part
+    )
+    return _normalized(combined).astype(np.float32)
@@ -0,0 +1,27 @@
+import hashlib
+
+# Scraped fields that make up a company page's content; domain_class and the
+# NLP columns are derived from these, scraped_at only says when we looked
+CONTENT_FIELDS = ('name', 'description', 'website', 'size', 'location', 'founded')
+
+def _text(value):
+    # None, NaN and empty strings all mean "missing"
+    if value is None or value != value:
+        return ''
+    return str(value)
+
+def content_hash(record):
+    """
+    SHA-256 over the scraped content fields of a record or Company row dict
+    """
+    digest = hashlib.sha256()
+    for field in CONTENT_FIELDS:
+        digest.update(_text(record.get(field)).encode('utf-8'))
+        digest.update(b'\x1f')
+    return digest.hexdigest()
+
+def description_hash(text):
+    """
+    SHA-256 of a description, the key for cached NLP enrichment
+    """
+    return hashlib.sha256(_text(text).encode('utf-8')).hexdigest()
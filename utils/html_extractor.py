@@ -0,0 +1,252 @@
+import logging
+from html import unescape
+from html.entities import html5
+from html.parser import HTMLParser
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Elements that never have children, so they are closed as soon as they open
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen',
+    'link', 'menuitem', 'meta', 'param', 'source', 'spacer', 'track', 'wbr',
+    'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid'
+}
+
+# Text inside these elements is not part of an ancestor's visible text
+HIDDEN_TEXT_ELEMENTS = {'script', 'style', 'template', 'rt', 'rp'}
+
+# Whitespace-only strings are collapsed everywhere except inside these
+PRESERVE_WHITESPACE_ELEMENTS = {'pre', 'textarea'}
+
+ASCII_SPACES = ' \n\t\x0c\r'
+
+# field name -> (tag, lowercase text that must appear in the element)
+TEXT_FIELDS = {
+    'website': ('a', 'website'),
+    'size': ('p', 'employees'),
+    'location': ('span', 'headquarter'),
+    'founded': ('p', 'founded'),
+}
+
+FIELD_NAMES = ('name', 'description', 'website', 'size', 'location', 'founded')
+
+class _StopParsing(Exception):
+    """Raised by the collector once every field has its final value"""
+
+class CompanyFieldCollector:
+    """
+    Collects company page fields from a stream of start/data/end events
+    Each field takes the first matching element in document order, the same
+    element the previous find()/find_all() lookups picked
+    """
+    def __init__(self, stop_early=True):
+        self.stop_early = stop_early
+        self.fields = {}
+        # Open elements as [tag, start position, text buffer or None, attrs]
+        self._stack = []
+        self._position = 0
+        self._hidden_depth = 0
+        self._preserve_depth = 0
+        self._pending = []
+        self._seen_h1 = False
+        # field -> start position of the element that provided the value
+        self._matched_at = {}
+
+    def start(self, tag, attrs):
+        tag = tag.lower()
+        self.flush()
+        position = self._position
+        self._position += 1
+
+        if tag == 'meta' and 'description' not in self.fields and attrs.get('name') == 'description':
+            content = attrs.get('content')
+            self.fields['description'] = content.strip() if content is not None else ''
+
+        if tag in VOID_ELEMENTS:
+            return
+
+        if tag == 'h1':
+            track = not self._seen_h1
+            self._seen_h1 = True
+        elif tag == 'a':
+            track = attrs.get('href') is not None
+        else:
+            track = tag in ('p', 'span')
+        self._stack.append([tag, position, [] if track else None, attrs])
+        if tag in HIDDEN_TEXT_ELEMENTS:
+            self._hidden_depth += 1
+        if tag in PRESERVE_WHITESPACE_ELEMENTS:
+            self._preserve_depth += 1
+
+    def data(self, text):
+        # Adjacent chunks form one string, finished by the next markup event
+        self._pending.append(text)
+
+    def comment(self, text):
+        self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        text = ''.join(self._pending)
+        self._pending = []
+        if self._hidden_depth:
+            return
+        if not self._preserve_depth and not text.strip(ASCII_SPACES):
+            text = '\n' if '\n' in text else ' '
+        for element in self._stack:
+            if element[2] is not None:
+                element[2].append(text)
+
+    def end(self, tag):
+        tag = tag.lower()
+        self.flush()
+        if tag in VOID_ELEMENTS:
+            return
+        # Close everything up to the most recent open element with this name
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index][0] == tag:
+                break
+        else:
+            return
+        while len(self._stack) > index:
+            self._close(self._stack.pop())
+        if self.stop_early and self._complete():
+            raise _StopParsing()
+
+    def close(self):
+        self.flush()
+        # Elements left open run to the end of the document
+        while self._stack:
+            self._close(self._stack.pop())
+        return self.result()
+
+    def _close(self, element):
+        tag, position, buffer, attrs = element
+        if tag in HIDDEN_TEXT_ELEMENTS:
+            self._hidden_depth -= 1
+        if tag in PRESERVE_WHITESPACE_ELEMENTS:
+            self._preserve_depth -= 1
+        if buffer is None:
+            return
+        text = ''.join(buffer)
+
+        if tag == 'h1':
+            self.fields['name'] = text.strip()
+            self._matched_at['name'] = position
+            return
+
+        lowered = None
+        for field, (field_tag, needle) in TEXT_FIELDS.items():
+            if field_tag != tag:
+                continue
+            best = self._matched_at.get(field)
+            if best is not None and best < position:
+                continue
+            if lowered is None:
+                lowered = text.lower()
+            if needle in lowered:
+                self.fields[field] = attrs['href'] if field == 'website' else text.strip()
+                self._matched_at[field] = position
+
+    def _complete(self):
+        if len(self._matched_at) < len(TEXT_FIELDS) + 1 or 'description' not in self.fields:
+            return False
+        # An element still open could start before a match and win once it closes
+        for tag, position, buffer, attrs in self._stack:
+            if buffer is None:
+                continue
+            for field, (field_tag, needle) in TEXT_FIELDS.items():
+                if field_tag == tag and position < self._matched_at[field]:
+                    return False
+        return True
+
+    def result(self):
+        return {field: self.fields.get(field, '') for field in FIELD_NAMES}
+
+class _StreamingHTMLParser(HTMLParser):
+    """
+    html.parser front end that forwards events to a collector without building a tree
+    """
+    def __init__(self, collector):
+        # Character references are resolved here, the same way BeautifulSoup does
+        super().__init__(convert_charrefs=False)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, _attr_dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag, _attr_dict(attrs))
+        self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+    def handle_charref(self, name):
+        self.collector.data(unescape(f"&#{name};"))
+
+    def handle_entityref(self, name):
+        # Unknown names are literal text, e.g. "&copyright" stays as written
+        self.collector.data(html5.get(f"{name};", f"&{name}"))
+
+    def handle_comment(self, data):
+        self.collector.flush()
+
+    def handle_decl(self, decl):
+        self.collector.flush()
+
+    def handle_pi(self, data):
+        self.collector.flush()
+
+    def unknown_decl(self, data):
+        self.collector.flush()
+        if data.upper().startswith('CDATA['):
+            # CDATA sections are their own string and count as text
+            self.collector.data(data[len('CDATA['):])
+            self.collector.flush()
+
+def _attr_dict(attrs):
+    # Later duplicates win, and valueless attributes count as empty strings
+    return {name: '' if value is None else value for name, value in attrs}
+
+def _parse_with_html_parser(html, collector):
+    parser = _StreamingHTMLParser(collector)
+    parser.feed(html)
+    parser.close()
+
+def _parse_with_lxml(html, collector):
+    parser = etree.HTMLParser(target=collector)
+    parser.feed(html)
+    parser.close()
+
+def extract_company_fields(html, backend='html.parser', stop_early=True):
+    """
+    Extract name, description, website, size, location and founded from a
+    LinkedIn company page in a single pass over the markup
+    `backend` is 'html.parser' or 'lxml'. lxml repairs broken markup differently
+    (e.g. it closes a <p> before a <div>), so only html.parser is guaranteed to
+    match the old BeautifulSoup lookups on malformed pages
+    """
+    if backend == 'lxml' and etree is None:
+        logger.warning("lxml not installed, falling back to html.parser")
+        backend = 'html.parser'
+
+    collector = CompanyFieldCollector(stop_early=stop_early)
+    try:
+        if backend == 'lxml':
+            _parse_with_lxml(html, collector)
+        else:
+            _parse_with_html_parser(html, collector)
+    except _StopParsing:
+        return collector.result()
+    return collector.close()
@@ -0,0 +1,252 @@
+"""
+Persistent HTTP response cache in a single SQLite file
+
+Bodies are stored zlib-compressed and keyed by normalized URL. Fresh entries
+(younger than the TTL) are served without touching the network; stale entries
+that carry an ETag or Last-Modified header are revalidated with a conditional
+GET, so an unchanged page costs a 304 instead of a full download. The total
+compressed size is bounded and the least recently used entries are evicted.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from utils.urls import normalize_linkedin_url
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_PATH = os.environ.get(
+    'HTTP_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'http_cache.db')
+)
+DEFAULT_TTL = 24 * 3600
+# Search results change more slowly than company pages
+SEARCH_TTL = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Evict down to this fraction of the limit so we don't evict on every store
+EVICT_TO = 0.9
+
+# How fetch uses the cache:
+#   default - serve fresh entries, revalidate stale ones
+#   refresh - always go to the network and overwrite the entry
+#   offline - never go to the network; misses come back as 504
+CACHE_MODES = ('default', 'refresh', 'offline')
+
+# Response headers worth keeping; the rest describe the original transfer
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS http_cache (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    encoding TEXT,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    raw_size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_http_cache_accessed_at ON http_cache (accessed_at);
+CREATE TABLE IF NOT EXISTS search_cache (
+    query TEXT PRIMARY KEY,
+    max_results INTEGER NOT NULL,
+    urls TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+def cache_key(url):
+    """
+    LinkedIn URLs use the same canonical form as the database; other URLs
+    only lose their fragment, since their query strings matter
+    """
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if host == 'linkedin.com' or host.endswith('.linkedin.com'):
+        return normalize_linkedin_url(url)
+    return urlunsplit((parts.scheme.lower(), host, parts.path, parts.query, ''))
+
+def search_key(query):
+    return ' '.join(query.lower().split())
+
+def _build_response(url, status, headers, encoding, content, from_cache=True):
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = encoding
+    response._content = content
+    response.from_cache = from_cache
+    return response
+
+def offline_miss(url):
+    response = _build_response(url, 504, {}, None, b'')
+    response.reason = 'Not in cache (offline)'
+    return response
+
+class HttpCache:
+    """
+    SQLite-backed response cache shared by every thread of the process
+    """
+    def __init__(self, path=HTTP_CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._total_size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM http_cache').fetchone()[0]
+        self._stats = {
+            'hits': 0, 'misses': 0, 'revalidated': 0, 'stores': 0, 'evictions': 0,
+            'offline_misses': 0, 'bytes_saved': 0, 'bytes_downloaded': 0,
+            'search_hits': 0, 'search_misses': 0
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = self._conn.execute('SELECT COUNT(*) FROM http_cache').fetchone()[0]
+            stats['size_bytes'] = self._total_size
+        lookups = stats['hits'] + stats['revalidated'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['revalidated']) / lookups if lookups else 0.0
+        return stats
+
+    def record(self, name, amount=1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def lookup(self, url):
+        """
+        Return (entry dict, is_fresh) for a URL, or (None, False) on a miss
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT url, status, headers, encoding, body, raw_size, fetched_at FROM http_cache WHERE key = ?',
+                (cache_key(url),)
+            ).fetchone()
+        if row is None:
+            return None, False
+        entry = {
+            'url': row[0], 'status': row[1], 'headers': json.loads(row[2]), 'encoding': row[3],
+            'body': row[4], 'raw_size': row[5], 'fetched_at': row[6]
+        }
+        return entry, time.time() - entry['fetched_at'] < self.ttl
+
+    def is_fresh(self, url):
+        """
+        Whether a fetch of `url` would be answered from the cache without a request
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT fetched_at FROM http_cache WHERE key = ?', (cache_key(url),)).fetchone()
+        return row is not None and time.time() - row[0] < self.ttl
+
+    def response(self, entry, url):
+        """
+        Rebuild a requests.Response from a cache entry and mark it used
+        """
+        with self._lock:
+            self._conn.execute('UPDATE http_cache SET accessed_at = ? WHERE key = ?', (time.time(), cache_key(url)))
+        return _build_response(url, entry['status'], entry['headers'], entry['encoding'], zlib.decompress(entry['body']))
+
+    def touch(self, url):
+        """
+        Mark an entry fresh again after a 304
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'UPDATE http_cache SET fetched_at = ?, accessed_at = ? WHERE key = ?', (now, now, cache_key(url))
+            )
+
+    def store(self, url, response):
+        headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        content = response.content
+        body = zlib.compress(content, 6)
+        now = time.time()
+        key = cache_key(url)
+        with self._lock:
+            previous = self._conn.execute('SELECT size FROM http_cache WHERE key = ?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO http_cache '
+                '(key, url, status, headers, encoding, body, size, raw_size, fetched_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, url, response.status_code, json.dumps(headers), response.encoding, body,
+                 len(body), len(content), now, now)
+            )
+            self._total_size += len(body) - (previous[0] if previous else 0)
+            self._stats['stores'] += 1
+            if self._total_size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Caller holds the lock; drop least recently used entries until under the target
+        target = self.max_bytes * EVICT_TO
+        rows = self._conn.execute('SELECT key, size FROM http_cache ORDER BY accessed_at').fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._total_size <= target:
+                break
+            evicted.append((key,))
+            self._total_size -= size
+        self._conn.executemany('DELETE FROM http_cache WHERE key = ?', evicted)
+        self._stats['evictions'] += len(evicted)
+        logger.debug(f"HTTP cache evicted {len(evicted)} entries")
+
+    def search_results(self, query, max_results, ttl=SEARCH_TTL, allow_stale=False):
+        """
+        URLs stored for an equivalent query, or None if there is no usable entry
+        An entry only answers searches asking for at most as many results as it did
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT max_results, urls, fetched_at FROM search_cache WHERE query = ?', (search_key(query),)
+            ).fetchone()
+            usable = (
+                row is not None and row[0] >= max_results
+                and (allow_stale or time.time() - row[2] < ttl)
+            )
+            self._stats['search_hits' if usable else 'search_misses'] += 1
+        return json.loads(row[1])[:max_results] if usable else None
+
+    def store_search_results(self, query, max_results, urls):
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO search_cache (query, max_results, urls, fetched_at) VALUES (?, ?, ?, ?)',
+                (search_key(query), max_results, json.dumps(urls), time.time())
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM http_cache')
+            self._conn.execute('DELETE FROM search_cache')
+            self._total_size = 0
+
+def conditional_headers(entry):
+    """
+    Validators to send when revalidating a stale entry, if it has any
+    """
+    headers = {}
+    cached = CaseInsensitiveDict(entry['headers'])
+    if cached.get('ETag'):
+        headers['If-None-Match'] = cached['ETag']
+    if cached.get('Last-Modified'):
+        headers['If-Modified-Since'] = cached['Last-Modified']
+    return headers
@@ -0,0 +1,171 @@
+import os
+import threading
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from utils.http_cache import (
+    CACHE_MODES, DEFAULT_MAX_BYTES, DEFAULT_TTL, HTTP_CACHE_PATH, HttpCache, conditional_headers, offline_miss
+)
+from utils.metrics import HTTP_BYTES, HTTP_CACHE_LOOKUPS, HTTP_RESPONSES, timed
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+DEFAULT_POOL_HOSTS = 10
+DEFAULT_POOL_SIZE = 32
+
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
+_cache = None
+_cache_configured = False
+_cache_lock = threading.Lock()
+
+def build_session(pool_hosts=DEFAULT_POOL_HOSTS, pool_size=DEFAULT_POOL_SIZE, retries=3,
+                  backoff_factor=0.5, backoff_jitter=0.5, backoff_max=30):
+    """
+    Create a requests session with keep-alive connection pools and retry/backoff
+    `pool_size` bounds the open connections kept per host; extra requests wait for a free one
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_jitter,
+        backoff_max=backoff_max,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_hosts,
+        pool_maxsize=pool_size,
+        pool_block=True,
+        max_retries=retry
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def get_session():
+    """
+    Return the process-wide shared session, creating it on first use
+    """
+    if _session is None:
+        ensure_pool_size(DEFAULT_POOL_SIZE)
+    return _session
+
+def ensure_pool_size(pool_size):
+    """
+    Make sure the shared session can keep `pool_size` connections per host
+    The session is only rebuilt when it needs to grow, so warm connections are kept
+    """
+    global _session, _session_pool_size
+    with _session_lock:
+        if _session is None or _session_pool_size < pool_size:
+            # The old session is left to in-flight requests and closes when collected
+            _session = build_session(pool_size=pool_size)
+            _session_pool_size = pool_size
+            logger.debug(f"HTTP session pool size set to {pool_size}")
+    return _session
+
+def configure_cache(path=HTTP_CACHE_PATH, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES, enabled=True):
+    """
+    Set up (or turn off) the response cache used by fetch(use_cache=True)
+    """
+    global _cache, _cache_configured
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = HttpCache(path, ttl=ttl, max_bytes=max_bytes) if enabled else None
+        _cache_configured = True
+    return _cache
+
+def get_cache():
+    """
+    Return the process-wide response cache, opening the default one on first use
+    Set HTTP_CACHE=off to disable it
+    """
+    global _cache, _cache_configured
+    if not _cache_configured:
+        with _cache_lock:
+            if not _cache_configured:
+                if os.environ.get('HTTP_CACHE', 'on').lower() not in ('0', 'off', 'false'):
+                    try:
+                        _cache = HttpCache()
+                    except Exception as e:
+                        logger.warning(f"HTTP cache unavailable ({str(e)}), fetching without it")
+                _cache_configured = True
+    return _cache
+
+def cache_stats():
+    """
+    Hit/miss/byte-savings counters for this process, plus the cache's size on disk
+    """
+    cache = get_cache()
+    return cache.stats() if cache is not None else None
+
+def _get(url, headers, timeout):
+    with timed('http_fetch'):
+        response = get_session().get(url, headers=headers, timeout=timeout)
+    HTTP_RESPONSES.inc(status=response.status_code)
+    HTTP_BYTES.inc(len(response.content))
+    return response
+
+def fetch(url, user_agent='Mozilla/5.0', timeout=10, headers=None, use_cache=False, cache_mode='default'):
+    """
+    GET a URL through the shared session
+    Retries with exponential backoff and jitter happen inside the adapter
+    With `use_cache`, fresh cached responses are returned without a request and
+    stale ones are revalidated; `cache_mode` is one of CACHE_MODES. Offline
+    never touches the network, so without a cache every fetch is a miss
+    """
+    if cache_mode not in CACHE_MODES:
+        raise ValueError(f"Unknown cache mode: {cache_mode}")
+    request_headers = {'User-Agent': user_agent}
+    if headers:
+        request_headers.update(headers)
+    cache = get_cache() if use_cache else None
+    if cache is None:
+        if cache_mode == 'offline':
+            HTTP_CACHE_LOOKUPS.inc(result='offline_miss')
+            return offline_miss(url)
+        return _get(url, request_headers, timeout)
+
+    entry, fresh = cache.lookup(url) if cache_mode != 'refresh' else (None, False)
+    if entry is not None and (fresh or cache_mode == 'offline'):
+        cache.record('hits')
+        HTTP_CACHE_LOOKUPS.inc(result='hit')
+        cache.record('bytes_saved', entry['raw_size'])
+        return cache.response(entry, url)
+    if cache_mode == 'offline':
+        cache.record('offline_misses')
+        HTTP_CACHE_LOOKUPS.inc(result='offline_miss')
+        return offline_miss(url)
+
+    if entry is not None:
+        request_headers.update(conditional_headers(entry))
+    response = _get(url, request_headers, timeout)
+    if entry is not None and response.status_code == 304:
+        cache.touch(url)
+        cache.record('revalidated')
+        HTTP_CACHE_LOOKUPS.inc(result='revalidated')
+        cache.record('bytes_saved', entry['raw_size'])
+        return cache.response(entry, url)
+
+    cache.record('misses')
+    HTTP_CACHE_LOOKUPS.inc(result='miss')
+    cache.record('bytes_downloaded', len(response.content))
+    if response.status_code == 200:
+        cache.store(url, response)
+    response.from_cache = False
+    return response
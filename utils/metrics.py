@@ -0,0 +1,256 @@
+"""
+Process-wide counters and stage timers, exposed in the Prometheus text format
+
+Every pipeline stage (search, fetch, parse, classify, each NLP step, save) is
+timed with `timed(stage)` into the scraper_stage_seconds histogram. Recording a
+sample is a dict update under a lock, cheap enough to leave on all the time.
+Metrics are per process; with several app processes, scrape each one.
+
+Inside `collect_timings()` the same samples are also added to a per-run summary,
+which is how scrape jobs report where their time went. The summary follows the
+context, so work handed to thread pools must run in a copy of the caller's
+context (see `in_context`).
+"""
+import contextvars
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import partial
+
+# Seconds; spans a cached page lookup up to a slow fetch with retries
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class Counter:
+    """A monotonically increasing value per label combination"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [(self.name, _format_labels(self.labelnames, key), value) for key, value in values]
+
+class Histogram:
+    """Observations counted into cumulative buckets per label combination"""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        # First bucket whose upper bound is >= value; len(buckets) is +Inf
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), then the running sum
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                lines.append((f'{self.name}_bucket', labels, cumulative))
+            lines.append((f'{self.name}_sum', _format_labels(self.labelnames, key), total))
+            lines.append((f'{self.name}_count', _format_labels(self.labelnames, key), cumulative))
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format (version 0.0.4)
+        """
+        lines = []
+        for metric in sorted(self._metrics.values(), key=lambda metric: metric.name):
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(f'{name}{labels} {_format_value(value)}' for name, labels, value in metric.samples())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'scraper_stage_seconds', 'Time spent in each scrape pipeline stage', ['stage']
+)
+HTTP_RESPONSES = REGISTRY.counter(
+    'scraper_http_responses_total', 'HTTP responses received, by status code', ['status']
+)
+HTTP_BYTES = REGISTRY.counter(
+    'scraper_http_bytes_total', 'Response body bytes downloaded over the network'
+)
+HTTP_CACHE_LOOKUPS = REGISTRY.counter(
+    'scraper_http_cache_total', 'HTTP response cache lookups, by result', ['result']
+)
+PAGES_SCRAPED = REGISTRY.counter(
+    'scraper_pages_total', 'Company pages scraped, by result', ['result']
+)
+NLP_CACHE_LOOKUPS = REGISTRY.counter(
+    'scraper_nlp_cache_total', 'Descriptions looked up in the enrichment cache, by result', ['result']
+)
+ROWS_SAVED = REGISTRY.counter(
+    'scraper_rows_saved_total', 'Company rows written to the database, by result', ['result']
+)
+
+_timings = contextvars.ContextVar('scraper_timings', default=None)
+
+class TimingSummary:
+    """
+    Per-stage count, total and slowest time for one run
+    With `keep_samples`, every sample is kept too so percentiles can be reported
+    """
+    def __init__(self, keep_samples=False):
+        self._stages = {}
+        self._samples = {} if keep_samples else None
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                self._stages[stage] = [1, seconds, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+            if self._samples is not None:
+                self._samples.setdefault(stage, []).append(seconds)
+
+    def to_dict(self):
+        """
+        {'wall_seconds': ..., 'stages': {stage: {count, seconds, mean_ms, max_ms}}}
+        plus p50_ms and p95_ms per stage when samples are kept.
+        Stage seconds add up time across threads, so they can exceed wall time
+        """
+        with self._lock:
+            stages = {stage: list(entry) for stage, entry in self._stages.items()}
+            samples = {stage: sorted(values) for stage, values in self._samples.items()} if self._samples else {}
+        summary = {
+            'wall_seconds': round(time.perf_counter() - self._started, 3),
+            'stages': {
+                stage: {
+                    'count': count,
+                    'seconds': round(total, 4),
+                    'mean_ms': round(total / count * 1000, 3),
+                    'max_ms': round(slowest * 1000, 3)
+                }
+                for stage, (count, total, slowest) in sorted(stages.items(), key=lambda item: -item[1][1])
+            }
+        }
+        for stage, values in samples.items():
+            summary['stages'][stage]['p50_ms'] = round(percentile(values, 50) * 1000, 3)
+            summary['stages'][stage]['p95_ms'] = round(percentile(values, 95) * 1000, 3)
+        return summary
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    summary = _timings.get()
+    if summary is not None:
+        summary.add(stage, seconds)
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+@contextmanager
+def collect_timings(keep_samples=False):
+    """
+    Add every stage timed inside the block (in this context) to a fresh TimingSummary
+    """
+    summary = TimingSummary(keep_samples)
+    token = _timings.set(summary)
+    try:
+        yield summary
+    finally:
+        _timings.reset(token)
+
+def in_context(func):
+    """
+    Bind `func` to a copy of the current context, for handing to a thread pool
+    Call it once per submitted task: a context can't be entered by two threads at once
+    """
+    return partial(contextvars.copy_context().run, func)
+
+def format_timings(summary):
+    """
+    Text table of a TimingSummary.to_dict(), slowest stage first
+    """
+    lines = [f"{'stage':<22} {'count':>7} {'seconds':>9} {'mean ms':>9} {'max ms':>9}"]
+    for stage, entry in summary['stages'].items():
+        lines.append(
+            f"{stage:<22} {entry['count']:>7} {entry['seconds']:>9.3f} {entry['mean_ms']:>9.3f} {entry['max_ms']:>9.3f}"
+        )
+    lines.append(f"{'wall time':<22} {'':>7} {summary['wall_seconds']:>9.3f}")
+    return '\n'.join(lines)
@@ -1,22 +1,25 @@
 import pandas as pd
-import nltk
 import logging
+import os
 import re
-from collections import Counter
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from utils.fingerprint import description_hash
+from utils.metrics import NLP_CACHE_LOOKUPS, observe_stage, timed
+from utils.tfidf import MemoryTermStats, top_terms
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Download necessary NLTK resources if they don't exist
-logger.info("Making sure all required NLTK resources are downloaded...")
-nltk.download('punkt', quiet=True)
-nltk.download('stopwords', quiet=True)
-nltk.download('wordnet', quiet=True)
-
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+# NLTK corpora are read from this directory (provisioned once with `flask prepare-nlp`)
+# and are never downloaded at import time
+NLTK_DATA_DIR = os.environ.get(
+    'NLTK_DATA_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'nltk_data')
+)
+NLTK_RESOURCES = ('stopwords', 'wordnet')
 
 # Domain-specific stopwords
 DOMAIN_STOPWORDS = {
@@ -28,70 +31,166 @@ DOMAIN_STOPWORDS = {
     'help', 'helping', 'helps', 'support', 'supporting'
 }
 
-def preprocess_text(text):
+# Cleaning patterns, compiled once
+URL_PATTERN = re.compile(r'http\S+|www\S+|https\S+')
+EMAIL_PATTERN = re.compile(r'\S*@\S*\s?')
+NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Below this many rows per worker a process pool costs more than it saves
+MIN_ROWS_PER_WORKER = 2000
+
+# Columns added to each record by process_descriptions / enrich_records
+NLP_COLUMNS = ('keywords', 'technologies', 'sentiment', 'description_length')
+
+# Bump whenever the keywords/technologies/sentiment output changes, so cached
+# enrichments computed by older code are no longer used
+NLP_PIPELINE_VERSION = 2
+
+# Basic English stopwords used when the NLTK corpus is unavailable
+BASIC_STOPWORDS = {'the', 'and', 'a', 'to', 'of', 'in', 'is', 'it', 'that', 'for', 'on', 'with', 'as', 'by', 'at'}
+
+# Tech keywords to look for
+TECH_KEYWORDS = [
+    'ai', 'artificial intelligence', 'machine learning', 'ml', 'data science',
+    'cloud', 'aws', 'azure', 'gcp', 'google cloud', 'blockchain', 'iot',
+    'internet of things', 'big data', 'analytics', 'devops', 'saas',
+    'software as a service', 'python', 'java', 'javascript', 'react',
+    'angular', 'node', 'mobile', 'web development', 'cybersecurity',
+    'security', 'automation', 'fintech', 'healthtech', 'edtech', 'proptech'
+]
+
+# List of positive and negative words
+POSITIVE_WORDS = [
+    'innovative', 'leading', 'success', 'successful', 'growth', 'growing',
+    'best', 'excellent', 'outstanding', 'award', 'winning', 'top', 'premier',
+    'trusted', 'advanced', 'expert', 'specialized', 'quality', 'efficient',
+    'effective', 'proven', 'reliable', 'seamless', 'cutting-edge', 'state-of-the-art'
+]
+
+NEGATIVE_WORDS = [
+    'challenge', 'difficult', 'problem', 'issue', 'struggle', 'fail',
+    'limitation', 'constraint', 'weakness', 'disadvantage', 'drawback',
+    'decline', 'decrease', 'reduce', 'loss', 'costly', 'expensive'
+]
+
+@lru_cache(maxsize=1)
+def _nltk():
     """
-    Preprocess text for NLP analysis with simple tokenization fallback
+    Import NLTK on first use and point it at the local data directory
+    """
+    import nltk
+    if NLTK_DATA_DIR not in nltk.data.path:
+        nltk.data.path.insert(0, NLTK_DATA_DIR)
+    return nltk
+
+def prepare_nlp_resources(data_dir=None):
+    """
+    Download the NLTK corpora into the local data directory
+    Run once at build/provision time; returns True if every resource is available
+    """
+    nltk = _nltk()
+    data_dir = data_dir or NLTK_DATA_DIR
+    os.makedirs(data_dir, exist_ok=True)
+    ok = True
+    for resource in NLTK_RESOURCES:
+        logger.info(f"Downloading NLTK resource '{resource}' to {data_dir}")
+        ok = nltk.download(resource, download_dir=data_dir, quiet=True) and ok
+    get_stop_words.cache_clear()
+    _get_lemmatizer.cache_clear()
+    lemmatize.cache_clear()
+    return ok
+
+@lru_cache(maxsize=1)
+def get_stop_words():
+    """
+    English stopwords combined with domain-specific ones, loaded once per process
     """
-    if not isinstance(text, str) or not text:
-        return []
-    
-    # Convert to lowercase
-    text = text.lower()
-    
-    # Remove URLs, email addresses, and special characters
-    text = re.sub(r'http\S+|www\S+|https\S+', '', text)
-    text = re.sub(r'\S*@\S*\s?', '', text)
-    text = re.sub(r'[^\w\s]', ' ', text)
-    text = re.sub(r'\s+', ' ', text)
-    
-    try:
-        # Try to use NLTK tokenizer
-        tokens = word_tokenize(text)
-    except Exception as e:
-        logger.warning(f"NLTK word_tokenize failed: {str(e)}. Using simple split instead.")
-        # Simple fallback tokenization
-        tokens = text.split()
-    
     try:
-        # Get English stopwords and combine with domain-specific ones
-        stop_words = set(stopwords.words('english')).union(DOMAIN_STOPWORDS)
+        _nltk()
+        from nltk.corpus import stopwords
+        stop_words = set(stopwords.words('english'))
     except Exception as e:
-        logger.warning(f"NLTK stopwords failed: {str(e)}. Using basic stopwords.")
-        # Basic English stopwords
-        stop_words = {'the', 'and', 'a', 'to', 'of', 'in', 'is', 'it', 'that', 'for', 'on', 'with', 'as', 'by', 'at'}
-        stop_words.update(DOMAIN_STOPWORDS)
-    
-    # Remove stopwords and short words
-    tokens = [word for word in tokens if word not in stop_words and len(word) > 2]
-    
+        logger.warning(f"NLTK stopwords failed: {type(e).__name__}. Using basic stopwords (run `flask prepare-nlp` to install them).")
+        stop_words = set(BASIC_STOPWORDS)
+    return frozenset(stop_words.union(DOMAIN_STOPWORDS))
+
+@lru_cache(maxsize=1)
+def _get_lemmatizer():
     try:
-        # Lemmatize
+        _nltk()
+        from nltk.stem import WordNetLemmatizer
         lemmatizer = WordNetLemmatizer()
-        tokens = [lemmatizer.lemmatize(word) for word in tokens]
+        # Force the WordNet corpus to load now so a missing corpus fails here, once
+        lemmatizer.lemmatize('companies')
+        return lemmatizer.lemmatize
     except Exception as e:
-        logger.warning(f"NLTK lemmatization failed: {str(e)}. Using original tokens.")
-        # Just use the tokens as is if lemmatization fails
-        pass
-    
-    return tokens
+        logger.warning(f"NLTK lemmatization failed: {type(e).__name__}. Using original tokens (run `flask prepare-nlp` to install WordNet).")
+        return None
 
-def extract_keywords(text, top_n=10):
+@lru_cache(maxsize=100000)
+def lemmatize(word):
     """
-    Extract the most common keywords from text
+    Lemmatize a single word; results are memoized since vocabularies repeat heavily
     """
-    tokens = preprocess_text(text)
-    
-    # Count word frequencies
-    word_freq = Counter(tokens)
-    
-    # Get the top N keywords
-    top_keywords = word_freq.most_common(top_n)
-    
-    # Format as a comma-separated string
-    if top_keywords:
-        return ", ".join([word for word, _ in top_keywords])
+    lemmatizer = _get_lemmatizer()
+    return lemmatizer(word) if lemmatizer else word
+
+def clean_text(text):
+    """
+    Lowercase and strip URLs, email addresses and punctuation
+    """
+    text = text.lower()
+    text = URL_PATTERN.sub('', text)
+    text = EMAIL_PATTERN.sub('', text)
+    text = NON_WORD_PATTERN.sub(' ', text)
+    return WHITESPACE_PATTERN.sub(' ', text)
+
+def _filter_tokens(tokens):
+    # Remove stopwords and short words, then lemmatize
+    stop_words = get_stop_words()
+    return [lemmatize(word) for word in tokens if word not in stop_words and len(word) > 2]
+
+def preprocess_text(text):
+    """
+    Preprocess text for NLP analysis
+    Cleaned text only contains word characters and spaces, so splitting on
+    whitespace gives the same tokens as the NLTK word tokenizer, much faster
+    """
+    if not isinstance(text, str) or not text:
+        return []
+    return _filter_tokens(clean_text(text).split())
+
+def keywords_from_tokens(token_lists, term_stats=None, top_n=10):
+    """
+    Top TF-IDF terms of each token list as comma-separated strings
+    The token lists are added to `term_stats` as new documents first; without
+    term stats the batch is its own corpus
+    """
+    if term_stats is None:
+        term_stats = MemoryTermStats()
+    term_stats.add_documents(set(tokens) for tokens in token_lists)
+    return [", ".join(terms) for terms in top_terms(token_lists, term_stats, top_n)]
+
+def _entities_from_lower(lower_text):
+    return ", ".join([keyword for keyword in TECH_KEYWORDS if keyword in lower_text])
+
+def _sentiment_from_lower(lower_text):
+    positive_count = sum(1 for word in POSITIVE_WORDS if word in lower_text)
+    negative_count = sum(1 for word in NEGATIVE_WORDS if word in lower_text)
+    if positive_count > negative_count:
+        return "positive"
+    elif negative_count > positive_count:
+        return "negative"
     else:
-        return ""
+        return "neutral"
+
+def extract_keywords(text, top_n=10, term_stats=None):
+    """
+    Extract the keywords of a text, weighted by how rare they are across `term_stats`
+    (on its own, the most frequent words)
+    """
+    return keywords_from_tokens([preprocess_text(text)], term_stats, top_n)[0]
 
 def extract_entities(text):
     """
@@ -99,25 +198,8 @@ def extract_entities(text):
     This is a simple implementation - a more advanced version 
     would use named entity recognition (NER)
     """
-    # Tech keywords to look for
-    tech_keywords = [
-        'ai', 'artificial intelligence', 'machine learning', 'ml', 'data science',
-        'cloud', 'aws', 'azure', 'gcp', 'google cloud', 'blockchain', 'iot',
-        'internet of things', 'big data', 'analytics', 'devops', 'saas',
-        'software as a service', 'python', 'java', 'javascript', 'react',
-        'angular', 'node', 'mobile', 'web development', 'cybersecurity',
-        'security', 'automation', 'fintech', 'healthtech', 'edtech', 'proptech'
-    ]
-    
-    entities = []
     lower_text = text.lower() if isinstance(text, str) else ""
-    
-    # Look for tech keywords
-    for keyword in tech_keywords:
-        if keyword in lower_text:
-            entities.append(keyword)
-    
-    return ", ".join(entities) if entities else ""
+    return _entities_from_lower(lower_text)
 
 def analyze_sentiment(text):
     """
@@ -126,37 +208,187 @@ def analyze_sentiment(text):
     """
     if not isinstance(text, str) or not text:
         return "neutral"
+    return _sentiment_from_lower(text.lower())
+
+def _analyze_rows(descriptions):
+    """
+    Tokens, technologies, sentiment and description_length of each description,
+    in one pass per row; keywords are scored from the tokens afterwards
+    """
+    started = time.perf_counter()
+    is_text = descriptions.map(lambda x: isinstance(x, str))
+    text = descriptions.where(is_text, '')
+
+    # Vectorized string work: lowercase once, then clean for tokenization
+    lowered = text.str.lower()
+    cleaned = (
+        lowered
+        .str.replace(URL_PATTERN, '', regex=True)
+        .str.replace(EMAIL_PATTERN, '', regex=True)
+        .str.replace(NON_WORD_PATTERN, ' ', regex=True)
+    )
+    observe_stage('nlp_clean', time.perf_counter() - started)
+
+    tokens = []
+    technologies = []
+    sentiments = []
+    # Per-step time is summed over the batch and recorded once, not per row
+    step_seconds = [0.0, 0.0, 0.0]
+    clock = time.perf_counter
+    for lower_text, clean in zip(lowered.tolist(), cleaned.tolist()):
+        t0 = clock()
+        tokens.append(_filter_tokens(clean.split()))
+        t1 = clock()
+        technologies.append(_entities_from_lower(lower_text))
+        t2 = clock()
+        sentiments.append(_sentiment_from_lower(lower_text) if lower_text else "neutral")
+        t3 = clock()
+        step_seconds[0] += t1 - t0
+        step_seconds[1] += t2 - t1
+        step_seconds[2] += t3 - t2
+    for stage, seconds in zip(('nlp_keywords', 'nlp_technologies', 'nlp_sentiment'), step_seconds):
+        observe_stage(stage, seconds)
+
+    return {
+        'tokens': tokens,
+        'technologies': technologies,
+        'sentiment': sentiments,
+        'description_length': text.str.len().astype(int).tolist(),
+    }
+
+def _frame(columns, token_lists, index, term_stats):
+    started = time.perf_counter()
+    keywords = keywords_from_tokens(token_lists, term_stats)
+    observe_stage('nlp_tfidf', time.perf_counter() - started)
+    return pd.DataFrame({'keywords': keywords, **columns}, index=index, columns=list(NLP_COLUMNS))
+
+def analyze_descriptions(descriptions, term_stats=None):
+    """
+    Run every NLP step over a Series of descriptions
+    Keywords are scored as one TF-IDF batch against `term_stats`, to which the
+    descriptions are added as new documents
+    Returns a DataFrame with keywords, technologies, sentiment and description_length
+    """
+    columns = _analyze_rows(descriptions)
+    token_lists = columns.pop('tokens')
+    return _frame(columns, token_lists, descriptions.index, term_stats)
+
+class MemoryEnrichmentCache:
+    """
+    In-process enrichment cache (models.DatabaseEnrichmentCache persists across runs)
+    An enrichment cache maps description hashes to NLP column values through
+    get(hashes) -> {hash: values} and put({hash: values})
+    """
+    def __init__(self):
+        self._entries = {}
     
-    # List of positive and negative words
-    positive_words = [
-        'innovative', 'leading', 'success', 'successful', 'growth', 'growing',
-        'best', 'excellent', 'outstanding', 'award', 'winning', 'top', 'premier',
-        'trusted', 'advanced', 'expert', 'specialized', 'quality', 'efficient',
-        'effective', 'proven', 'reliable', 'seamless', 'cutting-edge', 'state-of-the-art'
-    ]
-    
-    negative_words = [
-        'challenge', 'difficult', 'problem', 'issue', 'struggle', 'fail',
-        'limitation', 'constraint', 'weakness', 'disadvantage', 'drawback',
-        'decline', 'decrease', 'reduce', 'loss', 'costly', 'expensive'
-    ]
+    def get(self, hashes):
+        return {h: self._entries[h] for h in hashes if h in self._entries}
     
-    # Count occurrences
-    lower_text = text.lower()
-    positive_count = sum(1 for word in positive_words if word in lower_text)
-    negative_count = sum(1 for word in negative_words if word in lower_text)
+    def put(self, entries):
+        self._entries.update(entries)
+
+_cache_stats = {'hits': 0, 'misses': 0}
+
+def enrichment_cache_stats():
+    """
+    Rows served from an enrichment cache vs. sent through the NLP code, in this process
+    """
+    stats = dict(_cache_stats)
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / total if total else 0.0
+    return stats
+
+def analyze_descriptions_cached(descriptions, cache, workers=None, term_stats=None):
+    """
+    analyze_descriptions, but only descriptions missing from `cache` are analyzed
+    (each distinct text once, so only those count as new documents for
+    `term_stats`); the new results are added to the cache
+    """
+    texts = descriptions.tolist()
+    hashes = [description_hash(text) for text in texts]
+    known = cache.get(set(hashes))
+    missing = {}
+    for h, text in zip(hashes, texts):
+        if h not in known and h not in missing:
+            missing[h] = text
+    if missing:
+        results = _analyze(pd.Series(list(missing.values()), dtype=object), workers, term_stats)
+        computed = dict(zip(missing, results.to_dict('records')))
+        cache.put(computed)
+        known.update(computed)
     
-    # Determine sentiment
-    if positive_count > negative_count:
-        return "positive"
-    elif negative_count > positive_count:
-        return "negative"
-    else:
-        return "neutral"
+    _cache_stats['hits'] += len(hashes) - len(missing)
+    _cache_stats['misses'] += len(missing)
+    NLP_CACHE_LOOKUPS.inc(len(hashes) - len(missing), result='hit')
+    NLP_CACHE_LOOKUPS.inc(len(missing), result='miss')
+    logger.debug(f"NLP cache: {len(hashes) - len(missing)} rows cached, {len(missing)} analyzed")
+    return pd.DataFrame([known[h] for h in hashes], index=descriptions.index, columns=list(NLP_COLUMNS))
 
-def process_descriptions(df):
+def enrich_records(records, cache=None, term_stats=None):
+    """
+    Add the NLP columns to a batch of scraped record dicts, in place
+    Used by the streaming pipeline, which enriches small batches as they arrive
+    """
+    if not records:
+        return records
+    descriptions = pd.Series([record.get('description') for record in records], dtype=object)
+    with timed('nlp_enrich'):
+        if cache is not None:
+            results = analyze_descriptions_cached(descriptions, cache, term_stats=term_stats)
+        else:
+            results = analyze_descriptions(descriptions, term_stats)
+    for record, values in zip(records, results.to_dict('records')):
+        record.update(values)
+    return records
+
+def _init_worker():
+    # Load NLTK resources once per worker process rather than once per chunk
+    get_stop_words()
+    _get_lemmatizer()
+
+def _analyze_chunk(descriptions):
+    return _analyze_rows(pd.Series(descriptions, dtype=object))
+
+def analyze_descriptions_parallel(descriptions, workers, term_stats=None):
+    """
+    Shard a Series of descriptions across a process pool
+    Chunks are contiguous and reassembled in order, so the result lines up with the input;
+    keywords are scored here, over the whole batch, exactly as in one process
+    """
+    values = descriptions.tolist()
+    chunk_size = -(-len(values) // workers)
+    chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=len(chunks), initializer=_init_worker) as executor:
+        parts = list(executor.map(_analyze_chunk, chunks))
+
+    merged = {column: [] for column in parts[0]}
+    for part in parts:
+        for column, values in part.items():
+            merged[column].extend(values)
+    token_lists = merged.pop('tokens')
+    return _frame(merged, token_lists, descriptions.index, term_stats)
+
+def _analyze(descriptions, workers=None, term_stats=None):
+    """
+    analyze_descriptions, spread over `workers` processes when the Series is large enough
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers or 1, len(descriptions) // MIN_ROWS_PER_WORKER)
+    if workers > 1:
+        logger.debug(f"Processing {len(descriptions)} descriptions across {workers} processes")
+        return analyze_descriptions_parallel(descriptions, workers, term_stats)
+    return analyze_descriptions(descriptions, term_stats)
+
+def process_descriptions(df, workers=None, cache=None, term_stats=None):
     """
     Process company descriptions using NLP techniques
+    `workers` > 1 spreads large frames over that many processes (0 means one per CPU);
+    small frames stay in-process because pool startup would cost more than it saves
+    With an enrichment `cache`, descriptions seen before are not analyzed again
+    Keywords are weighted by document frequencies in `term_stats` (by default, the frame's own)
     """
     logger.info("Processing company descriptions with NLP...")
     
@@ -164,13 +396,13 @@ def process_descriptions(df):
         logger.warning("No 'description' column found in DataFrame")
         return df
     
-    # Apply NLP processing to each description
-    df['keywords'] = df['description'].apply(extract_keywords)
-    df['technologies'] = df['description'].apply(extract_entities)
-    df['sentiment'] = df['description'].apply(analyze_sentiment)
-    
-    # Calculate description length as a feature
-    df['description_length'] = df['description'].apply(lambda x: len(x) if isinstance(x, str) else 0)
+    with timed('nlp_enrich'):
+        if cache is not None:
+            results = analyze_descriptions_cached(df['description'], cache, workers, term_stats)
+        else:
+            results = _analyze(df['description'], workers, term_stats)
+    for column in results.columns:
+        df[column] = results[column]
     
     logger.info("NLP processing completed")
     return df
@@ -0,0 +1,319 @@
+"""
+Opt-in profiling of a scrape run
+
+`profile_run(name)` wraps a block in a profiler and writes two files to
+PROFILE_DIR: `<name>.pstats` (open with `python -m pstats` or snakeviz) and
+`<name>.collapsed`, one "frame;frame;frame count" line per stack, which
+flamegraph.pl and speedscope read directly. The hottest functions and the share
+of time spent in each library (bs4, regex, SQLAlchemy, ...) go to the log.
+
+Two profilers are available:
+- 'cprofile' (default): deterministic; every thread the block starts (fetch
+  workers) is profiled too, and no other thread. Slows Python-heavy code down
+  noticeably.
+- 'sampling': a background thread snapshots the stacks of the profiled
+  threads every few milliseconds. Low overhead; the pstats file is built from the samples, so
+  call counts are sample counts.
+Both write the flamegraph from stack samples.
+
+Profile against cached pages (cache_mode='offline') to replay a slow run
+without touching the network.
+"""
+import cProfile
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ('cprofile', 'sampling')
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+DEFAULT_TOP = 20
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# Path fragments (or cProfile's names for C functions) -> component in the summary
+COMPONENTS = (
+    ('bs4', ('/bs4/', '/soupsieve/', '/lxml/', 'html/parser.py', '_markupbase.py')),
+    ('regex', ("'re.Pattern'", "'_sre.", '/re/__init__.py', '/re/_', 'sre_')),
+    ('sqlalchemy', ('/sqlalchemy/', '/flask_sqlalchemy/', "'sqlite3.", '/sqlite3/')),
+    ('http', ('/requests/', '/urllib3/', '/http/client.py', '/ssl.py', '/socket.py', "'_ssl.", "'_socket.")),
+    ('pandas', ('/pandas/', '/numpy/')),
+    ('nltk', ('/nltk/',)),
+    ('json/csv', ('/json/', '/csv.py', "'_csv.", "'_json.")),
+    ('threading', ('/threading.py', '/concurrent/', '/queue.py', "'_thread.")),
+)
+_cprofile_lock = threading.Lock()
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def component_of(filename, function=''):
+    label = f"{filename}:{function}"
+    for component, fragments in COMPONENTS:
+        if any(fragment in label for fragment in fragments):
+            return component
+    if filename.startswith(APP_ROOT):
+        return 'app'
+    return 'other'
+
+def _frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(APP_ROOT):
+        filename = os.path.relpath(filename, APP_ROOT)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+class StackSampler:
+    """
+    Samples, at a fixed interval, the stack of the thread that started it and of
+    every thread created afterwards; threads that were already running (the web
+    server, other job workers) are left out
+    """
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        # Tuples of code objects, outermost first -> samples
+        self.stacks = Counter()
+        self._ignored = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._ignored = set(sys._current_frames()) - {threading.get_ident()}
+        self._thread = threading.Thread(target=self._run, name='profiler-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or thread_id in self._ignored:
+                    continue
+                codes = []
+                while frame is not None:
+                    codes.append(frame.f_code)
+                    frame = frame.f_back
+                codes.reverse()
+                self.stacks[tuple(codes)] += 1
+
+    def collapsed_lines(self):
+        lines = Counter()
+        for codes, count in self.stacks.items():
+            lines[';'.join(_frame_label(code) for code in codes)] += count
+        return [f"{stack} {count}" for stack, count in lines.most_common()]
+
+    def pstats_dict(self):
+        """
+        Sample counts converted to the dict pstats loads: self time for the
+        leaf frame, cumulative time for every distinct function on the stack
+        """
+        stats = {}
+
+        def entry(code):
+            key = (code.co_filename, code.co_firstlineno, code.co_name)
+            if key not in stats:
+                stats[key] = [0, 0, 0.0, 0.0, {}]
+            return key, stats[key]
+
+        for codes, count in self.stacks.items():
+            seconds = count * self.interval
+            seen = set()
+            caller = None
+            for code in codes:
+                key, values = entry(code)
+                if key not in seen:
+                    seen.add(key)
+                    values[0] += count
+                    values[1] += count
+                    values[3] += seconds
+                if caller is not None:
+                    edge = values[4].setdefault(caller, [0, 0, 0.0, 0.0])
+                    edge[0] += count
+                    edge[1] += count
+                    edge[3] += seconds
+                caller = key
+            if codes:
+                stats[caller][2] += seconds
+        return {
+            key: (cc, nc, tt, ct, {caller: tuple(edge) for caller, edge in callers.items()})
+            for key, (cc, nc, tt, ct, callers) in stats.items()
+        }
+
+class _ThreadedCProfile:
+    """
+    cProfile for the calling thread plus every thread it, or a thread it
+    started, starts while the profile runs (cProfile on its own only sees the
+    thread that enabled it). Threads started elsewhere, such as other jobs'
+    workers or request threads, are never profiled.
+
+    Thread.start is wrapped for the duration of the run: a thread started from
+    a profiled thread runs its target under its own cProfile, disabled by that
+    thread when the target returns. stop() puts Thread.start and the calling
+    thread's previous profile hook back.
+    """
+    def __init__(self):
+        self._profiles = []
+        self._members = set()
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._own = None
+        self._previous_hook = None
+        self._thread_start = None
+
+    def _enable_here(self):
+        profile = cProfile.Profile()
+        with self._lock:
+            self._members.add(threading.get_ident())
+            self._profiles.append(profile)
+        profile.enable()
+        return profile
+
+    def _profiled(self, run):
+        def profiled_run(*args, **kwargs):
+            profile = self._enable_here()
+            try:
+                return run(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self._lock:
+                    self._members.discard(threading.get_ident())
+        return profiled_run
+
+    def start(self):
+        thread_start = self._thread_start = threading.Thread.start
+        profiler = self
+
+        def start(thread):
+            with profiler._lock:
+                member = not profiler._stopped and threading.get_ident() in profiler._members
+            if member:
+                thread.run = profiler._profiled(thread.run)
+            return thread_start(thread)
+
+        threading.Thread.start = start
+        self._previous_hook = sys.getprofile()
+        self._own = self._enable_here()
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            threading.Thread.start = self._thread_start
+            self._members.discard(threading.get_ident())
+            unfinished = len(self._members)
+            profiles = list(self._profiles)
+        self._own.disable()
+        if unfinished:
+            logger.warning(f"{unfinished} profiled threads outlived the run; their profiles stop when they exit")
+        # Snapshotting a profile disables it on this thread, so restore the hook last
+        stats = pstats.Stats(*profiles)
+        sys.setprofile(self._previous_hook)
+        return stats
+
+def _write_collapsed(lines, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        for line in lines:
+            f.write(line + '\n')
+
+def summarize(stats, top=DEFAULT_TOP):
+    """
+    Top functions by self time and self time per component, from a pstats.Stats
+    """
+    rows = []
+    components = Counter()
+    total = 0.0
+    for (filename, line, function), (cc, nc, tt, ct, callers) in stats.stats.items():
+        total += tt
+        components[component_of(filename, function)] += tt
+        rows.append((tt, ct, nc, f"{filename}:{line}({function})"))
+    rows.sort(reverse=True)
+    return {
+        'total_seconds': round(total, 4),
+        'components': {name: round(seconds, 4) for name, seconds in components.most_common()},
+        'functions': [
+            {'function': label, 'self_seconds': round(tt, 4), 'cumulative_seconds': round(ct, 4), 'calls': nc}
+            for tt, ct, nc, label in rows[:top]
+        ]
+    }
+
+def log_summary(summary, name):
+    total = summary['total_seconds'] or 1.0
+    logger.info(f"Profile {name}: {summary['total_seconds']:.3f}s of profiled self time")
+    logger.info("Self time by component: " + ', '.join(
+        f"{component} {seconds / total:.1%}" for component, seconds in summary['components'].items()
+    ))
+    for row in summary['functions']:
+        logger.info(
+            f"{row['self_seconds'] / total:>6.1%} {row['self_seconds']:>8.3f}s self "
+            f"{row['cumulative_seconds']:>8.3f}s cum {row['calls']:>8} calls  {row['function']}"
+        )
+
+class ProfileResult:
+    """Paths and summary of a finished profile_run"""
+    def __init__(self, name):
+        self.name = name
+        self.pstats_path = None
+        self.collapsed_path = None
+        self.summary = None
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'pstats': self.pstats_path,
+            'collapsed': self.collapsed_path,
+            'summary': self.summary
+        }
+
+@contextmanager
+def profile_run(name, profiler='cprofile', output_dir=None, top=DEFAULT_TOP, interval=DEFAULT_SAMPLE_INTERVAL):
+    """
+    Profile the block and write <output_dir>/<name>.pstats and .collapsed
+    Yields a ProfileResult that is filled in when the block exits
+    """
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler: {profiler}")
+    output_dir = os.path.abspath(output_dir or PROFILE_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    result = ProfileResult(name)
+
+    # Thread.start is patched process-wide while it runs, so only one cProfile run at a time
+    if profiler == 'cprofile' and not _cprofile_lock.acquire(blocking=False):
+        logger.warning(f"Another cProfile run is active; profiling {name} by sampling instead")
+        profiler = 'sampling'
+    sampler = StackSampler(interval).start()
+    deterministic = _ThreadedCProfile() if profiler == 'cprofile' else None
+    if deterministic is not None:
+        deterministic.start()
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        stats = None
+        if deterministic is not None:
+            stats = deterministic.stop()
+            _cprofile_lock.release()
+        sampler.stop()
+        elapsed = time.perf_counter() - start
+
+        result.pstats_path = os.path.join(output_dir, f"{name}.pstats")
+        result.collapsed_path = os.path.join(output_dir, f"{name}.collapsed")
+        if stats is not None:
+            stats.dump_stats(result.pstats_path)
+        else:
+            with open(result.pstats_path, 'wb') as f:
+                marshal.dump(sampler.pstats_dict(), f)
+            stats = pstats.Stats(result.pstats_path)
+        _write_collapsed(sampler.collapsed_lines(), result.collapsed_path)
+
+        result.summary = summarize(stats, top)
+        result.summary['wall_seconds'] = round(elapsed, 3)
+        result.summary['profiler'] = profiler
+        log_summary(result.summary, name)
+        logger.info(f"Profile written to {result.pstats_path} and {result.collapsed_path}")
@@ -0,0 +1,86 @@
+"""
+TF-IDF keyword scoring against corpus-wide document frequencies
+
+A term's weight in a description is (1 + log count) * idf, where
+idf = log((1 + N) / (1 + df)) + 1 over N documents, df of which contain the
+term. Words every company uses ("services", "clients") get a low idf, so a
+description's keywords are what sets it apart rather than what it repeats.
+
+Term stats map terms to document frequencies through
+document_frequencies(terms) -> (N, {term: df}) and add_documents(term_sets),
+which counts each set as one new document. MemoryTermStats keeps them in
+process; models.DatabaseTermStats keeps them for the whole Company corpus.
+
+A batch is scored as one sparse term-count matrix in CSR layout (NumPy
+arrays of row pointers, term ids and counts), so the work after counting is a
+few vectorized operations however many rows the batch has.
+"""
+from collections import Counter
+
+import numpy as np
+
+class MemoryTermStats:
+    """In-process document frequencies; without a shared corpus, a batch is scored against itself"""
+    def __init__(self):
+        self.documents = 0
+        self.frequencies = Counter()
+
+    def document_frequencies(self, terms):
+        return self.documents, {term: self.frequencies[term] for term in terms if term in self.frequencies}
+
+    def add_documents(self, term_sets):
+        for terms in term_sets:
+            if terms:
+                self.documents += 1
+                self.frequencies.update(terms)
+
+def count_matrix(token_lists):
+    """
+    CSR term counts of a batch: (indptr, indices, counts, vocabulary)
+    Within a row, terms keep the order they first appear in
+    """
+    vocabulary = {}
+    indptr = [0]
+    indices = []
+    counts = []
+    for tokens in token_lists:
+        for term, count in Counter(tokens).items():
+            indices.append(vocabulary.setdefault(term, len(vocabulary)))
+            counts.append(count)
+        indptr.append(len(indices))
+    return (
+        np.array(indptr, dtype=np.int64),
+        np.array(indices, dtype=np.int64),
+        np.array(counts, dtype=np.float64),
+        list(vocabulary)
+    )
+
+def idf_vector(terms, stats):
+    documents, frequencies = stats.document_frequencies(terms)
+    df = np.fromiter((frequencies.get(term, 0) for term in terms), dtype=np.float64, count=len(terms))
+    return np.log((1.0 + documents) / (1.0 + df)) + 1.0
+
+def top_terms(token_lists, stats, top_n=10):
+    """
+    The `top_n` highest TF-IDF terms of each token list, best first
+    Ties keep the order the terms first appear in the text
+    """
+    indptr, indices, counts, vocabulary = count_matrix(token_lists)
+    if not len(indices):
+        return [[] for _ in token_lists]
+    weights = (1.0 + np.log(counts)) * idf_vector(vocabulary, stats)[indices]
+
+    rows = np.repeat(np.arange(len(token_lists)), np.diff(indptr))
+    # Rows stay in place; within each row, highest weight first
+    order = np.lexsort((np.arange(len(indices)), -weights, rows))
+    rank = np.arange(len(indices)) - indptr[rows]
+    keep = rank < top_n
+    selected = indices[order][keep]
+    ends = np.cumsum(np.minimum(np.diff(indptr), top_n))
+
+    result = []
+    start = 0
+    for end in ends.tolist():
+        result.append([vocabulary[index] for index in selected[start:end].tolist()])
+        start = end
+    return result
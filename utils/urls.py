@@ -0,0 +1,55 @@
+from urllib.parse import urlsplit
+
+def normalize_linkedin_url(url):
+    """
+    Canonical form of a company URL, used as the deduplication key
+    Country and www subdomains of linkedin.com are dropped, as are query strings,
+    fragments, trailing slashes and sub-pages like /about, e.g.
+    https://uk.linkedin.com/company/Acme/about/?trk=x -> https://linkedin.com/company/acme
+    Returns None for empty input
+    """
+    if not isinstance(url, str) or not url.strip():
+        return None
+    url = url.strip()
+    if '://' not in url:
+        url = f"https://{url}"
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    path = parts.path.rstrip('/')
+
+    if host == 'linkedin.com' or host.endswith('.linkedin.com'):
+        host = 'linkedin.com'
+        scheme = 'https'
+        path = path.lower()
+        segments = path.split('/')
+        # /company/<slug>/about -> /company/<slug>
+        if len(segments) > 3 and segments[1] == 'company':
+            path = '/'.join(segments[:3])
+    else:
+        scheme = parts.scheme.lower()
+    return f"{scheme}://{host}{path}"
+
+def dedupe_urls(urls):
+    """
+    Normalize URLs and drop duplicates and empties, keeping first-seen order
+    """
+    seen = set()
+    unique = []
+    for url in urls:
+        normalized = normalize_linkedin_url(url)
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            unique.append(normalized)
+    return unique
+
+def rebase_url(url, base_url):
+    """
+    Point a URL at another scheme and host, keeping its path and query, e.g.
+    https://linkedin.com/company/acme with http://127.0.0.1:8000 -> http://127.0.0.1:8000/company/acme
+    Used to fetch company pages from a mirror or a local stand-in server
+    """
+    if not base_url:
+        return url
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else '')
+    return base_url.rstrip('/') + path